@@ -3,6 +3,7 @@ import pandas as pd
 import os
 
 import benchmarking.slides as sld
+from utils.tracing import span
 
 
 def generate_stream_runs(max_streams):
@@ -20,18 +21,19 @@ def run_benchmark(
     exe,
 ):
     print(f"Running benchmark with {streams} streams...")
-    result = subprocess.run(
-        [
-            exe,
-            input_file,
-            str(streams),
-            results_absolute_path,
-            project_absolute_path,
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        encoding="utf-8",
-    )
+    with span("benchmark.streams_run", streams=streams, file=input_file):
+        result = subprocess.run(
+            [
+                exe,
+                input_file,
+                str(streams),
+                results_absolute_path,
+                project_absolute_path,
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+        )
     if result.returncode != 0:
         print(f"Error running benchmark: {result.stderr}")
         return pd.DataFrame(), result.stdout
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Cumulative import time budget per CLI entry point, in milliseconds.
+# Heavy libraries (pandas, matplotlib, seaborn, imgkit, python-pptx, atlassian,
+# bs4) must only be imported inside the steps that use them.
+ENTRY_POINT_BUDGETS_MS: Dict[str, float] = {
+    "benchmarking.run_full_benchmark": 150.0,
+    "publishing.publish_report": 150.0,
+}
+
+HEAVY_MODULES = [
+    "pandas",
+    "matplotlib",
+    "seaborn",
+    "imgkit",
+    "pptx",
+    "atlassian",
+    "bs4",
+]
+
+
+def measure_import(module: str, python: str = sys.executable) -> Tuple[float, List[str]]:
+    """Import `module` in a fresh interpreter with `-X importtime`.
+
+    Returns the cumulative import time in milliseconds and the list of heavy
+    top-level modules that were pulled in.
+    """
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = [x.strip() for x in line[len("import time:") :].split("|")]
+        if len(parts) < 3 or not parts[1].isdigit():
+            continue
+        name = parts[2].strip()
+        imported.add(name)
+        if name == module:
+            cumulative_us = int(parts[1])
+
+    if cumulative_us is None:
+        raise RuntimeError(f"No importtime entry found for {module}")
+
+    heavy = [m for m in HEAVY_MODULES if m in imported]
+    return cumulative_us / 1000.0, heavy
+
+
+def check_budgets(budgets: Dict[str, float], repeats: int = 3) -> bool:
+    all_ok = True
+    print(f"{'Entry point':<40} {'Import (ms)':>12} {'Budget (ms)':>12}  Status")
+    for module, budget_ms in budgets.items():
+        # Best of several runs to ignore cold disk caches
+        timings = []
+        heavy: List[str] = []
+        for _ in range(repeats):
+            elapsed_ms, heavy = measure_import(module)
+            timings.append(elapsed_ms)
+        best_ms = min(timings)
+
+        ok = best_ms <= budget_ms and not heavy
+        all_ok = all_ok and ok
+        status = "OK" if ok else "FAIL"
+        print(f"{module:<40} {best_ms:>12.1f} {budget_ms:>12.1f}  {status}")
+        if heavy:
+            print(f"  heavy modules imported at startup: {', '.join(heavy)}")
+
+    return all_ok
+
+
+if __name__ == "__main__":
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    budgets = {module: ms * scale for module, ms in ENTRY_POINT_BUDGETS_MS.items()}
+
+    if not check_budgets(budgets):
+        print("Import time budget exceeded.")
+        sys.exit(1)
+    print("All entry points within import time budget.")
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""Microbenchmarks of the Python hot paths on deterministic synthetic data.
+
+`run` times every case and measures its peak traced memory (in a separate
+run, tracemalloc slows the code down) and writes the results as JSON.
+`compare` flags cases that got slower between two such files.
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import benchmarking.synthetic_data as synthetic
+import utils.mv_compare as mv_compare
+import utils.vtune_hotspots_plot as vtune
+import video_generation.motion_vector as mv
+
+MICROBENCHMARK_SCALES = {
+    "small": {
+        "frames": 60,
+        "width": 640,
+        "height": 360,
+        "vectors_per_frame": None,
+        "tree_rows": 50_000,
+        "tree_depth": 40,
+    },
+    "medium": {
+        "frames": 300,
+        "width": 1280,
+        "height": 720,
+        "vectors_per_frame": None,
+        "tree_rows": 200_000,
+        "tree_depth": 60,
+    },
+    "large": {
+        "frames": 600,
+        "width": 1920,
+        "height": 1080,
+        "vectors_per_frame": None,
+        "tree_rows": 1_000_000,
+        "tree_depth": 60,
+    },
+}
+DEFAULT_REPEAT = 5
+# Relative slowdown of the fastest repetition that `compare` reports; the
+# minimum is far less noisy than the median on a busy machine
+DEFAULT_SLOWDOWN_THRESHOLD = 0.10
+# Frames each of the per-frame cases works on
+CASE_FRAMES = 100
+
+
+def prepare_data(tmp_dir: str, scale: Dict) -> Dict:
+    """Write the synthetic inputs and load what the cases share."""
+    frames, width, height = scale["frames"], scale["width"], scale["height"]
+    vectors = scale["vectors_per_frame"]
+    mv_csv = synthetic.generate_motion_vector_csv(
+        os.path.join(tmp_dir, "method4_output_0.csv"), frames, width, height, vectors
+    )
+    # The unpatched method: same stream, different noise
+    other_csv = synthetic.generate_motion_vector_csv(
+        os.path.join(tmp_dir, "method0_output_0.csv"),
+        frames,
+        width,
+        height,
+        vectors,
+        method_id=0,
+        seed=1,
+    )
+    topdown_csv = synthetic.generate_vtune_topdown_csv(
+        os.path.join(tmp_dir, "topdown.csv"), scale["tree_rows"], scale["tree_depth"]
+    )
+
+    df = mv.load_motion_vectors(mv_csv)
+    frame_numbers = np.unique(df["frame"].to_numpy())[:CASE_FRAMES]
+    return {
+        "mv_csv": mv_csv,
+        "topdown_csv": topdown_csv,
+        "df": df,
+        "other_df": mv.load_motion_vectors(other_csv),
+        "frame_data": [df[df["frame"] == frame] for frame in frame_numbers],
+        "frame_numbers": frame_numbers,
+        "width": width,
+        "height": height,
+    }
+
+
+def make_cases(data: Dict) -> List[Tuple[str, Callable[[], object]]]:
+    def reduce_frames():
+        for frame_data in data["frame_data"]:
+            mv.reduce_motion_vectors(frame_data, 2000)
+
+    def draw_frames():
+        img = np.zeros((data["height"], data["width"], 3), dtype=np.uint8)
+        for frame_data in data["frame_data"]:
+            mv.draw_motion_vectors(img, frame_data)
+
+    def compare_frames():
+        first, last = data["frame_numbers"][[0, -1]]
+        mv_compare.compare_frames(data["df"], data["other_df"], first, last)
+
+    return [
+        ("load_motion_vectors", lambda: mv.load_motion_vectors(data["mv_csv"])),
+        ("reduce_motion_vectors", reduce_frames),
+        ("magnitude_order", lambda: mv.MagnitudeOrder(data["df"])),
+        ("draw_motion_vectors", draw_frames),
+        ("compare_frames", compare_frames),
+        ("build_vtune_tree", lambda: vtune.build_vtune_tree(data["topdown_csv"])),
+        ("parse_vtune_tree", lambda: vtune.parse_vtune_tree(data["topdown_csv"])),
+    ]
+
+
+def time_case(function: Callable[[], object], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def peak_memory(function: Callable[[], object]) -> int:
+    """Peak bytes allocated by one call, as seen by tracemalloc (numpy included)."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_microbenchmarks(
+    scale_name: str = "small",
+    repeat: int = DEFAULT_REPEAT,
+    only: List[str] = (),
+    **overrides,
+) -> Dict:
+    scale = dict(MICROBENCHMARK_SCALES[scale_name])
+    scale.update({k: v for k, v in overrides.items() if v is not None})
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"[INFO] Generating {scale_name} synthetic data...")
+        data = prepare_data(tmp_dir, scale)
+        for name, function in make_cases(data):
+            if only and name not in only:
+                continue
+            # Warm-up: imports, caches, page cache
+            function()
+            times = time_case(function, repeat)
+            results[name] = {
+                "median_s": statistics.median(times),
+                "min_s": min(times),
+                "max_s": max(times),
+                "repeat": repeat,
+                "peak_mb": peak_memory(function) / (1 << 20),
+            }
+            print(
+                f"  {name:<24} {1000 * results[name]['median_s']:>10.2f} ms "
+                f"{results[name]['peak_mb']:>9.1f} MB"
+            )
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "scale": scale_name,
+            "parameters": scale,
+        },
+        "cases": results,
+    }
+
+
+def compare_results(
+    base: Dict, new: Dict, threshold: float = DEFAULT_SLOWDOWN_THRESHOLD
+) -> List[Dict]:
+    """Time (fastest repetition) and peak memory ratios, new / base."""
+    rows = []
+    for name, base_case in base["cases"].items():
+        new_case = new["cases"].get(name)
+        if new_case is None:
+            continue
+        time_ratio = new_case["min_s"] / max(base_case["min_s"], 1e-12)
+        memory_ratio = new_case["peak_mb"] / max(base_case["peak_mb"], 1e-12)
+        rows.append(
+            {
+                "case": name,
+                "base_ms": 1000 * base_case["min_s"],
+                "new_ms": 1000 * new_case["min_s"],
+                "time_ratio": time_ratio,
+                "memory_ratio": memory_ratio,
+                "slower": time_ratio > 1 + threshold,
+                "faster": time_ratio < 1 - threshold,
+            }
+        )
+    return rows
+
+
+def usage():
+    print("Usage:")
+    print(
+        "  python -m benchmarking.microbenchmarks run [--scale small|medium|large] "
+        "[--output results.json] [--repeat N] [--case NAME ...]"
+    )
+    print(
+        "        [--frames N] [--width W] [--height H] [--vectors N] "
+        "[--tree-rows N] [--tree-depth N]"
+    )
+    print(
+        "  python -m benchmarking.microbenchmarks compare <base.json> <new.json> "
+        "[--threshold 0.10]"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        usage()
+        sys.exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+
+    if command == "run":
+        scale_name = "small"
+        output = None
+        repeat = DEFAULT_REPEAT
+        only = []
+        overrides = {}
+        options = {
+            "--frames": "frames",
+            "--width": "width",
+            "--height": "height",
+            "--vectors": "vectors_per_frame",
+            "--tree-rows": "tree_rows",
+            "--tree-depth": "tree_depth",
+        }
+        while args:
+            arg = args.pop(0)
+            if arg == "--scale" and args:
+                scale_name = args.pop(0)
+            elif arg == "--output" and args:
+                output = args.pop(0)
+            elif arg == "--repeat" and args:
+                repeat = int(args.pop(0))
+            elif arg == "--case" and args:
+                only.append(args.pop(0))
+            elif arg in options and args:
+                overrides[options[arg]] = int(args.pop(0))
+            else:
+                usage()
+                sys.exit(1)
+        if scale_name not in MICROBENCHMARK_SCALES:
+            print(f"[ERROR] Unknown scale {scale_name}")
+            sys.exit(1)
+
+        results = run_microbenchmarks(scale_name, repeat, only, **overrides)
+        if output:
+            with open(output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"[INFO] Results written to {output}")
+
+    elif command == "compare" and len(args) >= 2:
+        threshold = DEFAULT_SLOWDOWN_THRESHOLD
+        if "--threshold" in args[2:]:
+            threshold = float(args[args.index("--threshold") + 1])
+        with open(args[0]) as f:
+            base = json.load(f)
+        with open(args[1]) as f:
+            new = json.load(f)
+        if base["meta"]["parameters"] != new["meta"]["parameters"]:
+            print("[WARNING] The two runs used different data scales")
+
+        rows = compare_results(base, new, threshold)
+        print(
+            f"{'Case':<24} {'Base ms':>10} {'New ms':>10} {'Time':>7} {'Memory':>7}"
+        )
+        for r in rows:
+            flag = "SLOWER" if r["slower"] else "faster" if r["faster"] else ""
+            print(
+                f"{r['case']:<24} {r['base_ms']:>10.2f} {r['new_ms']:>10.2f} "
+                f"{r['time_ratio']:>6.2f}x {r['memory_ratio']:>6.2f}x  {flag}"
+            )
+        slower = [r["case"] for r in rows if r["slower"]]
+        if slower:
+            print(
+                f"[WARNING] {len(slower)} case(s) more than {threshold:.0%} slower: "
+                f"{', '.join(slower)}"
+            )
+            sys.exit(1)
+        print(f"No case more than {threshold:.0%} slower.")
+
+    else:
+        usage()
+        sys.exit(1)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import glob
+import os
+import sys
+import time
+
+import video_generation.motion_blobs as blobs
+import video_generation.motion_vector as mv
+
+
+def benchmark_motion_blobs(csv_file, threshold=blobs.BLOB_THRESHOLD):
+    start = time.perf_counter()
+    df = mv.load_motion_vector_columns(csv_file, blobs.BLOB_COLUMNS)
+    load_seconds = time.perf_counter() - start
+
+    grid_seconds = label_seconds = track_seconds = 0.0
+    frames = found = 0
+    tracker = blobs.BlobTracker()
+
+    start = time.perf_counter()
+    for frame, grid_x, grid_y in blobs.iter_motion_grids(df):
+        grid_done = time.perf_counter()
+        grid_seconds += grid_done - start
+
+        frame_blobs = blobs.extract_blobs(grid_x, grid_y, threshold)
+        label_done = time.perf_counter()
+        label_seconds += label_done - grid_done
+
+        tracker.update(frame, frame_blobs[:, :4])
+        start = time.perf_counter()
+        track_seconds += start - label_done
+
+        frames += 1
+        found += len(frame_blobs)
+
+    frames = max(frames, 1)
+    return {
+        "file": os.path.basename(csv_file),
+        "vectors": len(df),
+        "frames": frames,
+        "blobs": found,
+        "tracks": tracker.next_id,
+        "load_s": load_seconds,
+        "grid_ms": 1000 * grid_seconds / frames,
+        "label_ms": 1000 * label_seconds / frames,
+        "track_ms": 1000 * track_seconds / frames,
+    }
+
+
+def find_motion_vector_csvs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "method*_output_0.csv"))))
+        else:
+            files.append(path)
+    return files
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    if not paths:
+        runs = sorted(glob.glob("results/*/"))
+        paths = runs[-1:]
+
+    csv_files = find_motion_vector_csvs(paths)
+    if not csv_files:
+        print(
+            "Usage: python -m benchmarking.motion_blobs_benchmark "
+            "[results_dir|motion_vectors_csv ...]"
+        )
+        print("No motion vector CSVs found, run `make benchmark` first.")
+        sys.exit(1)
+
+    print(
+        f"{'File':<28} {'Frames':>7} {'Vectors':>11} {'Blobs':>7} {'Tracks':>7} "
+        f"{'Load s':>7} {'Grid ms':>8} {'Label ms':>9} {'Track ms':>9} {'Total ms':>9}"
+    )
+    for csv_file in csv_files:
+        r = benchmark_motion_blobs(csv_file)
+        total = r["grid_ms"] + r["label_ms"] + r["track_ms"]
+        print(
+            f"{r['file']:<28} {r['frames']:>7} {r['vectors']:>11,} {r['blobs']:>7} "
+            f"{r['tracks']:>7} {r['load_s']:>7.2f} {r['grid_ms']:>8.3f} "
+            f"{r['label_ms']:>9.3f} {r['track_ms']:>9.3f} {total:>9.3f}"
+        )
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Stand-in for a live extractor: replays a motion vector CSV at a fixed rate.
+
+Every frame's rows are appended to the target CSV and flushed in one write,
+the way MotionVectorWriter output grows while an RTSP stream is decoded.
+"""
+
+import sys
+import time
+
+
+def iter_frame_lines(csv_file):
+    """Yield (header, None) and then (frame, lines) for every frame of the CSV."""
+    with open(csv_file, "r") as f:
+        yield f.readline(), None
+        frame, lines = None, []
+        for line in f:
+            current = line.split(",", 1)[0]
+            if current != frame and lines:
+                yield frame, lines
+                lines = []
+            frame = current
+            lines.append(line)
+        if lines:
+            yield frame, lines
+
+
+def append_motion_vectors(source_csv, target_csv, fps=25.0, max_frames=None):
+    frames = iter_frame_lines(source_csv)
+    header, _ = next(frames)
+    interval = 1.0 / fps
+    written = 0
+
+    with open(target_csv, "w") as out:
+        out.write(header)
+        out.flush()
+        start = time.perf_counter()
+        for _, lines in frames:
+            if max_frames is not None and written >= max_frames:
+                break
+            # Keep the schedule instead of sleeping a fixed interval
+            delay = start + written * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            out.write("".join(lines))
+            out.flush()
+            written += 1
+
+    seconds = time.perf_counter() - start
+    print(
+        f"[INFO] Appended {written} frames in {seconds:.1f} s "
+        f"({written / seconds:.1f} fps)"
+    )
+    return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(
+            "Usage: python -m benchmarking.mv_appender "
+            "<source_csv> <target_csv> [fps] [max_frames]"
+        )
+        sys.exit(1)
+
+    fps = float(sys.argv[3]) if len(sys.argv) > 3 else 25.0
+    max_frames = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    append_motion_vectors(sys.argv[1], sys.argv[2], fps, max_frames)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Stand-in extractor that writes synthetic motion vectors.
+
+Called like an extractor, `<input> [do_print] [file_name]`, where the input
+is `<frames>@<width>x<height>` instead of a video. The CSV has exactly the
+MotionVectorWriter format, and every `gop`-th frame is an intra frame
+without vectors, so it is missing from the output like with real streams.
+"""
+
+import sys
+import time
+
+from benchmarking.synthetic_data import synthetic_motion_vectors
+from video_generation.mv_stream import MV_CSV_COLUMNS, format_csv_rows
+
+
+def parse_input(text):
+    """`300@1280x720` -> (300, 1280, 720)."""
+    frames, size = text.split("@")
+    width, height = size.lower().split("x")
+    return int(frames), int(width), int(height)
+
+
+def produce_motion_vectors(input_spec, file_name, fps=0.0, gop=30):
+    frames, width, height = parse_input(input_spec)
+    interval = 1.0 / fps if fps else 0.0
+
+    with open(file_name, "wb") as out:
+        out.write((",".join(MV_CSV_COLUMNS) + "\n").encode())
+        start = time.perf_counter()
+        for frame in range(frames):
+            if frame % gop == 0:
+                print(f"frame {frame}: no motion vectors", file=sys.stderr)
+                continue
+            out.write(format_csv_rows(synthetic_motion_vectors(frame, width, height)))
+            if interval:
+                # Decode at the stream's rate, made visible frame by frame
+                out.flush()
+                delay = start + (frame + 1) * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m benchmarking.mv_producer "
+            "<frames>@<width>x<height> [do_print] [file_name] [fps]",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    do_print = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    file_name = sys.argv[3] if len(sys.argv) > 3 else "motion_vectors.csv"
+    fps = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+    if do_print:
+        produce_motion_vectors(sys.argv[1], file_name, fps)
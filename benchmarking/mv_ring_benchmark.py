@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Shared-memory ring vs piped CSV: throughput, latency and backpressure.
+
+Both producers run in a child process and send the same synthetic frames,
+generated (and for the CSV path formatted) before the clock starts, so
+the numbers compare the transports and what the consumer does to get
+numpy records out of them.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarking.mv_producer import parse_input
+from benchmarking.synthetic_data import synthetic_motion_vectors
+from video_generation.mv_ring import (
+    MotionVectorRingConsumer,
+    MotionVectorRingProducer,
+    to_av_records,
+)
+from video_generation.mv_stream import (
+    MV_CSV_COLUMNS,
+    format_csv_rows,
+    read_stream_frames,
+)
+
+# (name, producer fps, consumer work per frame in ms); 0 fps = flat out
+RING_SCENARIOS = [("throughput", 0, 0), ("paced", 30, 0), ("slow consumer", 0, 20)]
+
+
+def make_frames(input_spec, gop=30):
+    frames, width, height = parse_input(input_spec)
+    return [
+        synthetic_motion_vectors(frame, width, height)
+        for frame in range(frames)
+        if frame % gop
+    ]
+
+
+def wait_until_due(epoch, index, fps):
+    if fps:
+        delay = epoch + index / fps - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def csv_producer(write_fd, input_spec, fps, epoch, blocked):
+    payloads = [format_csv_rows(records) for records in make_frames(input_spec)]
+    with os.fdopen(write_fd, "wb") as out:
+        out.write((",".join(MV_CSV_COLUMNS) + "\n").encode())
+        epoch.value = time.time()
+        for index, payload in enumerate(payloads):
+            wait_until_due(epoch.value, index, fps)
+            start = time.perf_counter()
+            out.write(payload)
+            out.flush()
+            blocked.value += time.perf_counter() - start
+
+
+def ring_producer(name, input_spec, fps, epoch, ready, go):
+    frames = [(int(r["frame"][0]), to_av_records(r)) for r in make_frames(input_spec)]
+    producer = MotionVectorRingProducer(name)
+    ready.set()
+    go.wait()
+    epoch.value = time.time()
+    for index, (frame, records) in enumerate(frames):
+        wait_until_due(epoch.value, index, fps)
+        producer.write(frame, records, method_id=4)
+    producer.close()
+    producer.release()
+
+
+def consume(frames, consumer_ms):
+    """Drain (frame, records) pairs; returns vectors, receive times."""
+    vectors = 0
+    received = []
+    for _, records in frames:
+        received.append(time.time())
+        # Touch the data like an analysis would
+        vectors += len(records)
+        int(records["motion_x"].sum())
+        if consumer_ms:
+            time.sleep(consumer_ms / 1000)
+    return vectors, received
+
+
+def summarize(path, scenario, vectors, received, epoch, fps, blocked):
+    received = np.array(received)
+    seconds = received[-1] - epoch if len(received) else 0.0
+    latency = None
+    if fps and len(received):
+        due = epoch + np.arange(len(received)) / fps
+        latency = 1000 * (received - due)
+    return {
+        "path": path,
+        "scenario": scenario,
+        "frames": len(received),
+        "frames_per_s": len(received) / max(seconds, 1e-9),
+        "vectors_per_s": vectors / max(seconds, 1e-9),
+        "mean_latency_ms": float(latency.mean()) if latency is not None else None,
+        "p95_latency_ms": (
+            float(np.percentile(latency, 95)) if latency is not None else None
+        ),
+        "blocked_s": blocked,
+    }
+
+
+def benchmark_csv(input_spec, scenario, fps, consumer_ms):
+    context = multiprocessing.get_context("fork")
+    epoch = context.Value("d", 0.0)
+    blocked = context.Value("d", 0.0)
+    read_fd, write_fd = os.pipe()
+    process = context.Process(
+        target=csv_producer, args=(write_fd, input_spec, fps, epoch, blocked)
+    )
+    process.start()
+    os.close(write_fd)
+
+    with os.fdopen(read_fd, "rb") as stream:
+        vectors, received = consume(read_stream_frames(stream), consumer_ms)
+    process.join()
+    return summarize(
+        "csv pipe", scenario, vectors, received, epoch.value, fps, blocked.value
+    )
+
+
+def benchmark_ring(input_spec, scenario, fps, consumer_ms):
+    context = multiprocessing.get_context("fork")
+    epoch = context.Value("d", 0.0)
+    ready, go = context.Event(), context.Event()
+    name = f"mv_ring_{os.getpid()}"
+    process = context.Process(
+        target=ring_producer, args=(name, input_spec, fps, epoch, ready, go)
+    )
+    process.start()
+    ready.wait()
+
+    consumer = MotionVectorRingConsumer(name)
+    go.set()
+    frames = consumer.frames()
+    vectors, received = consume(
+        ((frame, records) for frame, _, records, _ in frames), consumer_ms
+    )
+    stats = consumer.stats()
+    consumer.close()
+    process.join()
+    return summarize(
+        "shm ring",
+        scenario,
+        vectors,
+        received,
+        epoch.value,
+        fps,
+        stats["stall_ns"] / 1e9,
+    )
+
+
+def benchmark_transports(input_spec):
+    results = []
+    for scenario, fps, consumer_ms in RING_SCENARIOS:
+        results.append(benchmark_csv(input_spec, scenario, fps, consumer_ms))
+        results.append(benchmark_ring(input_spec, scenario, fps, consumer_ms))
+    return results
+
+
+if __name__ == "__main__":
+    input_spec = sys.argv[1] if len(sys.argv) > 1 else "200@1920x1080"
+    if "@" not in input_spec:
+        print(
+            "Usage: python -m benchmarking.mv_ring_benchmark "
+            "[<frames>@<width>x<height>]"
+        )
+        sys.exit(1)
+
+    results = benchmark_transports(input_spec)
+
+    print(f"Transport of {input_spec} synthetic frames:")
+    print(
+        f"  {'Scenario':<14} {'Path':<9} {'Frames':>6} {'Frames/s':>9} "
+        f"{'M vec/s':>8} {'Lat ms':>7} {'p95 ms':>7} {'Blocked s':>10}"
+    )
+    for r in results:
+        mean = "-" if r["mean_latency_ms"] is None else f"{r['mean_latency_ms']:.1f}"
+        p95 = "-" if r["p95_latency_ms"] is None else f"{r['p95_latency_ms']:.1f}"
+        print(
+            f"  {r['scenario']:<14} {r['path']:<9} {r['frames']:>6} "
+            f"{r['frames_per_s']:>9.1f} {r['vectors_per_s'] / 1e6:>8.2f} "
+            f"{mean:>7} {p95:>7} {r['blocked_s']:>10.2f}"
+        )
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+import video_generation.motion_vector as mv
+from benchmarking.motion_blobs_benchmark import find_motion_vector_csvs
+from video_generation.motion_vector_store import STORE_COLUMNS, MotionVectorStore
+
+
+def make_queries(frames, width, height, count, seed=0):
+    """Random (start, end, roi, min_magnitude) queries, like a scrubbing viewer."""
+    rng = np.random.default_rng(seed)
+    first, last = int(frames.min()), int(frames.max())
+    queries = []
+    for _ in range(count):
+        span = int(rng.integers(1, max(2, (last - first) // 2)))
+        start = int(rng.integers(first, max(first + 1, last - span)))
+        x0 = int(rng.integers(0, width // 2))
+        y0 = int(rng.integers(0, height // 2))
+        roi = (x0, y0, x0 + width // 4, y0 + height // 4)
+        queries.append((start, start + span, roi, 4.0))
+    return queries
+
+
+def pandas_query(df, magnitude, start, end, roi, min_magnitude):
+    x0, y0, x1, y1 = roi
+    left = df["dst_x"] - df["w"] // 2
+    top = df["dst_y"] - df["h"] // 2
+    mask = (df["frame"] >= start) & (df["frame"] <= end)
+    mask &= (left < x1) & (left + df["w"] > x0) & (top < y1) & (top + df["h"] > y0)
+    mask &= magnitude > min_magnitude
+    return df[mask]
+
+
+def benchmark_mv_store(csv_file, count=50):
+    df = mv.load_motion_vector_columns(csv_file, STORE_COLUMNS)
+    # The pandas side gets its magnitudes precomputed too
+    dx, dy = mv.motion_displacement(df)
+    magnitude = np.hypot(dx, dy)
+
+    start = time.perf_counter()
+    store = MotionVectorStore.from_dataframe(df)
+    build_seconds = time.perf_counter() - start
+
+    width = int(df["dst_x"].max()) + 8
+    height = int(df["dst_y"].max()) + 8
+    queries = make_queries(store.frames, width, height, count)
+
+    start = time.perf_counter()
+    expected = [len(pandas_query(df, magnitude, *query)) for query in queries]
+    pandas_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [len(store.query(*query)["frame"]) for query in queries]
+    store_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query_start, query_end, _, _ in queries:
+        store.query(query_start, query_end)
+    range_seconds = time.perf_counter() - start
+
+    if found != expected:
+        print(f"[ERROR] Store and pandas results differ for {csv_file}")
+
+    return {
+        "file": os.path.basename(csv_file),
+        "vectors": len(df),
+        "build_s": build_seconds,
+        "pandas_ms": 1000 * pandas_seconds / count,
+        "store_ms": 1000 * store_seconds / count,
+        "range_ms": 1000 * range_seconds / count,
+        "speedup": pandas_seconds / max(store_seconds, 1e-9),
+    }
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    if not paths:
+        paths = sorted(glob.glob("results/*/"))[-1:]
+
+    csv_files = find_motion_vector_csvs(paths)
+    if not csv_files:
+        print(
+            "Usage: python -m benchmarking.mv_store_benchmark "
+            "[results_dir|motion_vectors_csv ...]"
+        )
+        print("No motion vector CSVs found, run `make benchmark` first.")
+        sys.exit(1)
+
+    print(
+        f"{'File':<28} {'Vectors':>11} {'Build s':>8} {'Pandas ms':>10} "
+        f"{'Store ms':>9} {'Range ms':>9} {'Speedup':>8}"
+    )
+    for csv_file in csv_files:
+        r = benchmark_mv_store(csv_file)
+        print(
+            f"{r['file']:<28} {r['vectors']:>11,} {r['build_s']:>8.2f} "
+            f"{r['pandas_ms']:>10.2f} {r['store_ms']:>9.2f} {r['range_ms']:>9.3f} "
+            f"{r['speedup']:>7.1f}x"
+        )
@@ -4,6 +4,8 @@ import os
 import pandas as pd
 import seaborn as sns
 
+from utils.tracing import span
+
 
 def highlight_table(df):
     def find_col(possibles):
@@ -48,7 +50,8 @@ def highlight_table(df):
 def save_highlighted_table_as_png(df, filename):
     styled = highlight_table(df)
     html_str = styled.to_html()
-    imgkit.from_string(html_str, filename)
+    with span("plots.imgkit", file=os.path.basename(filename)):
+        imgkit.from_string(html_str, filename)
     print(f"Saved highlighted table as {filename}")
 
 
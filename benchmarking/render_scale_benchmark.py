@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import time
+
+import video_generation.motion_vector as mv
+from video_generation.combine_motion_vectors_with_video import create_combined_video
+from video_generation.generate_motion_vectors_video import create_motion_vector_video
+
+RENDER_SCALES = ["1", "1/2", "1/4"]
+
+
+def benchmark_render_scales(csv_file, video_file=None, frames=120):
+    df = mv.load_motion_vectors(csv_file)
+    first = int(df["frame"].min())
+    frame_ranges = [(first, first + frames - 1)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for text in RENDER_SCALES:
+            scale = mv.parse_scale(text)
+            output_path = os.path.join(tmp_dir, "motion_vectors_video.mp4")
+            start = time.perf_counter()
+            create_motion_vector_video(
+                df, output_path, frame_ranges=frame_ranges, scale=scale
+            )
+            mv_seconds = time.perf_counter() - start
+
+            combined_seconds = None
+            if video_file:
+                output_path = os.path.join(tmp_dir, "combined.mp4")
+                start = time.perf_counter()
+                create_combined_video(
+                    video_file, [df, df], output_path, max_frames=frames, scale=scale
+                )
+                combined_seconds = time.perf_counter() - start
+
+            results.append(
+                {
+                    "scale": text,
+                    "mv_fps": frames / mv_seconds,
+                    "combined_fps": (
+                        frames / combined_seconds if combined_seconds else None
+                    ),
+                }
+            )
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m benchmarking.render_scale_benchmark "
+            "<motion_vectors_csv> [video_file] [frames]"
+        )
+        sys.exit(1)
+
+    csv_file = sys.argv[1]
+    video_file = sys.argv[2] if len(sys.argv) > 2 else None
+    frames = int(sys.argv[3]) if len(sys.argv) > 3 else 120
+
+    results = benchmark_render_scales(csv_file, video_file, frames)
+
+    print(f"Rendering {frames} frames of {os.path.basename(csv_file)}:")
+    print(f"  {'Scale':<7} {'MV video fps':>13} {'Combined fps':>13}")
+    for r in results:
+        combined = f"{r['combined_fps']:>13.1f}" if r["combined_fps"] else f"{'-':>13}"
+        print(f"  {r['scale']:<7} {r['mv_fps']:>13.1f} {combined}")
@@ -6,9 +6,7 @@ import subprocess
 from datetime import datetime
 from pathlib import Path
 
-import benchmarking.benchmark_python as benchmarking
-import utils.mv_compare as mv_compare
-import utils.vtune_hotspots_plot as vtune
+from utils.tracing import span, traced, write_trace
 
 
 class BenchmarkRunner:
@@ -22,6 +20,12 @@ class BenchmarkRunner:
         run_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
         self.results_dir = self.results_base / run_timestamp
         self.results_dir.mkdir(exist_ok=True)
+        if (self.results_dir / "manifest.json").exists():
+            # Stored in the same minute: the steps below write files in place,
+            # which must not reach the objects shared with other runs
+            from utils.results_store import ResultsStore
+
+            ResultsStore(self.results_base).detach(str(self.results_dir))
 
         self.benchmarking_dir = self.current_dir / "benchmarking"
         self.benchmarking_dir_executables = self.benchmarking_dir / "executables"
@@ -45,16 +49,19 @@ class BenchmarkRunner:
     def run_command(self, cmd, env=None, cwd=None, capture_output=False, shell=False):
         if not shell:
             cmd = cmd.split()
+        # Shell commands source setvars.sh first: name the span after the tool
+        program = cmd.split(" && ")[-1].split()[0] if shell else cmd[0]
         try:
-            result = subprocess.run(
-                cmd,
-                cwd=cwd,
-                env=env,
-                capture_output=capture_output,
-                text=True,
-                check=True,
-                shell=shell,
-            )
+            with span("benchmark.command", command=os.path.basename(program)):
+                result = subprocess.run(
+                    cmd,
+                    cwd=cwd,
+                    env=env,
+                    capture_output=capture_output,
+                    text=True,
+                    check=True,
+                    shell=shell,
+                )
             if capture_output:
                 return result.stdout.strip()
             return True
@@ -62,6 +69,7 @@ class BenchmarkRunner:
             print(f"Error executing command: {e}")
             return False if not capture_output else None
 
+    @traced("benchmark.build")
     def build(self):
         print("Building all extractors and tools...")
 
@@ -84,6 +92,7 @@ class BenchmarkRunner:
 
         print("Build complete.")
 
+    @traced("benchmark.extract")
     def extract(self):
         if not self.video_file:
             print(
@@ -98,12 +107,16 @@ class BenchmarkRunner:
         if not self.run_command(cmd, cwd=self.benchmarking_dir_executables):
             return
 
-        for csv_file in self.results_dir.glob("method*_output_*.csv"):
-            if not csv_file.name.endswith("_0.csv"):
-                csv_file.unlink()
+        # Parallel streams must agree before all but stream 0 are deleted
+        from utils.stream_consistency import check_stream_outputs
+
+        print("Verifying parallel stream outputs...")
+        with span("benchmark.verify_streams", streams=self.streams):
+            check_stream_outputs(str(self.results_dir), prune=True)
 
         print("Benchmarks complete.")
 
+    @traced("benchmark.plot")
     def plot(self):
         if not self.video_file:
             print("Plotting step skipped: set VIDEO_FILE argument.")
@@ -113,6 +126,10 @@ class BenchmarkRunner:
 
         print("Running Python benchmark visualization and PPT generation...")
 
+        # pandas, matplotlib, seaborn, imgkit and python-pptx are only needed
+        # here, so they are imported on demand to keep the other steps fast.
+        import benchmarking.benchmark_python as benchmarking
+
         benchmarking.benchmark(
             self.video_file,
             self.streams,
@@ -126,7 +143,10 @@ class BenchmarkRunner:
 
         print(f"Plotting complete. Plots and PPTX in {self.plots_dir}.")
 
+    @traced("benchmark.mv_comparison")
     def generate_mv_comparison(self):
+        import utils.mv_compare as mv_compare
+
         method0_csv = self.results_dir / "method0_output_0.csv"
         method6_csv = self.results_dir / "method4_output_0.csv"
         mv_compare.compare(
@@ -137,6 +157,7 @@ class BenchmarkRunner:
             self.motion_vectors_comparison_file,
         )
 
+    @traced("benchmark.profiler")
     def profiler(self):
         print("Running VTune profiler on extractor4 with motion_vectors_only=1...")
 
@@ -162,10 +183,22 @@ class BenchmarkRunner:
         self.run_command(vtune_report_hotspots, shell=True)
         self.run_command(vtune_report_topdown, shell=True)
 
-        vtune.build_tree(str(self.vtune_topdown_file))
+        import utils.flame_graph as flame_graph
+        import utils.vtune_hotspots_plot as vtune
+
+        with span("benchmark.vtune_plots", file=self.vtune_topdown_file.name):
+            vtune.build_tree(str(self.vtune_topdown_file))
+            flame_graph.generate_flame_graph(str(self.vtune_topdown_file))
 
         print(f"Profiler run complete. Results in {self.vtune_dir}.")
 
+    @traced("benchmark.store_results")
+    def store_results(self):
+        from utils.results_store import ResultsStore
+
+        print("Storing results in the content-addressed results store...")
+        ResultsStore(self.results_base).ingest(str(self.results_dir))
+
     def run_all(self):
         self.build()
         self.extract()
@@ -185,7 +218,9 @@ def usage():
     print("    3 = Generate Plots and PowerPoint")
     print("    4 = Generate MV comparison")
     print("    5 = Profiler (VTune on FFmpeg hacked)")
+    print("    6 = Store results (deduplicate into results/.store)")
     print("    0 = Run ALL steps")
+    print("  Set MV_TRACE=1 to write a stage trace (trace.json) to the results dir.")
     print()
 
 
@@ -210,6 +245,7 @@ if __name__ == "__main__":
     print("  3: Generate Plots and PowerPoint")
     print("  4: Generate MV comparison")
     print("  5: Profiler (VTune on FFmpeg hacked)")
+    print("  6: Store results (deduplicate into results/.store)")
     print("  0: Run ALL steps")
     print()
 
@@ -225,9 +261,17 @@ if __name__ == "__main__":
     }
 
     for step in choices:
+        if step == "6":
+            continue
         if step in step_map:
             step_map[step]()
             if step == "0":
                 break
         else:
             print(f"Invalid step: {step}")
+
+    write_trace(runner.results_dir)
+
+    # Stored last, once every step (and the trace) has written its files
+    if "0" in choices or "6" in choices:
+        runner.store_results()
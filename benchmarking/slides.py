@@ -6,6 +6,7 @@ from pptx.enum.text import PP_ALIGN
 import json
 
 import benchmarking.plots as plts
+from utils.tracing import traced
 
 
 def load_benchmark_config(config_path):
@@ -20,6 +21,7 @@ def load_benchmark_config(config_path):
         return {}
 
 
+@traced("slides.save_to_ppt")
 def save_to_ppt(slides, ppt_filename, plots_folder):
     prs = Presentation()
     prs.slide_width = Inches(13.33)
@@ -249,6 +251,7 @@ def add_per_stream_metric_charts(
             )
 
 
+@traced("slides.produce_slides")
 def produce_slides(df_hp, slides_config_path, file_name, plots_folder):
     config = load_benchmark_config(slides_config_path)
     if not config:
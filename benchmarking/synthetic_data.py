@@ -0,0 +1,182 @@
+from typing import Optional
+
+import numpy as np
+
+VTUNE_FUNCTION_NAMES = [
+    "main",
+    "avcodec_send_packet",
+    "avcodec_receive_frame",
+    "decode_receive_frame_internal",
+    "ff_decode_receive_frame",
+    "h264_decode_frame",
+    "decode_nal_units",
+    "ff_h264_execute_decode_slices",
+    "decode_slice",
+    "ff_h264_decode_mb_cabac",
+    "ff_h264_decode_mb_cavlc",
+    "decode_cabac_residual_nondc",
+    "ff_h264_hl_decode_mb",
+    "hl_motion_420",
+    "mc_part_std",
+    "ff_h264_filter_mb",
+    "ff_h264_export_mvs",
+    "av_read_frame",
+    "ff_thread_decode_frame",
+    "memcpy",
+    "[Outside any known module]",
+]
+
+VTUNE_MODULES = ["extractor4", "libavcodec.so.62", "libavformat.so.62", "libc.so.6"]
+
+
+def generate_vtune_topdown_csv(
+    output_path: str,
+    rows: int = 500_000,
+    max_depth: int = 60,
+    seed: int = 0,
+) -> str:
+    """Write a deterministic VTune-format top-down CSV (tab-separated).
+
+    The first row is the "Total" root, every following row is indented by two
+    spaces per level like `vtune -report top-down -format csv` output.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Random walk over stack depth: mostly descend, return a few frames at a time
+    depth = np.zeros(rows, dtype=np.int64)
+    go_deeper = rng.random(rows) < 0.7
+    pop_frames = rng.geometric(0.35, rows)
+    for row in range(1, rows):
+        previous = depth[row - 1]
+        if go_deeper[row] and previous < max_depth:
+            depth[row] = previous + 1
+        else:
+            # Never return above the root's children
+            depth[row] = max(1, previous + 1 - pop_frames[row])
+
+    self_time = np.round(rng.exponential(0.05, rows), 3)
+    self_time[0] = 0.0
+
+    # Inclusive time: sum of self time over the contiguous pre-order subtree
+    total_time = self_time.copy()
+    stack = []
+    for row in range(rows - 1, -1, -1):
+        while stack and depth[stack[-1]] > depth[row]:
+            child = stack.pop()
+            if depth[child] == depth[row] + 1:
+                total_time[row] += total_time[child]
+        stack.append(row)
+    total_percent = 100.0 * total_time / max(total_time[0], 1e-9)
+
+    names = rng.integers(0, len(VTUNE_FUNCTION_NAMES), rows)
+    modules = rng.integers(0, len(VTUNE_MODULES), rows)
+
+    with open(output_path, "w", encoding="utf-8") as output:
+        output.write("Function Stack\tCPU Time:Total\tCPU Time:Self\tModule\n")
+        output.write(f"Total\t100.0\t0\t[Unknown]\n")
+        lines = []
+        for row in range(1, rows):
+            lines.append(
+                f"{'  ' * depth[row]}{VTUNE_FUNCTION_NAMES[names[row]]}\t"
+                f"{total_percent[row]:.2f}\t{self_time[row]:.3f}\t"
+                f"{VTUNE_MODULES[modules[row]]}\n"
+            )
+        output.writelines(lines)
+
+    return output_path
+
+
+def synthetic_motion_vectors(
+    frame: int,
+    width: int = 1920,
+    height: int = 1080,
+    method_id: int = 4,
+    seed: int = 0,
+    split_fraction: float = 0.25,
+) -> np.ndarray:
+    """Deterministic `AVMotionVector`-like records of one inter frame.
+
+    A 16x16 macroblock grid, `split_fraction` of it split into 8x8 blocks,
+    with a slow camera pan, one object moving across the picture and noise.
+    Motion is in quarter pixels (`motion_scale` 4) and, as in FFmpeg,
+    `src = dst + motion / motion_scale`.
+    """
+    from video_generation.mv_stream import MV_RECORD_DTYPE
+
+    rng = np.random.default_rng([seed, frame])
+    ys, xs = np.mgrid[0 : height // 16, 0 : width // 16]
+    x0, y0 = xs.ravel() * 16, ys.ravel() * 16
+    split = rng.random(len(x0)) < split_fraction
+
+    # Whole macroblocks, then the four 8x8 quarters of the split ones
+    quarter_x = np.repeat(x0[split], 4) + np.tile([0, 8, 0, 8], split.sum())
+    quarter_y = np.repeat(y0[split], 4) + np.tile([0, 0, 8, 8], split.sum())
+    block_x = np.concatenate([x0[~split], quarter_x])
+    block_y = np.concatenate([y0[~split], quarter_y])
+    size = np.concatenate([np.full((~split).sum(), 16), np.full(len(quarter_x), 8)])
+    order = np.lexsort((block_x, block_y))
+    block_x, block_y, size = block_x[order], block_y[order], size[order]
+
+    dx = np.full(len(size), 2.0 * np.sin(frame / 50))
+    dy = np.full(len(size), np.cos(frame / 70))
+    object_x = (frame * 6) % width
+    object_y = height // 3
+    inside = (abs(block_x - object_x) < width // 8) & (abs(block_y - object_y) < 96)
+    dx[inside] += 6.0
+    dy[inside] -= 2.0
+    dx += rng.normal(0, 0.5, len(size))
+    dy += rng.normal(0, 0.5, len(size))
+
+    records = np.zeros(len(size), dtype=MV_RECORD_DTYPE)
+    records["frame"] = frame
+    records["method_id"] = method_id
+    records["source"] = np.where(rng.random(len(size)) < 0.9, -1, 1)
+    records["w"] = records["h"] = size
+    records["dst_x"] = block_x + size // 2
+    records["dst_y"] = block_y + size // 2
+    records["motion_scale"] = 4
+    records["motion_x"] = np.round(dx * 4)
+    records["motion_y"] = np.round(dy * 4)
+    records["src_x"] = records["dst_x"] + records["motion_x"] // 4
+    records["src_y"] = records["dst_y"] + records["motion_y"] // 4
+    return records
+
+
+def generate_motion_vector_csv(
+    output_path: str,
+    frames: int = 300,
+    width: int = 1920,
+    height: int = 1080,
+    vectors_per_frame: Optional[int] = None,
+    method_id: int = 4,
+    seed: int = 0,
+    gop: int = 30,
+) -> str:
+    """Write a deterministic motion vector CSV in the MotionVectorWriter format.
+
+    Every `gop`-th frame is intra and has no rows. `vectors_per_frame`
+    splits more macroblocks (up to four vectors each) or keeps a random
+    subset of blocks; by default a quarter of the macroblocks are split.
+    """
+    from video_generation.mv_stream import MV_CSV_COLUMNS, format_csv_rows
+
+    macroblocks = (width // 16) * (height // 16)
+    split_fraction = 0.25
+    if vectors_per_frame is not None:
+        split_fraction = min(max((vectors_per_frame / macroblocks - 1) / 3, 0.0), 1.0)
+
+    rng = np.random.default_rng(seed)
+    with open(output_path, "wb") as output:
+        output.write((",".join(MV_CSV_COLUMNS) + "\n").encode())
+        for frame in range(frames):
+            if frame % gop == 0:
+                continue
+            records = synthetic_motion_vectors(
+                frame, width, height, method_id, seed, split_fraction
+            )
+            if vectors_per_frame is not None and len(records) > vectors_per_frame:
+                keep = rng.choice(len(records), vectors_per_frame, replace=False)
+                records = records[np.sort(keep)]
+            output.write(format_csv_rows(records))
+
+    return output_path
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import time
+
+import benchmarking.synthetic_data as synthetic
+import utils.vtune_hotspots_plot as vtune
+
+
+def benchmark_vtune_tree(rows, max_depth=60, seed=0):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file = os.path.join(tmp_dir, "topdown.csv")
+        html_file = os.path.join(tmp_dir, "call_tree_static.html")
+        lazy_html_file = os.path.join(tmp_dir, "call_tree.html")
+
+        synthetic.generate_vtune_topdown_csv(csv_file, rows, max_depth, seed)
+
+        start = time.perf_counter()
+        tree = vtune.parse_vtune_tree(csv_file)
+        parse_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vtune.generate_complete_html(tree, html_file)
+        html_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vtune.generate_lazy_html(tree, lazy_html_file)
+        lazy_html_seconds = time.perf_counter() - start
+
+        return {
+            "rows": rows,
+            "max_depth": int(tree.depth.max()) if len(tree) else 0,
+            "parse_s": parse_seconds,
+            "html_s": html_seconds,
+            "html_mb": os.path.getsize(html_file) / (1024 * 1024),
+            "lazy_html_s": lazy_html_seconds,
+            "lazy_html_mb": os.path.getsize(lazy_html_file) / (1024 * 1024),
+        }
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    max_depth = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+
+    print(f"Benchmarking VTune call tree with {rows:,} synthetic rows...")
+    result = benchmark_vtune_tree(rows, max_depth)
+    print(f"  Tree depth:      {result['max_depth']}")
+    print(f"  Parse:           {result['parse_s']:.2f} s")
+    print(f"  Static HTML:     {result['html_s']:.2f} s, {result['html_mb']:.1f} MB")
+    print(
+        f"  Lazy JSON HTML:  {result['lazy_html_s']:.2f} s, "
+        f"{result['lazy_html_mb']:.1f} MB"
+    )
@@ -1,13 +1,20 @@
+import hashlib
+import json
 import os
 import time
 from atlassian import Confluence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import glob
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import re
+import tempfile
 from pathlib import Path
 from jinja2 import Template
 
+from utils.tracing import span, traced
+
 
 class ConfluenceReportGenerator:
     def __init__(
@@ -18,14 +25,39 @@ class ConfluenceReportGenerator:
         space_key: str,
         main_page_title: str,
         project_root: Path,
+        upload_workers: int = 4,
+        page_workers: int = 4,
     ) -> None:
+        # One keep-alive session shared by all requests, pooled for the uploads
+        # of every page published concurrently in batch mode
+        self.upload_workers = upload_workers
+        self.page_workers = page_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=upload_workers * page_workers
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
         self.confluence = Confluence(
-            url=confluence_url, username=username, password=api_token
+            url=confluence_url,
+            username=username,
+            password=api_token,
+            session=self.session,
         )
 
         self.call_tree_line_limit = 100
         self.html_preview_limit = 2000
-        self.attachment_wait_time = 5
+        self.attachment_page_size = 200
+        self.attachment_poll_interval = 0.25
+        self.attachment_poll_max_interval = 4
+        self.attachment_poll_timeout = 60
+
+        # Attachment text fetched during this publish, keyed by
+        # (page id, filename, version); seeded from local files on upload
+        self.attachment_cache = {}
+        self.attachment_index = {}
+        self.local_attachments = {}
 
         self.space_key = space_key
         self.main_page_title = main_page_title
@@ -39,6 +71,9 @@ class ConfluenceReportGenerator:
         self.main_dashboard_template = (
             self.templates / "main_dashboard_template.html.jinja"
         )
+        self.main_dashboard_summary_template = (
+            self.templates / "main_dashboard_summary_template.html.jinja"
+        )
         self.plots_subdir = "plots"
         self.vtune_subdir = "vtune_results"
 
@@ -72,6 +107,7 @@ class ConfluenceReportGenerator:
 
         self.detailed_report_vtune = [
             ("Profiler Results", "vtune_hotspots.png", self.vtune_subdir),
+            ("Flame Graph", "vtune_flamegraph.svg", self.vtune_subdir),
         ]
 
         self.main_dashboard_plots = [
@@ -94,6 +130,13 @@ class ConfluenceReportGenerator:
     def __get_page_by_title__(self):
         return self.confluence.get_page_by_title(self.space_key, self.main_page_title)
 
+    def __get_dashboard_id__(self):
+        dashboard_page = self.__get_page_by_title__()
+        if not dashboard_page:
+            print(f"[ERROR] Main dashboard page '{self.main_page_title}' not found.")
+            raise Exception(f"Main dashboard page '{self.main_page_title}' not found.")
+        return dashboard_page["id"]
+
     def __collect_files__(self, results_dir, file_specs, prefix=""):
         file_list = []
 
@@ -129,26 +172,178 @@ class ConfluenceReportGenerator:
             image_list.append({"title": title, "filename": fname})
         return image_list
 
+    def __remember_attachment__(self, page_id, attachment):
+        # Listings can lag behind uploads, so never replace a newer version
+        key = (page_id, attachment["title"])
+        version = self.__attachment_version__(attachment)
+        known = self.attachment_index.get(key)
+        if known is None or self.__attachment_version__(known) <= version:
+            self.attachment_index[key] = attachment
+
+    def __attachment_version__(self, attachment):
+        return attachment.get("version", {}).get("number", 0)
+
+    def __lookup_attachment__(self, page_id, file_name):
+        key = (page_id, file_name)
+        if key not in self.attachment_index:
+            attachments = self.confluence.get_attachments_from_content(
+                page_id, filename=file_name, expand="version,metadata"
+            )
+            results = attachments.get("results", [])
+            self.attachment_index[key] = results[0] if results else None
+        return self.attachment_index[key]
+
     def __get_attachment_content__(self, page_id, file_name):
-        attachments = self.confluence.get_attachments_from_content(
-            page_id, filename=file_name
-        )
-        if attachments["size"] == 0:
+        att = self.__lookup_attachment__(page_id, file_name)
+        if att is None:
             return None
 
-        att = attachments["results"][0]
-        if "download" not in att["_links"]:
+        key = (page_id, file_name, self.__attachment_version__(att))
+        if key in self.attachment_cache:
+            return self.attachment_cache[key]
+
+        local = self.local_attachments.get((page_id, file_name))
+        if local and local[1] == self.__attachment_digest__(att):
+            # The attachment is the file we uploaded, no need to download it
+            with open(local[0], "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        elif "download" in att["_links"]:
+            url = self.confluence.url + att["_links"]["download"]
+            resp = self.session.get(url)
+            if not resp.ok:
+                return None
+            content = resp.text
+        else:
             return None
 
-        url = self.confluence.url + att["_links"]["download"]
-        resp = requests.get(
-            url, auth=(self.confluence.username, self.confluence.password)
+        self.attachment_cache[key] = content.strip() or None
+        return self.attachment_cache[key]
+
+    def __file_digest__(self, filepath):
+        sha256 = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(chunk)
+        return f"sha256:{sha256.hexdigest()}"
+
+    def __attachment_digest__(self, attachment):
+        # The content hash is stored in the attachment comment on upload
+        return attachment.get("metadata", {}).get("comment") or attachment.get(
+            "extensions", {}
+        ).get("comment")
+
+    def __list_attachments__(self, page_id):
+        attachments = {}
+        start = 0
+
+        while True:
+            response = self.confluence.get_attachments_from_content(
+                page_id,
+                start=start,
+                limit=self.attachment_page_size,
+                expand="version,metadata",
+            )
+            results = response.get("results", [])
+            for att in results:
+                attachments[att["title"]] = att
+                self.__remember_attachment__(page_id, att)
+
+            start += len(results)
+            if not results or "next" not in response.get("_links", {}):
+                return attachments
+
+    def __upload_attachment__(
+        self, page_id, filepath, attachment_name, existing, digest
+    ):
+        extension = os.path.splitext(filepath)[-1]
+        content_type = self.confluence.content_types.get(
+            extension, "application/binary"
         )
 
-        if resp.ok and resp.text.strip():
-            return resp.text.strip()
+        path = f"rest/api/content/{page_id}/child/attachment"
+        if existing:
+            path += f"/{existing['id']}/data"
 
-        return None
+        with open(filepath, "rb") as f, span(
+            "confluence.upload_attachment",
+            file=attachment_name,
+            bytes=os.fstat(f.fileno()).st_size,
+        ):
+            response = self.confluence.post(
+                path,
+                data={"comment": digest, "minorEdit": "true"},
+                headers={"X-Atlassian-Token": "no-check", "Accept": "application/json"},
+                files={"file": (attachment_name, f, content_type)},
+            )
+
+        # New attachments come back wrapped in "results", updated ones bare
+        if isinstance(response, dict):
+            for att in response.get("results", [response]):
+                if "title" in att:
+                    self.__remember_attachment__(page_id, att)
+
+    @traced("confluence.upload_attachments")
+    def __upload_attachments__(self, page_id, files):
+        """Upload changed files concurrently; returns {attachment name: digest}."""
+        existing = self.__list_attachments__(page_id)
+
+        pending = {}
+        skipped = 0
+        for filepath, attachment_name, _ in files:
+            if attachment_name in pending:
+                continue
+            digest = self.__file_digest__(filepath)
+            self.local_attachments[(page_id, attachment_name)] = (filepath, digest)
+            current = existing.get(attachment_name)
+            if current and self.__attachment_digest__(current) == digest:
+                skipped += 1
+                continue
+            pending[attachment_name] = (filepath, current, digest)
+
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as pool:
+            futures = [
+                pool.submit(
+                    self.__upload_attachment__, page_id, filepath, name, current, digest
+                )
+                for name, (filepath, current, digest) in pending.items()
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+        print(
+            f"[DEBUG] Uploaded {len(pending)} attachment(s) to page {page_id}, "
+            f"skipped {skipped} unchanged."
+        )
+        return {name: digest for name, (_, _, digest) in pending.items()}
+
+    @traced("confluence.wait_for_attachments")
+    def __wait_for_attachments__(self, page_id, uploaded):
+        """Poll with backoff until the uploaded versions are listed on the page."""
+        delay = self.attachment_poll_interval
+        deadline = time.monotonic() + self.attachment_poll_timeout
+
+        while uploaded:
+            listed = self.__list_attachments__(page_id)
+            missing = [
+                name
+                for name, digest in uploaded.items()
+                if name not in listed
+                or self.__attachment_digest__(listed[name]) != digest
+            ]
+            if not missing:
+                return True
+
+            if time.monotonic() + delay > deadline:
+                print(
+                    f"[WARNING] Attachments not available after "
+                    f"{self.attachment_poll_timeout}s: {', '.join(missing)}"
+                )
+                return False
+
+            time.sleep(delay)
+            delay = min(delay * 2, self.attachment_poll_max_interval)
+
+        return True
 
     def __get_calltree_html_interactive__(self, page_id, file_name, add_macro=True):
         content = self.__get_attachment_content__(page_id, file_name)
@@ -158,6 +353,23 @@ class ConfluenceReportGenerator:
 
         return {"html": content, "add_macro": add_macro}
 
+    def __calltree_json_lines__(self, tree_data):
+        # Nodes are stored in pre-order, so depth follows from the parent index
+        strings = tree_data["strings"]
+        nodes = tree_data["nodes"]
+        depths = []
+        lines = []
+
+        for index in range(min(len(nodes) // 4, self.call_tree_line_limit)):
+            parent, name_id, cpu_total, cpu_self = nodes[4 * index : 4 * index + 4]
+            depth = depths[parent] + 1 if parent >= 0 else 0
+            depths.append(depth)
+            lines.append(
+                f"{'  ' * depth}{strings[name_id]} {cpu_total:.1f}% {cpu_self:.1f}s"
+            )
+
+        return lines
+
     def __get_calltree_html_non_interactive__(self, page_id, file_name):
         call_tree_data = self.__get_calltree_html_interactive__(
             page_id, file_name, add_macro=False
@@ -168,6 +380,14 @@ class ConfluenceReportGenerator:
 
         try:
             soup = BeautifulSoup(call_tree_data["html"], "html.parser")
+
+            tree_data = soup.find("script", class_="call-tree-data")
+            if tree_data:
+                tree_lines = self.__calltree_json_lines__(
+                    json.loads(tree_data.string)
+                )
+                return "\n".join(tree_lines)
+
             tree_container = soup.find("ul", class_="tree-root")
 
             if not tree_container:
@@ -195,6 +415,7 @@ class ConfluenceReportGenerator:
         except Exception:
             return call_tree_data["html"][: self.html_preview_limit]
 
+    @traced("confluence.update_page")
     def __update_page__(
         self,
         page_id,
@@ -315,26 +536,10 @@ class ConfluenceReportGenerator:
 
         return template.render(context)
 
-    def create_detailed_report_page(
-        self, results_dir, report_title, git_commit_url=None
+    @traced("confluence.detailed_report")
+    def __publish_detailed_report__(
+        self, parent_id, results_dir, report_title, git_commit_url=None
     ):
-        dashboard_page = self.__get_page_by_title__()
-        print("[DEBUG] Got dashboard page.")
-        if not dashboard_page:
-            print(f"[ERROR] Main dashboard page '{self.main_page_title}' not found.")
-            raise Exception(f"Main dashboard page '{self.main_page_title}' not found.")
-        parent_id = dashboard_page["id"]
-
-        print(f"[DEBUG] git_commit_url in detailed report: {git_commit_url}")
-
-        if parent_id:
-            children = self.confluence.get_child_pages(parent_id)
-            report_exists = any(child["title"] == report_title for child in children)
-
-            if report_exists:
-                print(f"[INFO] Report '{report_title}' already exists.")
-                return
-
         # region create page
         create_kwargs = dict(
             space=self.space_key,
@@ -361,10 +566,13 @@ class ConfluenceReportGenerator:
         all_files.extend(self.__collect_files__(results_dir, self.vtune_files))
         all_files.extend(self.__collect_glob_files__(results_dir, self.glob_patterns))
 
-        for filepath, attachment_name, _ in all_files:
-            self.confluence.attach_file(
-                filename=filepath, page_id=page_id, name=attachment_name
-            )
+        with span(
+            "confluence.report_attachments",
+            file=os.path.basename(results_dir.rstrip("/")),
+            files=len(all_files),
+        ):
+            uploaded = self.__upload_attachments__(page_id, all_files)
+            self.__wait_for_attachments__(page_id, uploaded)
 
         body = self.__generate_detailed_report_body__(
             plots_dir, page_id, git_commit_url=git_commit_url
@@ -373,17 +581,36 @@ class ConfluenceReportGenerator:
         print("[DEBUG] Detailed report body being sent to Confluence")
         self.__update_page__(page_id, report_title, body)
         print(f"[INFO] Created detailed report page '{report_title}' (id={page_id})")
+        return page_id
+
+    def create_detailed_report_page(
+        self, results_dir, report_title, git_commit_url=None
+    ):
+        parent_id = self.__get_dashboard_id__()
+        print("[DEBUG] Got dashboard page.")
 
+        print(f"[DEBUG] git_commit_url in detailed report: {git_commit_url}")
+
+        if parent_id:
+            children = self.confluence.get_child_pages(parent_id)
+            report_exists = any(child["title"] == report_title for child in children)
+
+            if report_exists:
+                print(f"[INFO] Report '{report_title}' already exists.")
+                return
+
+        return self.__publish_detailed_report__(
+            parent_id, results_dir, report_title, git_commit_url
+        )
+
+    @traced("confluence.dashboard")
     def update_main_dashboard_summary(
         self,
         results_dirs,
         git_commits=None,
         run_titles=None,
     ):
-        dashboard_page = self.__get_page_by_title__()
-        if not dashboard_page:
-            raise Exception(f"Main dashboard page '{self.main_page_title}' not found.")
-        dashboard_id = dashboard_page["id"]
+        dashboard_id = self.__get_dashboard_id__()
 
         all_files = []
 
@@ -398,14 +625,9 @@ class ConfluenceReportGenerator:
             all_files.extend(self.__collect_files__(results_dir, self.additional_files, prefix))
             all_files.extend(self.__collect_files__(results_dir, self.vtune_files, prefix))
 
-        for fpath, fname, _ in all_files:
-            print(
-                f"[DEBUG] Attaching file: {fpath} as {fname} to dashboard {dashboard_id}"
-            )
-            self.confluence.attach_file(
-                filename=fpath, page_id=dashboard_id, name=fname
-            )
-        time.sleep(self.attachment_wait_time)
+        print(f"[DEBUG] Attaching {len(all_files)} file(s) to dashboard {dashboard_id}")
+        uploaded = self.__upload_attachments__(dashboard_id, all_files)
+        self.__wait_for_attachments__(dashboard_id, uploaded)
 
         body = self.__get_main_dashboard_body__(
             dashboard_id, results_dirs, git_commits, run_titles
@@ -415,6 +637,105 @@ class ConfluenceReportGenerator:
         self.__update_page__(dashboard_id, self.main_page_title, body)
         print(f"[DEBUG] Dashboard page update complete.")
 
+    @traced("confluence.dashboard_summary")
+    def update_dashboard_from_summary(
+        self,
+        results_dirs,
+        git_commits=None,
+        run_titles=None,
+        report_titles=None,
+    ):
+        """Rebuild the dashboard from a key metrics table and trend charts.
+
+        Only the summary CSV and charts are attached to the dashboard, the
+        per-run files stay on the detailed report pages.
+        """
+        # Pulls in pandas, matplotlib and seaborn, only needed for the summary
+        import publishing.dashboard_summary as dashboard_summary
+
+        dashboard_id = self.__get_dashboard_id__()
+
+        with tempfile.TemporaryDirectory() as summary_dir:
+            runs, charts = dashboard_summary.write_dashboard_summary(
+                results_dirs, summary_dir, run_titles, git_commits, report_titles
+            )
+
+            files = [
+                (os.path.join(summary_dir, filename), filename, title)
+                for title, filename in [(None, dashboard_summary.SUMMARY_FILE)]
+                + charts
+            ]
+            uploaded = self.__upload_attachments__(dashboard_id, files)
+            self.__wait_for_attachments__(dashboard_id, uploaded)
+
+        with open(self.main_dashboard_summary_template, "r") as f:
+            template = Template(f.read())
+
+        body = template.render(
+            runs=runs, charts=charts, summary_file=dashboard_summary.SUMMARY_FILE
+        )
+
+        print(f"[DEBUG] Updating dashboard page {dashboard_id} with summary body...")
+        self.__update_page__(dashboard_id, self.main_page_title, body)
+        print(f"[DEBUG] Dashboard page update complete.")
+
+    @traced("confluence.publish_batch")
+    def publish_batch(self, results_dirs, git_commits=None, run_titles=None):
+        """Publish many results dirs, then rebuild the dashboard once.
+
+        Missing detailed report pages are created concurrently by up to
+        `page_workers` threads; pages that already exist are left as they are.
+        """
+        dashboard_id = self.__get_dashboard_id__()
+        existing = {
+            child["title"] for child in self.confluence.get_child_pages(dashboard_id)
+        }
+
+        if git_commits is None:
+            git_commits = [None] * len(results_dirs)
+
+        report_titles = [self.generate_report_title(d) for d in results_dirs]
+
+        pending = {}
+        for results_dir, report_title, git_commit in zip(
+            results_dirs, report_titles, git_commits
+        ):
+            if report_title not in existing and report_title not in pending:
+                pending[report_title] = (results_dir, git_commit)
+
+        print(
+            f"[INFO] Publishing {len(results_dirs)} run(s): "
+            f"{len(pending)} new report page(s), "
+            f"{len(results_dirs) - len(pending)} already published."
+        )
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.page_workers) as pool:
+            futures = {
+                pool.submit(
+                    self.__publish_detailed_report__,
+                    dashboard_id,
+                    results_dir,
+                    report_title,
+                    git_commit,
+                ): report_title
+                for report_title, (results_dir, git_commit) in pending.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[ERROR] Failed to publish '{futures[future]}': {e}")
+                    failed.append(futures[future])
+
+        self.update_dashboard_from_summary(
+            results_dirs,
+            git_commits,
+            run_titles,
+            [None if title in failed else title for title in report_titles],
+        )
+        return failed
+
     def generate_report_title(self, directory):
         name = os.path.basename(directory.rstrip(os.sep))
         match = re.search(r"(\d{8})_(\d{4})", name)
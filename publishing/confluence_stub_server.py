@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Confluence REST endpoints used by the publisher.
+
+Pages and attachments are kept in memory. Point CONFLUENCE_URL at the
+printed address to dry-run publishing without touching the real space:
+
+    python -m publishing.confluence_stub_server 8090 SPACE "Main Dashboard"
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class ConfluenceStubState:
+    def __init__(self, space_key, main_page_title, visibility_delay=0.0):
+        self.lock = threading.Lock()
+        self.space_key = space_key
+        self.visibility_delay = visibility_delay
+        self.pages = {}
+        self.attachments = {}
+        self.next_id = 1000
+        self.requests = Counter()
+
+        self.create_page(main_page_title, "<p>Dashboard</p>", None)
+
+    def new_id(self):
+        self.next_id += 1
+        return str(self.next_id)
+
+    def create_page(self, title, body, parent_id):
+        page_id = self.new_id()
+        self.pages[page_id] = {
+            "id": page_id,
+            "type": "page",
+            "title": title,
+            "space": {"key": self.space_key},
+            "body": body,
+            "version": 1,
+            "parent_id": parent_id,
+        }
+        self.attachments[page_id] = {}
+        return self.page_json(page_id)
+
+    def page_json(self, page_id):
+        page = self.pages[page_id]
+        return {
+            "id": page_id,
+            "type": "page",
+            "title": page["title"],
+            "space": page["space"],
+            "version": {"number": page["version"]},
+            "body": {"storage": {"value": page["body"], "representation": "storage"}},
+            "_links": {"webui": f"/pages/{page_id}"},
+        }
+
+    def attachment_json(self, page_id, attachment):
+        return {
+            "id": attachment["id"],
+            "type": "attachment",
+            "title": attachment["title"],
+            "version": {"number": attachment["version"]},
+            "metadata": {
+                "comment": attachment["comment"],
+                "mediaType": attachment["media_type"],
+            },
+            "extensions": {
+                "comment": attachment["comment"],
+                "fileSize": len(attachment["data"]),
+            },
+            "_links": {
+                "download": f"/download/attachments/{page_id}/{attachment['title']}"
+                f"?version={attachment['version']}",
+            },
+        }
+
+    def visible_attachments(self, page_id):
+        now = time.monotonic()
+        return [
+            att
+            for att in self.attachments.get(page_id, {}).values()
+            if att["visible_at"] <= now
+        ]
+
+    def store_attachment(self, page_id, title, data, media_type, comment):
+        attachments = self.attachments[page_id]
+        attachment = attachments.get(title)
+        if attachment is None:
+            attachment = {"id": f"att{self.new_id()}", "title": title, "version": 0}
+            attachments[title] = attachment
+        attachment.update(
+            data=data,
+            media_type=media_type,
+            comment=comment,
+            version=attachment["version"] + 1,
+            visible_at=time.monotonic() + self.visibility_delay,
+        )
+        return self.attachment_json(page_id, attachment)
+
+
+class ConfluenceStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def route(self, method):
+        url = urlparse(self.path)
+        path = unquote(url.path).rstrip("/")
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.state.requests[(method, re.sub(r"\d+", "{id}", path))] += 1
+        return path, params
+
+    def do_GET(self):
+        path, params = self.route("GET")
+        state = self.state
+
+        with state.lock:
+            if path == "/rest/api/content":
+                results = [
+                    state.page_json(pid)
+                    for pid, page in state.pages.items()
+                    if page["title"] == params.get("title")
+                ]
+                return self.send_json({"results": results, "size": len(results)})
+
+            match = re.fullmatch(r"/rest/api/content/(\w+)/child/page", path)
+            if match:
+                results = [
+                    state.page_json(pid)
+                    for pid, page in state.pages.items()
+                    if page["parent_id"] == match.group(1)
+                ]
+                return self.send_json({"results": results, "size": len(results)})
+
+            match = re.fullmatch(r"/rest/api/content/(\w+)/child/attachment", path)
+            if match:
+                page_id = match.group(1)
+                if page_id not in state.pages:
+                    return self.send_json({"message": "not found"}, 404)
+                attachments = state.visible_attachments(page_id)
+                if "filename" in params:
+                    attachments = [
+                        a for a in attachments if a["title"] == params["filename"]
+                    ]
+                start = int(params.get("start", 0))
+                limit = int(params.get("limit", 50))
+                page = attachments[start : start + limit]
+                links = {}
+                if start + limit < len(attachments):
+                    links["next"] = f"{path}?start={start + limit}&limit={limit}"
+                return self.send_json(
+                    {
+                        "results": [state.attachment_json(page_id, a) for a in page],
+                        "size": len(page),
+                        "_links": links,
+                    }
+                )
+
+            match = re.fullmatch(r"/rest/api/content/(\w+)", path)
+            if match and match.group(1) in state.pages:
+                return self.send_json(state.page_json(match.group(1)))
+
+            match = re.fullmatch(r"/download/attachments/(\w+)/(.+)", path)
+            if match:
+                attachment = state.attachments.get(match.group(1), {}).get(
+                    match.group(2)
+                )
+                if attachment:
+                    self.send_response(200)
+                    self.send_header("Content-Type", attachment["media_type"])
+                    self.send_header("Content-Length", str(len(attachment["data"])))
+                    self.end_headers()
+                    self.wfile.write(attachment["data"])
+                    return
+
+        self.send_json({"message": "not found"}, 404)
+
+    def do_POST(self):
+        path, _ = self.route("POST")
+        body = self.read_body()
+        state = self.state
+
+        with state.lock:
+            if path == "/rest/api/content":
+                data = json.loads(body)
+                ancestors = data.get("ancestors") or [{}]
+                return self.send_json(
+                    state.create_page(
+                        data["title"],
+                        data.get("body", {}).get("storage", {}).get("value", ""),
+                        ancestors[-1].get("id"),
+                    )
+                )
+
+            match = re.fullmatch(
+                r"/rest/api/content/(\w+)/child/attachment(?:/\w+/data)?", path
+            )
+            if match and match.group(1) in state.pages:
+                fields = self.parse_multipart(body)
+                filename, data, media_type = fields["file"]
+                comment = fields.get("comment", (None, b"", None))[1].decode("utf-8")
+                attachment = state.store_attachment(
+                    match.group(1), filename, data, media_type, comment
+                )
+                return self.send_json({"results": [attachment], "size": 1})
+
+        self.send_json({"message": "not found"}, 404)
+
+    def do_PUT(self):
+        path, _ = self.route("PUT")
+        body = self.read_body()
+        state = self.state
+
+        with state.lock:
+            match = re.fullmatch(r"/rest/api/content/(\w+)", path)
+            if match and match.group(1) in state.pages:
+                data = json.loads(body)
+                page = state.pages[match.group(1)]
+                page["title"] = data["title"]
+                page["body"] = data["body"]["storage"]["value"]
+                page["version"] = data["version"]["number"]
+                return self.send_json(state.page_json(match.group(1)))
+
+        self.send_json({"message": "not found"}, 404)
+
+    def parse_multipart(self, body):
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+        message = BytesParser(policy=HTTP).parsebytes(header + body)
+        fields = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = (
+                part.get_filename(),
+                part.get_payload(decode=True) or b"",
+                part.get_content_type(),
+            )
+        return fields
+
+
+def start_stub_server(
+    space_key="TEST", main_page_title="Main Dashboard", port=0, visibility_delay=0.0
+):
+    """Start the stand-in server in a background thread.
+
+    Returns the server (call `shutdown()` to stop it), its state and base URL.
+    """
+    state = ConfluenceStubState(space_key, main_page_title, visibility_delay)
+    handler = type("Handler", (ConfluenceStubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, state, url
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8090
+    space_key = sys.argv[2] if len(sys.argv) > 2 else "TEST"
+    main_page_title = sys.argv[3] if len(sys.argv) > 3 else "Main Dashboard"
+
+    server, state, url = start_stub_server(space_key, main_page_title, port)
+    print(f"Confluence stand-in listening on {url} (space {space_key})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        for (method, path), count in sorted(state.requests.items()):
+            print(f"{count:6d}  {method:4s} {path}")
@@ -0,0 +1,168 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+
+SUMMARY_FILE = "dashboard_summary.csv"
+
+# (metric column, chart title, y label, file name)
+TREND_CHARTS = [
+    ("fps", "Throughput Trend (1 Stream)", "FPS", "dashboard_trend_fps.png"),
+    (
+        "time_per_frame",
+        "Latency Trend (1 Stream)",
+        "Time/Frame (ms)",
+        "dashboard_trend_timeperframe.png",
+    ),
+    ("cpu", "CPU Usage Trend (1 Stream)", "CPU (%)", "dashboard_trend_cpu.png"),
+    (
+        "memory",
+        "Memory Usage Trend (1 Stream)",
+        "Memory (KB)",
+        "dashboard_trend_memory.png",
+    ),
+]
+
+METRICS = ["time_per_frame", "fps", "cpu", "memory"]
+
+
+def run_label(results_dir: str) -> str:
+    name = os.path.basename(results_dir.rstrip(os.sep))
+    match = re.search(r"(\d{8})_(\d{4})", name)
+    if match:
+        d, t = match.groups()
+        return f"{d[:4]}-{d[4:6]}-{d[6:]} {t[:2]}:{t[2:4]}"
+    return name
+
+
+def load_run_results(results_dir: str, plots_subdir: str = "plots") -> pd.DataFrame:
+    csv_file = os.path.join(results_dir, plots_subdir, "benchmark_results.csv")
+    if not os.path.isfile(csv_file):
+        return pd.DataFrame()
+    return pd.read_csv(csv_file, dtype={"high_profile": str})
+
+
+def build_summary(
+    results_dirs: List[str],
+    run_titles: Optional[List[str]] = None,
+    git_commits: Optional[List[str]] = None,
+    report_titles: Optional[List[str]] = None,
+) -> Tuple[List[Dict], pd.DataFrame]:
+    """Key metrics per run and single-stream metrics per (run, method).
+
+    The key metrics are those of the fastest method at the lowest stream
+    count, plus the best throughput at the highest stream count.
+    """
+    count = len(results_dirs)
+    run_titles = run_titles or [run_label(d) for d in results_dirs]
+    git_commits = git_commits or [None] * count
+    report_titles = report_titles or [None] * count
+
+    runs = []
+    method_frames = []
+    previous_fps = None
+
+    for index, results_dir in enumerate(results_dirs):
+        run = {
+            "run": run_titles[index],
+            "results_dir": os.path.basename(results_dir.rstrip(os.sep)),
+            "git_commit": git_commits[index],
+            "report_title": report_titles[index],
+            "best_method": None,
+            "fps": None,
+            "fps_change": None,
+            "time_per_frame": None,
+            "cpu": None,
+            "memory": None,
+            "max_streams": None,
+            "max_streams_fps": None,
+        }
+
+        df = load_run_results(results_dir)
+        if not df.empty:
+            single = df[df["streams"] == df["streams"].min()]
+            best = single.loc[single["fps"].idxmax()]
+            widest = df[df["streams"] == df["streams"].max()]
+
+            run.update(
+                best_method=best["method"],
+                fps=float(best["fps"]),
+                time_per_frame=float(best["time_per_frame"]),
+                cpu=float(best["cpu"]),
+                memory=float(best["memory"]),
+                max_streams=int(widest["streams"].iloc[0]),
+                max_streams_fps=float(widest["fps"].max()),
+            )
+            if previous_fps:
+                run["fps_change"] = 100.0 * (run["fps"] / previous_fps - 1.0)
+            previous_fps = run["fps"]
+
+            frame = single[["method"] + METRICS].copy()
+            frame.insert(0, "run_index", index)
+            method_frames.append(frame)
+
+        runs.append(run)
+
+    if method_frames:
+        methods = pd.concat(method_frames, ignore_index=True)
+    else:
+        methods = pd.DataFrame(columns=["run_index", "method"] + METRICS)
+
+    return runs, methods
+
+
+def plot_trend(
+    methods: pd.DataFrame,
+    run_titles: List[str],
+    metric: str,
+    title: str,
+    ylabel: str,
+    output_file: str,
+) -> None:
+    plt.figure(figsize=(16, 9))
+    sns.lineplot(data=methods, x="run_index", y=metric, hue="method", marker="o")
+    plt.title(title, fontsize=20, loc="left")
+    plt.xlabel("Run", fontsize=14)
+    plt.ylabel(ylabel, fontsize=14)
+    plt.xticks(range(len(run_titles)), run_titles, rotation=30, ha="right")
+    plt.legend(title="Method", loc="best", fontsize=12)
+    plt.tight_layout()
+    plt.savefig(output_file)
+    plt.close()
+
+
+def write_dashboard_summary(
+    results_dirs: List[str],
+    output_dir: str,
+    run_titles: Optional[List[str]] = None,
+    git_commits: Optional[List[str]] = None,
+    report_titles: Optional[List[str]] = None,
+) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+    """Write the summary CSV and trend charts; returns runs and (title, file) charts."""
+    os.makedirs(output_dir, exist_ok=True)
+    runs, methods = build_summary(results_dirs, run_titles, git_commits, report_titles)
+
+    pd.DataFrame(runs).to_csv(os.path.join(output_dir, SUMMARY_FILE), index=False)
+
+    charts = []
+    if not methods.empty:
+        titles = [run["run"] for run in runs]
+        for metric, title, ylabel, filename in TREND_CHARTS:
+            plot_trend(
+                methods,
+                titles,
+                metric,
+                title,
+                ylabel,
+                os.path.join(output_dir, filename),
+            )
+            charts.append((title, filename))
+
+    print(
+        f"[DEBUG] Dashboard summary of {len(runs)} run(s) with "
+        f"{len(charts)} trend chart(s) written to {output_dir}"
+    )
+    return runs, charts
@@ -5,8 +5,9 @@ from pathlib import Path
 from typing import Optional
 from datetime import datetime
 
-import publishing.publish_to_confluence as ptc
 from benchmarking.run_full_benchmark import BenchmarkRunner
+from utils.results_store import ResultsStore
+from utils.tracing import traced, tracing_enabled, write_trace
 
 
 class BenchmarkPublisher:
@@ -55,6 +56,7 @@ class BenchmarkPublisher:
             print(f"Error executing command: {e}")
             return False if not capture_output else None
 
+    @traced("publish.run_benchmark")
     def run_benchmark(self) -> str:
         print("DEBUG: Starting benchmark...")
         benchmarker = BenchmarkRunner(self.video, self.streams)
@@ -63,6 +65,7 @@ class BenchmarkPublisher:
         print("DEBUG: Benchmark script finished.")
         return self.__get_last_dir__(self.results_path)
 
+    @traced("publish.git")
     def publish_git(self) -> str:
         print(f"Committing and pushing all changes to git in {self.repo_path}...")
 
@@ -86,6 +89,7 @@ class BenchmarkPublisher:
 
         return f"{remote_url}/commit/{commit_hash}"
 
+    @traced("publish.confluence")
     def publish_confluence(
         self,
         first_dir: str,
@@ -116,6 +120,9 @@ class BenchmarkPublisher:
             print(f"Error: Latest results directory '{latest_dir}' does not exist.")
             return
 
+        # atlassian, bs4 and requests are only needed for the Confluence step.
+        import publishing.publish_to_confluence as ptc
+
         ptc.publish_to_confluence(
             first_dir, latest_dir, git_commit_run1, git_commit_run2, self.project_root
         )
@@ -126,10 +133,11 @@ class BenchmarkPublisher:
         if published_path.exists():
             print(f"Published directory already exists: {published_dir}")
         else:
-            published_path.parent.mkdir(parents=True, exist_ok=True)
-            print("Copying files to a published directory")
-            self.run_command(f"cp -r {latest_dir} {published_dir}")
-            print(f"Published results copied to: {published_dir}")
+            # Hardlinks into the published store instead of a deep copy
+            run_dir = str(latest_dir).rstrip("/")
+            store = ResultsStore(os.path.dirname(run_dir))
+            store.publish(run_dir, str(published_path.parent))
+            print(f"Published results linked to: {published_dir}")
 
     def run_all(self):
         print("Running full benchmark and publishing results...")
@@ -199,6 +207,9 @@ class BenchmarkPublisher:
             else:
                 print(f"Invalid step: {step}")
 
+        if tracing_enabled():
+            write_trace(self.__get_last_dir__(self.results_path))
+
 
 if __name__ == "__main__":
     publisher = BenchmarkPublisher()
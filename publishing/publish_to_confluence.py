@@ -1,10 +1,13 @@
 import os
+import sys
+from pathlib import Path
 
 from dotenv import load_dotenv
 
 load_dotenv(".env")
 
 import publishing.confluence_report_generator as conf
+from utils.tracing import write_trace
 
 
 def create_report(generator, directory, commit_url, latest=True):
@@ -25,7 +28,7 @@ def create_report(generator, directory, commit_url, latest=True):
     print(f"[DEBUG] Finished creating detailed report for {print_str.lower()} run.")
 
 
-def publish_to_confluence(first_dir, second_dir, first_git_commit, second_git_commit, project_root):
+def create_generator(project_root, page_workers=4):
     confluence_url = os.environ.get("CONFLUENCE_URL")
     space_key = os.environ.get("SPACE_KEY")
     main_page_title = os.environ.get("MAIN_PAGE_TITLE")
@@ -33,9 +36,46 @@ def publish_to_confluence(first_dir, second_dir, first_git_commit, second_git_co
     api_token = os.environ.get("CONFLUENCE_TOKEN")
 
     generator = conf.ConfluenceReportGenerator(
-        confluence_url, username, api_token, space_key, main_page_title, project_root
+        confluence_url,
+        username,
+        api_token,
+        space_key,
+        main_page_title,
+        project_root,
+        page_workers=page_workers,
     )
     print("[DEBUG] ConfluenceReportGenerator initialized.")
+    return generator
+
+
+def expand_results_dirs(paths):
+    # A results root (e.g. results/) stands for all of its run directories
+    results_dirs = []
+    for path in paths:
+        path = path.rstrip("/")
+        if not os.path.isdir(path):
+            print(f"[ERROR] results directory does not exist: {path}")
+            continue
+        if os.path.isdir(os.path.join(path, "plots")):
+            results_dirs.append(path)
+            continue
+        for name in sorted(os.listdir(path)):
+            run_dir = os.path.join(path, name)
+            if os.path.isdir(os.path.join(run_dir, "plots")):
+                results_dirs.append(run_dir)
+    return results_dirs
+
+
+def publish_batch(results_dirs, project_root, git_commits=None, page_workers=4):
+    generator = create_generator(project_root, page_workers)
+    failed = generator.publish_batch(results_dirs, git_commits)
+    published = len(results_dirs) - len(failed)
+    print(f"Batch publish finished: {published} run(s) published.")
+    return failed
+
+
+def publish_to_confluence(first_dir, second_dir, first_git_commit, second_git_commit, project_root):
+    generator = create_generator(project_root)
 
     # Debug and check existence for first run (first argument)
     old_dir = first_dir.rstrip("/")
@@ -51,4 +91,28 @@ def publish_to_confluence(first_dir, second_dir, first_git_commit, second_git_co
         git_commits=[first_git_commit, second_git_commit],
         run_titles=["First run", "Latest run"],
     )
-    print("Dashboard summary updated.")
\ No newline at end of file
+    print("Dashboard summary updated.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m publishing.publish_to_confluence "
+            "[--workers N] <results_dir_or_results_root> [...]"
+        )
+        sys.exit(1)
+
+    args = sys.argv[1:]
+    page_workers = 4
+    if args[0] == "--workers":
+        page_workers = int(args[1])
+        args = args[2:]
+
+    results_dirs = expand_results_dirs(args)
+    if not results_dirs:
+        print("[ERROR] No results directories to publish.")
+        sys.exit(1)
+
+    failed = publish_batch(results_dirs, Path.cwd(), page_workers=page_workers)
+    write_trace(results_dirs[-1])
+    sys.exit(1 if failed else 0)
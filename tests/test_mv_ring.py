@@ -0,0 +1,68 @@
+import threading
+
+import numpy as np
+
+from video_generation.mv_ring import (
+    AV_MOTION_VECTOR_DTYPE,
+    RING_FRAME_HEADER_DTYPE,
+    MotionVectorRingConsumer,
+    MotionVectorRingProducer,
+    message_size,
+)
+
+CAPACITY = 4096
+
+
+def records(count):
+    av = np.zeros(count, dtype=AV_MOTION_VECTOR_DTYPE)
+    av["dst_x"] = np.arange(count)
+    return av
+
+
+def consume(name, received):
+    consumer = MotionVectorRingConsumer(name)
+    try:
+        for frame, _, av, _ in consumer.frames(timeout=2.0):
+            received.append((frame, av.copy()))
+    finally:
+        consumer.close()
+
+
+def test_frame_larger_than_half_the_ring_after_wrap():
+    # One small frame moves the write offset past 0, so the next frame, which
+    # fills the whole ring, has to wrap around
+    largest = (CAPACITY - RING_FRAME_HEADER_DTYPE.itemsize) // 40
+    assert message_size(largest) == CAPACITY
+    frames = [(0, records(1)), (1, records(largest)), (2, records(largest))]
+
+    producer = MotionVectorRingProducer(capacity=CAPACITY)
+    received = []
+    consumer = threading.Thread(target=consume, args=(producer.name, received))
+    consumer.start()
+    writer = threading.Thread(
+        target=lambda: [producer.write(frame, av) for frame, av in frames],
+        daemon=True,
+    )
+    try:
+        writer.start()
+        writer.join(timeout=5.0)
+        assert not writer.is_alive(), "producer blocked on a frame that fits"
+        producer.close()
+        consumer.join(timeout=5.0)
+    finally:
+        producer.release()
+
+    assert [frame for frame, _ in received] == [0, 1, 2]
+    for (_, expected), (_, av) in zip(frames, received):
+        np.testing.assert_array_equal(av, expected)
+
+
+def test_non_blocking_producer_drops_frames_that_do_not_fit():
+    largest = (CAPACITY - RING_FRAME_HEADER_DTYPE.itemsize) // 40
+    producer = MotionVectorRingProducer(capacity=CAPACITY, block=False)
+    try:
+        assert producer.write(0, records(1))
+        assert not producer.write(1, records(largest))
+        assert int(producer.control["dropped"]) == 1
+    finally:
+        producer.release()
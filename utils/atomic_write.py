@@ -0,0 +1,33 @@
+"""Write a file under a temporary name and rename it into place.
+
+Readers never see a partly written file, and a file that is replaced gets
+a new inode instead of being truncated. Only the standard library is
+imported, so entry points within their import budget can use it.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+
+def temporary_path(path: str) -> str:
+    """Name to write `path` under before renaming it into place.
+
+    It keeps the extension, writers like cv2.VideoWriter and np.save pick
+    the format from it, and the process id, so concurrent writers of the
+    same file do not share it.
+    """
+    base, extension = os.path.splitext(path)
+    return f"{base}.tmp{os.getpid()}{extension}"
+
+
+@contextmanager
+def replace_on_write(path: str) -> Iterator[str]:
+    """Yield a temporary path to write `path` to; it replaces `path` on success."""
+    tmp = temporary_path(path)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
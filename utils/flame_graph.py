@@ -0,0 +1,218 @@
+import html
+import os
+import sys
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import utils.vtune_hotspots_plot as vtune
+
+FLAME_GRAPH_WIDTH = 1800
+FLAME_ROW_HEIGHT = 17
+FLAME_FONT_SIZE = 11
+# Approximate glyph width of the SVG font, used to truncate labels
+FLAME_CHAR_WIDTH = 6.5
+# Frames narrower than this (in pixels) are skipped along with their subtree
+FLAME_MIN_WIDTH = 0.5
+
+
+def parse_folded_stacks(folded_file: str) -> vtune.VTuneTree:
+    """Build a tree from folded stacks ("main;decode;memcpy 42" per line).
+
+    This is the format produced by stackcollapse scripts for perf, dtrace and
+    most other profilers. Totals are converted to % of all samples, self
+    values stay in samples.
+    """
+    path_ids: Dict[Tuple[int, str], int] = {}
+    path_parent: List[int] = []
+    path_names: List[str] = []
+    leaf_paths: List[int] = []
+    leaf_counts: List[float] = []
+
+    with open(folded_file, "r", encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\r\n").rpartition(" ")
+            if not stack:
+                continue
+            try:
+                samples = float(count)
+            except ValueError:
+                continue
+
+            path = -1
+            for name in stack.split(";"):
+                key = (path, name)
+                child = path_ids.get(key)
+                if child is None:
+                    child = len(path_parent)
+                    path_ids[key] = child
+                    path_parent.append(path)
+                    path_names.append(name)
+                path = child
+            leaf_paths.append(path)
+            leaf_counts.append(samples)
+
+    count = len(path_parent)
+    parents = np.asarray(path_parent, dtype=np.int64)
+    self_samples = np.bincount(
+        np.asarray(leaf_paths, dtype=np.int64),
+        weights=np.asarray(leaf_counts, dtype=np.float64),
+        minlength=count,
+    )
+
+    # Paths are created after their parent, so one reverse pass accumulates totals
+    total_samples = self_samples.copy()
+    for path in range(count - 1, -1, -1):
+        if parents[path] >= 0:
+            total_samples[parents[path]] += total_samples[path]
+
+    grand_total = total_samples[parents < 0].sum() if count else 0.0
+    order, parent, depth = vtune.preorder_paths(parents, total_samples)
+
+    return vtune.VTuneTree(
+        names=np.asarray(path_names, dtype=object)[order],
+        cpu_total=100.0 * total_samples[order] / max(grand_total, 1e-12),
+        cpu_self=self_samples[order],
+        level=depth.astype(np.int64),
+        depth=depth,
+        parent=parent,
+    )
+
+
+def load_profile_tree(profile_file: str) -> vtune.VTuneTree:
+    if profile_file.endswith((".folded", ".txt")):
+        return parse_folded_stacks(profile_file)
+    return vtune.parse_vtune_tree(vtune.resolve_topdown_csv(profile_file))
+
+
+def frame_color(name: str) -> str:
+    # Stable warm palette per function name, like the classic flame graph colors
+    h = zlib.crc32(name.encode("utf-8"))
+    red = 205 + h % 50
+    green = 80 + (h >> 8) % 130
+    blue = (h >> 16) % 55
+    return f"rgb({red},{green},{blue})"
+
+
+def frame_layout(
+    tree: vtune.VTuneTree, width: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute x offset and width (pixels) of every node in one pass.
+
+    Roots share the full width in proportion to their total; children are
+    laid out left to right inside their parent and clamped to its extent.
+    """
+    count = len(tree)
+    if count == 0:
+        return np.zeros(0), np.zeros(0)
+
+    roots_total = tree.cpu_total[tree.roots].sum()
+    scale = width / roots_total if roots_total > 0 else 0.0
+
+    x = [0.0] * count
+    w = [0.0] * count
+    # Next free x position and right edge inside each parent (slot count = roots)
+    cursor = [0.0] * (count + 1)
+    end = [0.0] * (count + 1)
+    end[count] = float(width)
+
+    totals = (tree.cpu_total * scale).tolist()
+    for index, parent in enumerate(tree.parent.tolist()):
+        slot = parent if parent >= 0 else count
+        start = cursor[slot]
+        node_width = max(min(totals[index], end[slot] - start), 0.0)
+        x[index] = start
+        w[index] = node_width
+        cursor[slot] = start + node_width
+        cursor[index] = start
+        end[index] = start + node_width
+
+    return np.asarray(x), np.asarray(w)
+
+
+def render_flame_graph(
+    tree: vtune.VTuneTree,
+    output_file: str,
+    title: str = "VTune Flame Graph",
+    width: int = FLAME_GRAPH_WIDTH,
+    min_width: float = FLAME_MIN_WIDTH,
+) -> int:
+    """Write an icicle flame graph SVG (root on top) and return frames drawn."""
+    x, w = frame_layout(tree, width)
+    visible = np.flatnonzero(w >= min_width)
+
+    top_margin = 40
+    max_depth = int(tree.depth[visible].max()) if len(visible) else 0
+    height = top_margin + (max_depth + 1) * FLAME_ROW_HEIGHT + 10
+
+    names = tree.names
+    totals = tree.cpu_total
+    selfs = tree.cpu_self
+    depth = tree.depth
+
+    with open(output_file, "w", encoding="utf-8") as output:
+        output.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" font-family="Verdana, sans-serif" '
+            f'font-size="{FLAME_FONT_SIZE}">\n'
+            f'<rect x="0" y="0" width="{width}" height="{height}" fill="#fafafa"/>\n'
+            f'<text x="{width / 2:.0f}" y="24" font-size="17" text-anchor="middle">'
+            f"{html.escape(title)}</text>\n"
+        )
+
+        parts: List[str] = []
+        for index in visible.tolist():
+            name = names[index]
+            left = x[index]
+            frame_width = w[index]
+            top = top_margin + int(depth[index]) * FLAME_ROW_HEIGHT
+            label = html.escape(name)
+
+            parts.append(
+                f'<g><title>{label} ({totals[index]:.2f}%, self {selfs[index]:.3f})</title>'
+                f'<rect x="{left:.1f}" y="{top}" width="{frame_width:.1f}" '
+                f'height="{FLAME_ROW_HEIGHT - 1}" fill="{frame_color(name)}" rx="2"/>'
+            )
+
+            max_chars = int((frame_width - 6) / FLAME_CHAR_WIDTH)
+            if max_chars >= 3:
+                text = name if len(name) <= max_chars else name[: max_chars - 2] + ".."
+                parts.append(
+                    f'<text x="{left + 3:.1f}" y="{top + FLAME_ROW_HEIGHT - 5}">'
+                    f"{html.escape(text)}</text>"
+                )
+            parts.append("</g>\n")
+
+            if len(parts) >= vtune.HTML_CHUNK_NODES:
+                output.write("".join(parts))
+                parts = []
+
+        output.write("".join(parts))
+        output.write("</svg>\n")
+
+    return len(visible)
+
+
+def generate_flame_graph(profile_file: str, output_file: Optional[str] = None) -> str:
+    tree = load_profile_tree(profile_file)
+    if output_file is None:
+        source = vtune.resolve_topdown_csv(profile_file)
+        output_file = os.path.join(
+            os.path.dirname(os.path.abspath(source)), "vtune_flamegraph.svg"
+        )
+
+    frames = render_flame_graph(tree, output_file)
+    print(f"Flame graph with {frames} of {len(tree)} frames saved to: {output_file}")
+    return output_file
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m utils.flame_graph "
+            "[topdown_csv_or_results_dir_or_folded_stacks] [output_svg]"
+        )
+        sys.exit(1)
+
+    generate_flame_graph(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
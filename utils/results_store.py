@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""Content-addressed store for benchmark results.
+
+Files of a run directory are stored once by SHA-256 under
+`<root>/.store/objects/` and the run directory keeps hardlinks to them plus a
+`manifest.json`, so byte-identical plots and outputs of consecutive runs
+take no extra space. Stored objects are read-only and shared with other
+runs and `published/`, so only finished runs are ingested, and a stored run
+is detached (its links replaced by private copies) before anything writes
+into it again.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from utils.atomic_write import replace_on_write, temporary_path
+
+STORE_DIR = ".store"
+MANIFEST_FILE = "manifest.json"
+HASH_CHUNK_SIZE = 1 << 20
+DEFAULT_KEEP_LAST = 10
+
+
+def file_digest(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def format_bytes(size: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def run_time(run_dir: str) -> datetime:
+    # Run directories are named by BenchmarkRunner as YYYYMMDD_HHMM
+    match = re.search(r"(\d{8}_\d{4})", os.path.basename(run_dir.rstrip(os.sep)))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M")
+    return datetime.fromtimestamp(os.path.getmtime(run_dir))
+
+
+def reclaimable_bytes(paths: Iterable[str]) -> int:
+    """Bytes freed by deleting `paths`: inodes whose every link is in the set."""
+    links = Counter()
+    inodes = {}
+    for path in paths:
+        st = os.lstat(path)
+        key = (st.st_dev, st.st_ino)
+        links[key] += 1
+        inodes[key] = (st.st_size, st.st_nlink)
+    return sum(size for key, (size, nlink) in inodes.items() if links[key] >= nlink)
+
+
+def link_or_copy(source: str, target: str) -> bool:
+    """Atomically place `source` at `target`; returns False if it had to copy."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = temporary_path(target)
+    try:
+        os.link(source, tmp)
+        linked = True
+    except OSError:
+        # Different filesystem (or no hardlink support)
+        shutil.copyfile(source, tmp)
+        linked = False
+    os.replace(tmp, target)
+    return linked
+
+
+class ResultsStore:
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, STORE_DIR, "objects")
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def __put_object__(self, digest: str, source: str) -> str:
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            link_or_copy(source, path)
+            os.chmod(path, 0o444)
+        return path
+
+    def __same_file__(self, a: str, b: str) -> bool:
+        return os.path.exists(a) and os.path.exists(b) and os.path.samefile(a, b)
+
+    def runs(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            os.path.join(self.root, name)
+            for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def objects(self) -> List[str]:
+        paths = []
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            paths.extend(os.path.join(dirpath, name) for name in filenames)
+        return paths
+
+    def read_manifest(self, run_dir: str) -> Optional[Dict]:
+        path = os.path.join(run_dir, MANIFEST_FILE)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def __write_manifest__(self, run_dir: str, manifest: Dict) -> None:
+        path = os.path.join(run_dir, MANIFEST_FILE)
+        with replace_on_write(path) as tmp_path, open(
+            tmp_path, "w", encoding="utf-8"
+        ) as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+    def ingest(self, run_dir: str) -> Dict:
+        """Move the files of `run_dir` into the store and write its manifest.
+
+        New content becomes a store object without copying (the run file is
+        hardlinked into the store); files whose content is already stored are
+        replaced by a hardlink to the existing object. Only ingest finished
+        runs: the files become read-only objects shared with other runs.
+        Ingesting again is cheap, files still linked to their object are not
+        hashed again.
+        """
+        previous = self.read_manifest(run_dir) or {"files": {}}
+        files = {}
+        stored = deduplicated = 0
+
+        for dirpath, dirnames, filenames in os.walk(run_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                rel = os.path.relpath(path, run_dir)
+                if rel == MANIFEST_FILE or os.path.islink(path):
+                    continue
+
+                st = os.stat(path)
+                size = st.st_size
+                known = previous["files"].get(rel)
+                if known and self.__same_file__(
+                    self.object_path(known["sha256"]), path
+                ):
+                    if (size, st.st_mtime_ns) == (known["size"], known.get("mtime_ns")):
+                        # Still linked to its object, no need to hash it again
+                        files[rel] = known
+                        continue
+                    # Written in place through the link: the object no longer
+                    # matches its name, so it is stored again under the new one
+                    print(f"[WARNING] {rel} was modified in place, storing it again")
+                    os.remove(self.object_path(known["sha256"]))
+
+                digest = file_digest(path)
+                object_path = self.object_path(digest)
+                if os.path.exists(object_path):
+                    if link_or_copy(object_path, path):
+                        deduplicated += size
+                else:
+                    self.__put_object__(digest, path)
+                    stored += size
+                files[rel] = {
+                    "sha256": digest,
+                    "size": size,
+                    "mtime_ns": os.stat(path).st_mtime_ns,
+                }
+
+        manifest = {
+            "run": os.path.basename(os.path.abspath(run_dir)),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "files": files,
+        }
+        self.__write_manifest__(run_dir, manifest)
+        print(
+            f"[INFO] Stored {len(files)} file(s) of {run_dir}: "
+            f"{format_bytes(stored)} new, {format_bytes(deduplicated)} deduplicated"
+        )
+        return manifest
+
+    def detach(self, run_dir: str) -> int:
+        """Replace the hardlinked files of `run_dir` by private copies.
+
+        Needed before a stored run is written to again (extractors, VTune and
+        the renderers write in place); the manifest is removed, so the next
+        `ingest` hashes every file again. Returns the bytes copied.
+        """
+        copied = 0
+        for dirpath, _, filenames in os.walk(run_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if os.path.islink(path) or os.stat(path).st_nlink < 2:
+                    continue
+                with replace_on_write(path) as tmp:
+                    shutil.copyfile(path, tmp)
+                copied += os.path.getsize(path)
+        manifest = os.path.join(run_dir, MANIFEST_FILE)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        print(
+            f"[INFO] Detached {run_dir} from the store "
+            f"({format_bytes(copied)} copied)"
+        )
+        return copied
+
+    def publish(self, run_dir: str, published_root: str) -> str:
+        """Publish a run as hardlinks into the store of `published_root`.
+
+        On the same filesystem this only writes links and the manifest; across
+        filesystems every distinct object is copied once into the published
+        store and shared by all published runs. The run is ingested again
+        first, so files written or added since the last ingest are published
+        as they are now.
+        """
+        manifest = self.ingest(run_dir)
+        target = ResultsStore(published_root)
+        name = os.path.basename(run_dir.rstrip("/"))
+        published_dir = os.path.join(target.root, name)
+
+        copied = linked = 0
+        for rel, entry in manifest["files"].items():
+            digest = entry["sha256"]
+            source = self.object_path(digest)
+            if not os.path.exists(source):
+                source = os.path.join(run_dir, rel)
+
+            existed = os.path.exists(target.object_path(digest))
+            object_path = target.__put_object__(digest, source)
+            if existed or self.__same_file__(source, object_path):
+                linked += entry["size"]
+            else:
+                copied += entry["size"]
+            link_or_copy(object_path, os.path.join(published_dir, rel))
+
+        self.__write_manifest__(published_dir, manifest)
+        print(
+            f"[INFO] Published {len(manifest['files'])} file(s) to {published_dir}: "
+            f"{format_bytes(linked)} linked, {format_bytes(copied)} copied"
+        )
+        return published_dir
+
+    def gc(
+        self,
+        keep_last: Optional[int] = DEFAULT_KEEP_LAST,
+        keep_days: Optional[float] = None,
+        dry_run: bool = False,
+    ) -> int:
+        """Delete expired runs and unreferenced objects; returns bytes reclaimed.
+
+        A run is kept if it is one of the newest `keep_last` runs or younger
+        than `keep_days`. Objects not referenced by a kept run's manifest are
+        deleted with the expired runs.
+        """
+        runs = sorted(self.runs(), key=run_time)
+        keep = set(runs[-keep_last:]) if keep_last else set()
+        if keep_days is not None:
+            cutoff = datetime.now() - timedelta(days=keep_days)
+            keep.update(run for run in runs if run_time(run) >= cutoff)
+        elif not keep_last:
+            keep = set(runs)
+
+        expired = [run for run in runs if run not in keep]
+
+        referenced = set()
+        for run in keep:
+            manifest = self.read_manifest(run)
+            if manifest:
+                referenced.update(
+                    entry["sha256"] for entry in manifest["files"].values()
+                )
+
+        orphans = [
+            path
+            for path in self.objects()
+            if os.path.relpath(path, self.objects_dir).replace(os.sep, "")
+            not in referenced
+        ]
+
+        run_files = []
+        for run in expired:
+            for dirpath, _, filenames in os.walk(run):
+                run_files.extend(os.path.join(dirpath, name) for name in filenames)
+
+        reclaimed = reclaimable_bytes(run_files + orphans)
+        action = "Would delete" if dry_run else "Deleting"
+        print(
+            f"[INFO] {action} {len(expired)} of {len(runs)} run(s) and "
+            f"{len(orphans)} unreferenced object(s), "
+            f"reclaiming {format_bytes(reclaimed)}"
+        )
+        for run in expired:
+            print(f"  {os.path.basename(run)}")
+
+        if not dry_run:
+            for run in expired:
+                shutil.rmtree(run)
+            for path in orphans:
+                os.remove(path)
+
+        return reclaimed
+
+
+def usage():
+    print("Usage:")
+    print("  python -m utils.results_store ingest <run_dir> [...]")
+    print("  python -m utils.results_store publish <run_dir> <published_root>")
+    print("  python -m utils.results_store detach <run_dir> [...]")
+    print(
+        "  python -m utils.results_store gc [results_root] "
+        "[--keep-last N] [--keep-days D] [--dry-run]"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        usage()
+        sys.exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+
+    if command == "ingest" and args:
+        for run_dir in args:
+            run_dir = run_dir.rstrip("/")
+            ResultsStore(os.path.dirname(os.path.abspath(run_dir))).ingest(run_dir)
+
+    elif command == "detach" and args:
+        for run_dir in args:
+            run_dir = run_dir.rstrip("/")
+            ResultsStore(os.path.dirname(os.path.abspath(run_dir))).detach(run_dir)
+
+    elif command == "publish" and len(args) == 2:
+        run_dir = args[0].rstrip("/")
+        store = ResultsStore(os.path.dirname(os.path.abspath(run_dir)))
+        store.publish(run_dir, args[1])
+
+    elif command == "gc":
+        keep_last = DEFAULT_KEEP_LAST
+        keep_days = None
+        dry_run = False
+        root = "results"
+        while args:
+            arg = args.pop(0)
+            if arg == "--keep-last":
+                keep_last = int(args.pop(0))
+            elif arg == "--keep-days":
+                keep_days = float(args.pop(0))
+            elif arg == "--dry-run":
+                dry_run = True
+            else:
+                root = arg
+        ResultsStore(root).gc(keep_last, keep_days, dry_run)
+
+    else:
+        usage()
+        sys.exit(1)
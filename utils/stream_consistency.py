@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Consistency check of the parallel stream outputs of a benchmark run.
+
+`benchmark_all_9` decodes the same input in N parallel streams per method
+and every stream writes `method<M>_output_<K>.csv`. All streams of a method
+must be byte-identical; a stream that differs points at a race in the
+(patched) decoder. Every output is memory-mapped and hashed in a process
+pool, and only for streams that differ from the majority are the frames
+hashed one by one to find where they diverge. Only methods whose streams
+all agree have their duplicates pruned.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from video_generation.motion_vector import build_frame_index
+
+STREAM_OUTPUT_PATTERN = re.compile(r"^(method\d+_output)_(\d+)\.csv$")
+CONSISTENCY_REPORT_FILE = "stream_consistency.txt"
+HASH_BLOCK_BYTES = 16 << 20
+
+
+@dataclass
+class StreamOutput:
+    path: str
+    stream: int
+    size: int = 0
+    digest: str = ""
+    rows: int = 0
+    frames: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    offsets: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    # Set for streams that differ from the method's reference stream
+    divergence: str = ""
+
+
+@dataclass
+class MethodConsistency:
+    method: str
+    streams: List[StreamOutput]
+    reference: StreamOutput
+
+    @property
+    def diverging(self) -> List[StreamOutput]:
+        return [s for s in self.streams if s.digest != self.reference.digest]
+
+    @property
+    def consistent(self) -> bool:
+        return not self.diverging
+
+
+def find_stream_outputs(results_dir: str) -> Dict[str, List[Tuple[int, str]]]:
+    """{"method4_output": [(stream, path), ...]} of a run directory."""
+    outputs: Dict[str, List[Tuple[int, str]]] = {}
+    for name in os.listdir(results_dir):
+        match = STREAM_OUTPUT_PATTERN.match(name)
+        if match:
+            outputs.setdefault(match.group(1), []).append(
+                (int(match.group(2)), os.path.join(results_dir, name))
+            )
+    return {method: sorted(streams) for method, streams in sorted(outputs.items())}
+
+
+def scan_stream_output(path: str) -> Tuple[int, str, int]:
+    """(size, SHA-256, rows) of a CSV, read through a memory map."""
+    sha256 = hashlib.sha256()
+    newlines = 0
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                characters = np.frombuffer(data, np.uint8)
+                for begin in range(0, size, HASH_BLOCK_BYTES):
+                    block = characters[begin : begin + HASH_BLOCK_BYTES]
+                    sha256.update(block)
+                    newlines += int(np.count_nonzero(block == 10))
+                # The map can only be closed once no view is left
+                del characters, block
+    # Every row ends with a newline, like the header line
+    return size, sha256.hexdigest(), max(newlines - 1, 0)
+
+
+def frame_digests(path: str, offsets: np.ndarray) -> List[bytes]:
+    """Digest of the bytes of every frame run starting at `offsets`."""
+    digests = []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size or not len(offsets):
+            return digests
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            characters = np.frombuffer(data, np.uint8)
+            ends = np.r_[offsets[1:], size]
+            for begin, end in zip(offsets.tolist(), ends.tolist()):
+                digest = hashlib.blake2b(characters[begin:end], digest_size=16)
+                digests.append(digest.digest())
+            del characters
+    return digests
+
+
+def describe_divergence(
+    reference: StreamOutput,
+    reference_digests: List[bytes],
+    stream: StreamOutput,
+    digests: List[bytes],
+) -> str:
+    """Where `stream` first differs from `reference`."""
+    common = min(len(reference.frames), len(stream.frames))
+    for i in range(common):
+        if reference.frames[i] != stream.frames[i]:
+            return (
+                f"frame {int(reference.frames[i])} is followed by frame "
+                f"{int(stream.frames[i])} (position {i})"
+            )
+        if reference_digests[i] != digests[i]:
+            return f"first differs at frame {int(stream.frames[i])}"
+    if len(stream.frames) < len(reference.frames):
+        return f"ends before frame {int(reference.frames[common])}"
+    if len(stream.frames) > len(reference.frames):
+        return f"has extra frames from frame {int(stream.frames[common])}"
+    # Same frames with identical rows: only the header can differ
+    return "differs in the header"
+
+
+def verify_stream_outputs(
+    results_dir: str, workers: Optional[int] = None
+) -> List[MethodConsistency]:
+    """Hash and count every stream output and compare the streams of each method.
+
+    The digest most streams share is the reference (stream 0 on a tie).
+    """
+    outputs = find_stream_outputs(results_dir)
+    streams = {
+        method: [StreamOutput(path, stream) for stream, path in entries]
+        for method, entries in outputs.items()
+    }
+    every_stream = [s for method_streams in streams.values() for s in method_streams]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        scans = pool.map(scan_stream_output, [s.path for s in every_stream])
+        for stream, (size, digest, rows) in zip(every_stream, scans):
+            stream.size, stream.digest, stream.rows = size, digest, rows
+
+        # Identical files have identical frames: index one file per digest
+        distinct = {s.digest: s.path for s in every_stream if s.size}
+        indexes = dict(zip(distinct, pool.map(build_frame_index, distinct.values())))
+        for stream in every_stream:
+            if stream.digest in indexes:
+                stream.frames, stream.offsets = indexes[stream.digest]
+
+        report = []
+        for method, method_streams in streams.items():
+            counts = Counter(s.digest for s in method_streams)
+            top = max(counts.values())
+            reference = next(s for s in method_streams if counts[s.digest] == top)
+            report.append(MethodConsistency(method, method_streams, reference))
+
+        # Frame by frame only where whole files differ
+        pairs = [(r.reference, s) for r in report for s in r.diverging]
+        to_hash = {id(s): s for pair in pairs for s in pair}
+        digests = dict(
+            zip(
+                to_hash,
+                pool.map(
+                    frame_digests,
+                    [s.path for s in to_hash.values()],
+                    [s.offsets for s in to_hash.values()],
+                ),
+            )
+        )
+    for reference, stream in pairs:
+        stream.divergence = describe_divergence(
+            reference, digests[id(reference)], stream, digests[id(stream)]
+        )
+    return report
+
+
+def format_report(report: List[MethodConsistency]) -> List[str]:
+    lines = []
+    for method in report:
+        reference = method.reference
+        summary = (
+            f"{len(reference.frames)} frames, {reference.rows:,} MVs, "
+            f"sha256 {reference.digest[:12]}"
+        )
+        if method.consistent:
+            count = len(method.streams)
+            streams = "1 stream" if count == 1 else f"{count} streams identical"
+            lines.append(f"{method.method}: {streams} ({summary})")
+            continue
+        diverging = method.diverging
+        lines.append(
+            f"{method.method}: {len(diverging)} of {len(method.streams)} streams "
+            f"diverge from stream {reference.stream} ({summary})"
+        )
+        for stream in diverging:
+            lines.append(
+                f"    stream {stream.stream}: {stream.divergence} "
+                f"({len(stream.frames)} frames, {stream.rows:,} MVs)"
+            )
+    return lines
+
+
+def prune_stream_outputs(report: List[MethodConsistency]) -> int:
+    """Delete the duplicates of methods whose streams all agree.
+
+    `method<M>_output_0.csv` is kept; every output of a method with
+    diverging streams is kept for investigation. Returns the bytes freed.
+    """
+    freed = 0
+    for method in report:
+        if not method.consistent:
+            continue
+        for stream in method.streams:
+            if stream.stream != 0:
+                os.remove(stream.path)
+                freed += stream.size
+    return freed
+
+
+def check_stream_outputs(
+    results_dir: str, prune: bool = False, workers: Optional[int] = None
+) -> List[MethodConsistency]:
+    """Verify, write `stream_consistency.txt` to the run and optionally prune."""
+    report = verify_stream_outputs(results_dir, workers)
+    lines = format_report(report)
+    with open(os.path.join(results_dir, CONSISTENCY_REPORT_FILE), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    for line in lines:
+        print(line)
+
+    inconsistent = [m.method for m in report if not m.consistent]
+    if inconsistent:
+        print(
+            f"[WARNING] Parallel streams diverge for {', '.join(inconsistent)}; "
+            "their outputs are kept"
+        )
+    if prune:
+        freed = prune_stream_outputs(report)
+        print(f"[INFO] Pruned duplicate stream outputs ({freed / (1 << 20):.1f} MB)")
+    return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    positional = []
+    prune = False
+    workers = None
+    while args:
+        arg = args.pop(0)
+        if arg == "--prune":
+            prune = True
+        elif arg == "--workers" and args:
+            workers = int(args.pop(0))
+        else:
+            positional.append(arg)
+
+    if len(positional) != 1 or not os.path.isdir(positional[0]):
+        print(
+            "Usage: python -m utils.stream_consistency <results_dir> "
+            "[--prune] [--workers N]"
+        )
+        sys.exit(1)
+
+    report = check_stream_outputs(positional[0], prune, workers)
+    sys.exit(0 if all(m.consistent for m in report) else 2)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Stage-level span tracing, written as Chrome trace-event JSON.
+
+Wrap a stage in `with span("extract", streams=15):` or decorate it with
+`@traced("slides.produce_slides")`. Every span records wall time, CPU time
+(of the calling thread plus any child processes that finished during the
+span, e.g. `make` or the extractors), the RSS change and its attributes.
+`write_trace(results_dir)` writes `trace.json`, which opens in
+chrome://tracing or https://ui.perfetto.dev, and prints the slowest stages.
+
+Tracing is off unless `MV_TRACE=1` is set or `enable_tracing()` is called;
+a disabled span is a shared no-op object, so instrumented code pays one
+flag check per span. Only the standard library (and `utils.atomic_write`,
+which uses nothing else) is imported here to keep the entry points within
+their import budget.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.atomic_write import replace_on_write
+
+TRACE_ENV = "MV_TRACE"
+TRACE_FILE = "trace.json"
+SUMMARY_TOP = 15
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def current_rss() -> int:
+    """Resident set size in bytes, 0 where /proc is not available."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def children_cpu_time() -> float:
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = os.environ.get(TRACE_ENV, "") not in ("", "0")
+        self.events: List[Dict] = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.origin_ns = time.perf_counter_ns()
+
+    def record(self, event: Dict) -> None:
+        with self.lock:
+            self.events.append(event)
+
+
+TRACER = Tracer()
+
+
+class Span:
+    __slots__ = ("name", "attributes", "start_ns", "cpu", "children_cpu", "rss")
+
+    def __init__(self, name: str, attributes: Dict) -> None:
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes) -> None:
+        """Add attributes known only inside the span (counts, sizes)."""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.rss = current_rss()
+        self.children_cpu = children_cpu_time()
+        self.cpu = time.thread_time()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end_ns = time.perf_counter_ns()
+        cpu = time.thread_time() - self.cpu
+        cpu += children_cpu_time() - self.children_cpu
+        args = {
+            name: value if isinstance(value, (int, float, bool)) else str(value)
+            for name, value in self.attributes.items()
+        }
+        args["cpu_s"] = round(cpu, 6)
+        args["rss_delta_mb"] = round((current_rss() - self.rss) / (1 << 20), 3)
+        if exc_type is not None:
+            args["error"] = exc_type.__name__
+        TRACER.record(
+            {
+                "name": self.name,
+                "cat": self.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (self.start_ns - TRACER.origin_ns) / 1000,
+                "dur": (end_ns - self.start_ns) / 1000,
+                "pid": TRACER.pid,
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+        )
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def enable_tracing(enabled: bool = True) -> None:
+    TRACER.enabled = enabled
+
+
+def tracing_enabled() -> bool:
+    return TRACER.enabled
+
+
+def span(name: str, **attributes):
+    """Context manager timing a stage; a no-op while tracing is disabled."""
+    if not TRACER.enabled:
+        return NULL_SPAN
+    return Span(name, attributes)
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """Decorator version of `span`, named after the function by default."""
+
+    def decorator(function: Callable) -> Callable:
+        span_name = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return function(*args, **kwargs)
+            with Span(span_name, dict(attributes)):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_events() -> List[Dict]:
+    with TRACER.lock:
+        events = list(TRACER.events)
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    metadata = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": TRACER.pid,
+            "args": {"name": os.path.basename(sys.argv[0]) or "python"},
+        }
+    ]
+    for tid in sorted({event["tid"] for event in events}):
+        metadata.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": TRACER.pid,
+                "tid": tid,
+                "args": {"name": thread_names.get(tid, f"thread {tid}")},
+            }
+        )
+    return metadata + events
+
+
+def self_times(events: List[Dict]) -> List[float]:
+    """Duration of every "X" event minus its direct children on the same thread."""
+    spans = [e for e in events if e.get("ph") == "X"]
+    remaining = [event["dur"] for event in spans]
+    order = sorted(
+        range(len(spans)),
+        key=lambda i: (spans[i]["tid"], spans[i]["ts"], -spans[i]["dur"]),
+    )
+    stack: List[int] = []
+    for i in order:
+        event = spans[i]
+        while stack and (
+            spans[stack[-1]]["tid"] != event["tid"]
+            or spans[stack[-1]]["ts"] + spans[stack[-1]]["dur"] <= event["ts"]
+        ):
+            stack.pop()
+        if stack:
+            remaining[stack[-1]] -= event["dur"]
+        stack.append(i)
+    return [max(duration, 0.0) / 1e6 for duration in remaining]
+
+
+def summarize_events(events: List[Dict]) -> List[Dict]:
+    """Per span name: calls, wall, self (wall minus nested spans), max wall and
+    CPU seconds and RSS change, the most self time first."""
+    spans = [e for e in events if e.get("ph") == "X"]
+    stages: Dict[str, Dict] = {}
+    for event, self_s in zip(spans, self_times(spans)):
+        stage = stages.setdefault(
+            event["name"],
+            {
+                "name": event["name"],
+                "calls": 0,
+                "wall_s": 0.0,
+                "self_s": 0.0,
+                "max_s": 0.0,
+                "cpu_s": 0.0,
+                "rss_delta_mb": 0.0,
+            },
+        )
+        seconds = event["dur"] / 1e6
+        stage["calls"] += 1
+        stage["wall_s"] += seconds
+        stage["self_s"] += self_s
+        stage["max_s"] = max(stage["max_s"], seconds)
+        stage["cpu_s"] += event["args"].get("cpu_s", 0.0)
+        stage["rss_delta_mb"] += event["args"].get("rss_delta_mb", 0.0)
+    return sorted(stages.values(), key=lambda s: s["self_s"], reverse=True)
+
+
+def format_summary(events: List[Dict], top: int = SUMMARY_TOP) -> List[str]:
+    lines = [
+        f"{'Stage':<40} {'Calls':>5} {'Wall s':>8} {'Self s':>8} {'Max s':>8} "
+        f"{'CPU s':>8} {'RSS MB':>8}"
+    ]
+    for stage in summarize_events(events)[:top]:
+        lines.append(
+            f"{stage['name'][:40]:<40} {stage['calls']:>5} {stage['wall_s']:>8.2f} "
+            f"{stage['self_s']:>8.2f} {stage['max_s']:>8.2f} {stage['cpu_s']:>8.2f} "
+            f"{stage['rss_delta_mb']:>+8.1f}"
+        )
+    return lines
+
+
+def write_trace(results_dir: str, top: int = SUMMARY_TOP) -> Optional[str]:
+    """Write every span so far to `<results_dir>/trace.json` and print the
+    slowest stages. Does nothing while tracing is disabled."""
+    if not TRACER.enabled:
+        return None
+    events = trace_events()
+    path = os.path.join(str(results_dir), TRACE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with replace_on_write(path) as tmp_path, open(tmp_path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    print(f"[INFO] Trace written to {path}")
+    for line in format_summary(events, top):
+        print(line)
+    return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m utils.tracing <trace.json> [top]")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as f:
+        trace = json.load(f)
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else SUMMARY_TOP
+    for line in format_summary(trace["traceEvents"], top):
+        print(line)
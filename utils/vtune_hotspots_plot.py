@@ -1,10 +1,21 @@
+import html
+import json
+import numpy as np
 import pandas as pd
 import os
+import sys
 import matplotlib.pyplot as plt
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from dataclasses import dataclass
 from jinja2 import Template
 
+# Number of nodes rendered per chunk when streaming the call tree to disk
+HTML_CHUNK_NODES = 4096
+
+# Nodes below this CPU total (%) are hidden by default in the lazy call tree viewer
+DEFAULT_MIN_CPU_PERCENT = 0.5
+
+
 @dataclass
 class TreeNode:
     name: str
@@ -15,44 +26,139 @@ class TreeNode:
     parent: Optional[str]
 
 
-def build_vtune_tree(csv_file: str) -> Tuple[Dict[str, TreeNode], List[str]]:
-    dataframe = pd.read_csv(csv_file, delimiter="\t")
+@dataclass
+class VTuneTree:
+    """Columnar top-down tree, one entry per CSV row in pre-order."""
+
+    names: np.ndarray
+    cpu_total: np.ndarray
+    cpu_self: np.ndarray
+    level: np.ndarray
+    depth: np.ndarray
+    parent: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def roots(self) -> np.ndarray:
+        return np.flatnonzero(self.parent < 0)
+
+    def has_children(self) -> np.ndarray:
+        # Rows are in pre-order, so a node has children iff the next row is its child
+        result = np.zeros(len(self), dtype=bool)
+        if len(self) > 1:
+            result[:-1] = self.parent[1:] == np.arange(len(self) - 1)
+        return result
+
+
+def link_parents(levels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute parent index and tree depth for pre-ordered indentation levels.
+
+    The parent of a row is the closest preceding row with a smaller level,
+    found with a single stack pass.
+    """
+    count = len(levels)
+    parent = np.full(count, -1, dtype=np.int64)
+    depth = np.zeros(count, dtype=np.int32)
+
+    stack_rows: List[int] = []
+    stack_levels: List[int] = []
+    for row, level in enumerate(levels.tolist()):
+        while stack_levels and stack_levels[-1] >= level:
+            stack_levels.pop()
+            stack_rows.pop()
+        if stack_rows:
+            parent[row] = stack_rows[-1]
+        depth[row] = len(stack_rows)
+        stack_rows.append(row)
+        stack_levels.append(level)
+
+    return parent, depth
+
+
+def read_function_stack(csv_file: str) -> pd.Series:
+    """Read the raw, indented "Function Stack" column of a top-down report.
+
+    The column is split out directly instead of going through `pd.read_csv`,
+    whose C parser drops the leading spaces of a field that starts on its
+    internal buffer boundary and would break the indentation levels.
+    """
+    with open(csv_file, "r", encoding="utf-8") as f:
+        header = f.readline().rstrip("\r\n").split("\t")
+        position = header.index("Function Stack")
+        function_stack = [
+            line.split("\t", position + 1)[position]
+            for line in f
+            if line.rstrip("\r\n")
+        ]
+    return pd.Series(function_stack, dtype=object)
+
+
+def parse_vtune_tree(csv_file: str) -> VTuneTree:
+    dataframe = pd.read_csv(
+        csv_file, delimiter="\t", usecols=["CPU Time:Total", "CPU Time:Self"]
+    )
 
     # Clean and convert numeric columns
-    dataframe["CPU Time:Total"] = pd.to_numeric(
-        dataframe["CPU Time:Total"], errors="coerce"
-    ).fillna(0)
-    dataframe["CPU Time:Self"] = pd.to_numeric(
-        dataframe["CPU Time:Self"], errors="coerce"
-    ).fillna(0)
+    cpu_total = (
+        pd.to_numeric(dataframe["CPU Time:Total"], errors="coerce")
+        .fillna(0)
+        .to_numpy(dtype=np.float64)
+    )
+    cpu_self = (
+        pd.to_numeric(dataframe["CPU Time:Self"], errors="coerce")
+        .fillna(0)
+        .to_numpy(dtype=np.float64)
+    )
 
-    nodes: Dict[str, TreeNode] = {}
-    level_stack: List[Tuple[int, str]] = []
-    root_nodes: List[str] = []
+    # Indentation level (2 spaces per level), computed with vectorized string ops
+    function_stack = read_function_stack(csv_file)
+    if len(function_stack) != len(dataframe):
+        raise ValueError(
+            f"{csv_file}: {len(function_stack)} Function Stack rows but "
+            f"{len(dataframe)} CPU time rows"
+        )
+    stripped = function_stack.str.lstrip(" ")
+    levels = (
+        (function_stack.str.len() - stripped.str.len()).to_numpy(dtype=np.int64) // 2
+    )
+    names = stripped.str.rstrip().to_numpy(dtype=object)
 
-    for index, row in dataframe.iterrows():
-        function_line = row["Function Stack"]
-        cpu_total = float(row["CPU Time:Total"])
-        cpu_self = float(row["CPU Time:Self"])
+    parent, depth = link_parents(levels)
 
-        # Calculate indentation level (2 spaces per level)
-        leading_spaces = len(function_line) - len(function_line.lstrip(" "))
-        level = leading_spaces // 2
-        function_name = function_line.strip()
+    return VTuneTree(
+        names=names,
+        cpu_total=cpu_total,
+        cpu_self=cpu_self,
+        level=levels,
+        depth=depth,
+        parent=parent,
+    )
 
-        node_id = f"node_{index}"
 
-        # Pop stack to maintain hierarchy at current level
-        while level_stack and level_stack[-1][0] >= level:
-            level_stack.pop()
+def build_vtune_tree(csv_file: str) -> Tuple[Dict[str, TreeNode], List[str]]:
+    tree = parse_vtune_tree(csv_file)
 
-        # Determine parent from stack
-        parent_id = level_stack[-1][1] if level_stack else None
+    nodes: Dict[str, TreeNode] = {}
+    root_nodes: List[str] = []
+
+    for index, (name, total, self_time, level, parent) in enumerate(
+        zip(
+            tree.names.tolist(),
+            tree.cpu_total.tolist(),
+            tree.cpu_self.tolist(),
+            tree.level.tolist(),
+            tree.parent.tolist(),
+        )
+    ):
+        node_id = f"node_{index}"
+        parent_id = f"node_{parent}" if parent >= 0 else None
 
         nodes[node_id] = TreeNode(
-            name=function_name,
-            cpu_total=cpu_total,
-            cpu_self=cpu_self,
+            name=name,
+            cpu_total=total,
+            cpu_self=self_time,
             level=level,
             children=[],
             parent=parent_id,
@@ -63,53 +169,127 @@ def build_vtune_tree(csv_file: str) -> Tuple[Dict[str, TreeNode], List[str]]:
         else:
             root_nodes.append(node_id)
 
-        # Push current node to stack
-        level_stack.append((level, node_id))
-
     return nodes, root_nodes
 
 
-def generate_tree_html(nodes: Dict[str, TreeNode], node_id: str) -> str:
-    node = nodes[node_id]
-    has_children = len(node.children) > 0
+def generate_tree_html(tree: VTuneTree) -> Iterator[str]:
+    """Yield the nested <li> markup of the whole tree in chunks.
 
-    arrow = "▶" if has_children else ""
-    collapsed_class = "collapsed" if has_children else ""
+    Rows are already in pre-order, so the markup is produced in a single
+    forward pass: a node with children opens a <ul>, and the depth drop to the
+    next row tells how many lists have to be closed.
+    """
+    count = len(tree)
+    if count == 0:
+        return
 
-    html_parts = [
-        f'<li class="tree-node {collapsed_class}" data-node="{node_id}">\n',
-        f'  <span class="node-content" onclick="toggleNode(\'{node_id}\')">\n',
-        f'    <span class="arrow">{arrow}</span>\n',
-        f'    <span class="name">{node.name}</span>\n',
-        f'    <span class="cpu-total">{node.cpu_total:.1f}%</span>\n',
-        f'    <span class="cpu-self">{node.cpu_self:.1f}s</span>\n',
-        f"  </span>\n",
-    ]
+    has_children = tree.has_children().tolist()
+    depth = tree.depth.tolist()
+    names = tree.names.tolist()
+    cpu_total = tree.cpu_total.tolist()
+    cpu_self = tree.cpu_self.tolist()
 
-    if has_children:
-        html_parts.append(
-            f'  <ul class="children" id="children_{node_id}" style="display: none;">\n'
+    parts: List[str] = []
+    for index in range(count):
+        node_id = f"node_{index}"
+        arrow = "▶" if has_children[index] else ""
+        collapsed_class = "collapsed" if has_children[index] else ""
+
+        parts.append(
+            f'<li class="tree-node {collapsed_class}" data-node="{node_id}">\n'
+            f'  <span class="node-content" onclick="toggleNode(\'{node_id}\')">\n'
+            f'    <span class="arrow">{arrow}</span>\n'
+            f'    <span class="name">{html.escape(names[index])}</span>\n'
+            f'    <span class="cpu-total">{cpu_total[index]:.1f}%</span>\n'
+            f'    <span class="cpu-self">{cpu_self[index]:.1f}s</span>\n'
+            f"  </span>\n"
         )
-        for child_id in node.children:
-            html_parts.append(generate_tree_html(nodes, child_id))
-        html_parts.append("  </ul>\n")
 
-    html_parts.append("</li>\n")
-    return "".join(html_parts)
+        if has_children[index]:
+            parts.append(
+                f'  <ul class="children" id="children_{node_id}" style="display: none;">\n'
+            )
+        else:
+            parts.append("</li>\n")
+            next_depth = depth[index + 1] if index + 1 < count else 0
+            parts.append("  </ul>\n</li>\n" * (depth[index] - next_depth))
 
+        if len(parts) >= HTML_CHUNK_NODES:
+            yield "".join(parts)
+            parts = []
 
-def generate_complete_html(
-    nodes: Dict[str, TreeNode], root_nodes: List[str], output_file: str
-) -> None:
-    tree_html = "".join(generate_tree_html(nodes, root_id) for root_id in root_nodes)
-    
+    if parts:
+        yield "".join(parts)
+
+
+def generate_complete_html(tree: VTuneTree, output_file: str) -> None:
     template_path = os.path.join(os.path.dirname(__file__), "templates", "vtune.html.jinja")
     with open(template_path, "r") as f:
-            template = Template(f.read())
+        template = Template(f.read())
+
+    # Stream the rendered template so the full document never sits in memory
+    stream = template.stream(
+        nodes_count=len(tree),
+        roots_count=len(tree.roots),
+        tree_chunks=generate_tree_html(tree),
+    )
+    with open(output_file, "w", encoding="utf-8") as output:
+        stream.dump(output)
+
+
+def tree_to_json(
+    tree: VTuneTree,
+    total_delta: Optional[np.ndarray] = None,
+    self_delta: Optional[np.ndarray] = None,
+) -> str:
+    """Serialize the tree as a string table plus a flat node array.
+
+    `nodes` holds four values per node in pre-order: parent index (-1 for
+    roots), index into `strings`, CPU total (%) and CPU self time (s). Diff
+    trees add a `delta` array with the total and self change per node.
+    """
+    name_ids, strings = pd.factorize(tree.names)
+    columns = zip(
+        tree.parent.tolist(),
+        name_ids.tolist(),
+        np.round(tree.cpu_total, 1).tolist(),
+        np.round(tree.cpu_self, 3).tolist(),
+    )
+    payload = {
+        "strings": list(strings),
+        "nodes": [value for node in columns for value in node],
+    }
+    if total_delta is not None and self_delta is not None:
+        deltas = zip(
+            np.round(total_delta, 1).tolist(), np.round(self_delta, 3).tolist()
+        )
+        payload["delta"] = [value for node in deltas for value in node]
+
+    # Keep "</script>" inside function names from closing the data block
+    return json.dumps(payload, separators=(",", ":")).replace("</", "<\\/")
+
+
+def generate_lazy_html(
+    tree: VTuneTree,
+    output_file: str,
+    min_cpu_percent: float = DEFAULT_MIN_CPU_PERCENT,
+    total_delta: Optional[np.ndarray] = None,
+    self_delta: Optional[np.ndarray] = None,
+    title: str = "VTune Function Call Tree",
+) -> None:
+    template_path = os.path.join(
+        os.path.dirname(__file__), "templates", "vtune_lazy.html.jinja"
+    )
+    with open(template_path, "r") as f:
+        template = Template(f.read())
+
     rendered = template.render(
-        nodes_count=len(nodes),
-        roots_count=len(root_nodes),
-        tree_html=tree_html
+        title=title,
+        nodes_count=len(tree),
+        roots_count=len(tree.roots),
+        min_cpu_percent=min_cpu_percent,
+        has_delta=total_delta is not None,
+        tree_json=tree_to_json(tree, total_delta, self_delta),
     )
 
     with open(output_file, "w", encoding="utf-8") as output:
@@ -164,16 +344,290 @@ def generate_hotspots_chart(csv_file: str, output_directory: str) -> None:
 
     print(f"Hotspots bar chart saved to: {png_file}")
 
-def build_tree(csv_file):
+def build_tree(csv_file, min_cpu_percent=DEFAULT_MIN_CPU_PERCENT):
     print("Building VTune call tree...")
 
-    nodes, root_nodes = build_vtune_tree(csv_file)
-    print(f"Built tree with {len(nodes)} nodes and {len(root_nodes)} root functions")
+    tree = parse_vtune_tree(csv_file)
+    print(f"Built tree with {len(tree)} nodes and {len(tree.roots)} root functions")
 
     output_directory = os.path.dirname(os.path.abspath(csv_file))
     html_file = os.path.join(output_directory, "call_tree.html")
 
-    generate_complete_html(nodes, root_nodes, html_file)
+    generate_lazy_html(tree, html_file, min_cpu_percent)
     generate_hotspots_chart(csv_file, output_directory)
 
-    print(f"HTML call tree saved to: {html_file}")
\ No newline at end of file
+    print(f"HTML call tree saved to: {html_file}")
+
+
+@dataclass
+class VTuneDiff:
+    """Union of two top-down trees aligned by call path, in pre-order.
+
+    `tree` carries the new run's values; nodes missing from a run have zero
+    time in it. Totals are CPU % of each run, self times are seconds.
+    """
+
+    tree: VTuneTree
+    total_base: np.ndarray
+    total_new: np.ndarray
+    self_base: np.ndarray
+    self_new: np.ndarray
+
+    @property
+    def total_delta(self) -> np.ndarray:
+        return self.total_new - self.total_base
+
+    @property
+    def self_delta(self) -> np.ndarray:
+        return self.self_new - self.self_base
+
+    def call_path(self, index: int, separator: str = " > ") -> str:
+        names = []
+        while index >= 0:
+            names.append(self.tree.names[index])
+            index = self.tree.parent[index]
+        return separator.join(reversed(names))
+
+
+def preorder_paths(
+    parents: np.ndarray, weight: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Order interned call paths depth-first, heaviest sibling first.
+
+    `parents` holds the parent path id of every path (-1 for roots). Returns
+    the path ids in pre-order plus the parent index and depth of each
+    position in that order.
+    """
+    count = len(parents)
+    by_parent = np.lexsort((-weight, parents))
+    first_child = np.searchsorted(parents[by_parent], np.arange(-1, count))
+    last_child = np.searchsorted(parents[by_parent], np.arange(-1, count), side="right")
+
+    order: List[int] = []
+    stack = list(reversed(by_parent[first_child[0] : last_child[0]].tolist()))
+    while stack:
+        path = stack.pop()
+        order.append(path)
+        stack.extend(
+            reversed(by_parent[first_child[path + 1] : last_child[path + 1]].tolist())
+        )
+
+    order_array = np.asarray(order, dtype=np.int64)
+    position = np.empty(count, dtype=np.int64)
+    position[order_array] = np.arange(count)
+
+    ordered_parents = parents[order_array]
+    parent = np.where(ordered_parents >= 0, position[ordered_parents], -1)
+    depth = np.zeros(count, dtype=np.int32)
+    for index, parent_index in enumerate(parent.tolist()):
+        if parent_index >= 0:
+            depth[index] = depth[parent_index] + 1
+
+    return order_array, parent, depth
+
+
+def diff_vtune_trees(base: VTuneTree, new: VTuneTree) -> VTuneDiff:
+    # Intern every (parent path, function) pair so both trees share path ids
+    path_ids: Dict[Tuple[int, str], int] = {}
+    path_parent: List[int] = []
+    path_names: List[str] = []
+
+    def assign(tree: VTuneTree) -> np.ndarray:
+        row_paths: List[int] = []
+        for parent, name in zip(tree.parent.tolist(), tree.names.tolist()):
+            key = (row_paths[parent] if parent >= 0 else -1, name)
+            path = path_ids.get(key)
+            if path is None:
+                path = len(path_parent)
+                path_ids[key] = path
+                path_parent.append(key[0])
+                path_names.append(name)
+            row_paths.append(path)
+        return np.asarray(row_paths, dtype=np.int64)
+
+    base_paths = assign(base)
+    new_paths = assign(new)
+    count = len(path_parent)
+
+    # Rows sharing a call path are summed
+    total_base = np.bincount(base_paths, weights=base.cpu_total, minlength=count)
+    total_new = np.bincount(new_paths, weights=new.cpu_total, minlength=count)
+    self_base = np.bincount(base_paths, weights=base.cpu_self, minlength=count)
+    self_new = np.bincount(new_paths, weights=new.cpu_self, minlength=count)
+
+    # Pre-order over the union, siblings by descending CPU total across both runs
+    order_array, parent, depth = preorder_paths(
+        np.asarray(path_parent, dtype=np.int64), np.maximum(total_base, total_new)
+    )
+
+    tree = VTuneTree(
+        names=np.asarray(path_names, dtype=object)[order_array],
+        cpu_total=total_new[order_array],
+        cpu_self=self_new[order_array],
+        level=depth.astype(np.int64),
+        depth=depth,
+        parent=parent,
+    )
+    return VTuneDiff(
+        tree=tree,
+        total_base=total_base[order_array],
+        total_new=total_new[order_array],
+        self_base=self_base[order_array],
+        self_new=self_new[order_array],
+    )
+
+
+def diff_table(diff: VTuneDiff, limit: int = 100) -> pd.DataFrame:
+    """Nodes with the largest self time regressions and improvements.
+
+    Sorted by self time delta, regressions first; at most `limit` rows on
+    each side.
+    """
+    self_delta = diff.self_delta
+    changed = np.flatnonzero((self_delta != 0) | (diff.total_delta != 0))
+    ranked = changed[np.argsort(-self_delta[changed], kind="stable")]
+
+    regressions = ranked[self_delta[ranked] > 0][:limit]
+    improvements = ranked[self_delta[ranked] <= 0][::-1][:limit][::-1]
+    rows = np.concatenate([regressions, improvements])
+
+    return pd.DataFrame(
+        {
+            "function": diff.tree.names[rows],
+            "call_path": [diff.call_path(row) for row in rows.tolist()],
+            "total_base": diff.total_base[rows],
+            "total_new": diff.total_new[rows],
+            "total_delta": diff.total_delta[rows],
+            "self_base": diff.self_base[rows],
+            "self_new": diff.self_new[rows],
+            "self_delta": self_delta[rows],
+        }
+    )
+
+
+def generate_diff_chart(diff: VTuneDiff, output_file: str, top: int = 15) -> None:
+    # Self time summed per function, so inclusive time is not double counted
+    name_ids, names = pd.factorize(diff.tree.names)
+    per_function = np.bincount(name_ids, weights=diff.self_delta, minlength=len(names))
+
+    ranked = np.argsort(per_function)
+    regressions = ranked[::-1][:top]
+    improvements = ranked[:top]
+    selected = np.unique(
+        np.concatenate(
+            [
+                regressions[per_function[regressions] > 0],
+                improvements[per_function[improvements] < 0],
+            ]
+        )
+    )
+    selected = selected[np.argsort(-per_function[selected])]
+    values = per_function[selected]
+
+    plt.figure(figsize=(14, max(4, 0.45 * len(selected) + 2)))
+    bars = plt.barh(
+        [names[i] for i in selected],
+        values,
+        color=["#c0392b" if v > 0 else "#27ae60" for v in values],
+        height=0.6,
+    )
+    plt.axvline(0, color="black", linewidth=0.8)
+
+    plt.xlabel("CPU Self Time Delta (s)", fontsize=13, fontweight="bold")
+    plt.title(
+        "VTune Self Time Change (red = slower, green = faster)",
+        fontsize=18,
+        fontweight="bold",
+        pad=15,
+    )
+    plt.gca().invert_yaxis()
+    plt.grid(axis="x", linestyle="--", alpha=0.4)
+
+    for bar, value in zip(bars, values):
+        plt.text(
+            bar.get_width(),
+            bar.get_y() + bar.get_height() / 2,
+            f" {value:+.3f}s ",
+            va="center",
+            ha="left" if value > 0 else "right",
+            fontsize=10,
+        )
+
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=140, bbox_inches="tight")
+    plt.close()
+
+    print(f"Diff bar chart saved to: {output_file}")
+
+
+def resolve_topdown_csv(path: str) -> str:
+    """Accept a results dir, its vtune_results dir or the topdown.csv itself."""
+    for candidate in [
+        os.path.join(path, "vtune_results", "topdown.csv"),
+        os.path.join(path, "topdown.csv"),
+    ]:
+        if os.path.isfile(candidate):
+            return candidate
+    return path
+
+
+def compare_profiles(
+    base_path: str,
+    new_path: str,
+    output_directory: Optional[str] = None,
+    min_cpu_percent: float = DEFAULT_MIN_CPU_PERCENT,
+) -> VTuneDiff:
+    base_csv = resolve_topdown_csv(base_path)
+    new_csv = resolve_topdown_csv(new_path)
+    if output_directory is None:
+        output_directory = os.path.dirname(os.path.abspath(new_csv))
+    os.makedirs(output_directory, exist_ok=True)
+
+    print(f"Comparing VTune profiles:\n  base: {base_csv}\n  new:  {new_csv}")
+    diff = diff_vtune_trees(parse_vtune_tree(base_csv), parse_vtune_tree(new_csv))
+
+    table = diff_table(diff)
+    table_file = os.path.join(output_directory, "vtune_diff.csv")
+    table.to_csv(table_file, index=False)
+
+    top_regressions = table[table["self_delta"] > 0].head(10)
+    top_improvements = table[table["self_delta"] < 0].tail(10).iloc[::-1]
+    for label, rows in [
+        ("regressions", top_regressions),
+        ("improvements", top_improvements),
+    ]:
+        print(f"Top {label} (self time):")
+        for row in rows.itertuples():
+            print(f"  {row.self_delta:+9.3f}s  {row.total_delta:+6.1f}%  {row.function}")
+
+    generate_diff_chart(diff, os.path.join(output_directory, "vtune_diff.png"))
+
+    html_file = os.path.join(output_directory, "call_tree_diff.html")
+    generate_lazy_html(
+        diff.tree,
+        html_file,
+        min_cpu_percent,
+        diff.total_delta,
+        diff.self_delta,
+        title="VTune Call Tree Diff",
+    )
+
+    print(f"Diff table saved to: {table_file}")
+    print(f"Diff call tree saved to: {html_file}")
+    return diff
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "diff":
+        compare_profiles(
+            sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else None
+        )
+    elif len(sys.argv) == 2:
+        build_tree(resolve_topdown_csv(sys.argv[1]))
+    else:
+        print("Usage: python -m utils.vtune_hotspots_plot [topdown_csv_or_results_dir]")
+        print(
+            "       python -m utils.vtune_hotspots_plot diff "
+            "[base_results_dir] [new_results_dir] [output_dir]"
+        )
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,264 @@
+import os
+import sys
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import video_generation.motion_vector as mv
+
+CAMERA_MODELS = {"similarity": 4, "affine": 6}
+CAMERA_COLUMNS = ["frame", "dst_x", "dst_y", "motion_x", "motion_y", "motion_scale"]
+
+IRLS_ITERATIONS = 6
+# The first iterations use Huber weights, the rest Tukey's biweight, which
+# ignores outliers completely once the fit is close
+HUBER_ITERATIONS = 2
+HUBER_K = 1.345
+TUKEY_C = 4.685
+# Residual scale floor in pixels, vectors are quarter-pel
+MIN_RESIDUAL_SCALE = 0.25
+MIN_MODEL_VECTORS = 8
+
+
+def normal_equations(model, starts, x, y, dx, dy, weight):
+    """Weighted least squares normal equations of every frame at once.
+
+    Affine:     dx = a x + b y + tx,  dy = c x + d y + ty
+    Similarity: dx = s x - r y + tx,  dy = r x + s y + ty
+
+    Rows are grouped by frame, so per-frame sums are `np.add.reduceat`.
+    """
+    frames = len(starts)
+
+    def total(values):
+        return np.add.reduceat(values, starts)
+
+    wx = weight * x
+    wy = weight * y
+    n, sx, sy = total(weight), total(wx), total(wy)
+    sxx, sxy, syy = total(wx * x), total(wx * y), total(wy * y)
+    su, sv = total(weight * dx), total(weight * dy)
+    sxu, syu = total(wx * dx), total(wy * dx)
+    sxv, syv = total(wx * dy), total(wy * dy)
+    zero = np.zeros(frames)
+
+    if model == "affine":
+        # Both equations share the design [x, y, 1]; params (a, b, tx, c, d, ty)
+        block = np.stack(
+            [
+                np.stack([sxx, sxy, sx], axis=-1),
+                np.stack([sxy, syy, sy], axis=-1),
+                np.stack([sx, sy, n], axis=-1),
+            ],
+            axis=-2,
+        )
+        lhs = np.zeros((frames, 6, 6))
+        lhs[:, :3, :3] = block
+        lhs[:, 3:, 3:] = block
+        rhs = np.stack([sxu, syu, su, sxv, syv, sv], axis=-1)
+    else:
+        # params (s, r, tx, ty)
+        radial = sxx + syy
+        lhs = np.stack(
+            [
+                np.stack([radial, zero, sx, sy], axis=-1),
+                np.stack([zero, radial, -sy, sx], axis=-1),
+                np.stack([sx, -sy, n, zero], axis=-1),
+                np.stack([sy, sx, zero, n], axis=-1),
+            ],
+            axis=-2,
+        )
+        rhs = np.stack([sxu + syv, sxv - syu, su, sv], axis=-1)
+
+    return lhs, rhs
+
+
+def predict(model, params, group, x, y):
+    # Gather one parameter at a time instead of a (rows, params) matrix
+    if model == "affine":
+        a, b, tx, c, d, ty = (params[:, k][group] for k in range(6))
+        return a * x + b * y + tx, c * x + d * y + ty
+    s, r, tx, ty = (params[:, k][group] for k in range(4))
+    return s * x - r * y + tx, r * x + s * y + ty
+
+
+def fit_camera_motion(
+    df: pd.DataFrame,
+    model: str = "similarity",
+    iterations: int = IRLS_ITERATIONS,
+) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """Robustly fit a global motion model to every frame's MV field.
+
+    All frames are solved together: each IRLS iteration builds the per-frame
+    normal equations with `np.add.reduceat` and solves them with one batched
+    `np.linalg.solve`. Residual scale is the per-frame median absolute
+    residual. Returns the per-frame parameters and the residual motion
+    (pixels) of every row, in the row order of `df`.
+    """
+    size = CAMERA_MODELS[model]
+    dx, dy = mv.motion_displacement(df)
+    dx = dx.astype(np.float64)
+    dy = dy.astype(np.float64)
+    frame = df["frame"].to_numpy()
+    position_x = df["dst_x"].to_numpy(np.float64)
+    position_y = df["dst_y"].to_numpy(np.float64)
+
+    order, starts, counts, group = mv.group_frames(frame)
+    if order is not None:
+        frame, dx, dy = frame[order], dx[order], dy[order]
+        position_x, position_y = position_x[order], position_y[order]
+    frames = len(starts)
+
+    # Fit around the picture center in normalized units for a well
+    # conditioned system; translations stay in pixels
+    if len(frame):
+        center_x = (position_x.min() + position_x.max()) / 2
+        center_y = (position_y.min() + position_y.max()) / 2
+    else:
+        center_x = center_y = 0.0
+    norm = max(center_x, center_y, 1.0)
+    x = (position_x - center_x) / norm
+    y = (position_y - center_y) / norm
+
+    weight = np.ones(len(frame))
+    params = np.zeros((frames, size))
+    scale = np.full(frames, MIN_RESIDUAL_SCALE)
+    for iteration in range(iterations if frames else 0):
+        lhs, rhs = normal_equations(model, starts, x, y, dx, dy, weight)
+        # Tiny ridge keeps frames with degenerate layouts solvable
+        ridge = 1e-9 * (np.trace(lhs, axis1=1, axis2=2) / size + 1.0)
+        lhs += ridge[:, None, None] * np.eye(size)
+        params = np.linalg.solve(lhs, rhs[..., None])[..., 0]
+
+        predicted_x, predicted_y = predict(model, params, group, x, y)
+        residual = np.hypot(dx - predicted_x, dy - predicted_y)
+        ranked = mv.sort_within_groups(group, residual)
+        median = mv.group_percentile(ranked, starts, counts, 50)
+        scale = np.maximum(1.4826 * median, MIN_RESIDUAL_SCALE)
+        u = residual / scale[group]
+
+        if iteration < HUBER_ITERATIONS:
+            weight = np.minimum(1.0, HUBER_K / np.maximum(u, 1e-12))
+        else:
+            weight = np.where(u < TUKEY_C, (1 - (u / TUKEY_C) ** 2) ** 2, 0.0)
+
+    predicted_x, predicted_y = predict(model, params, group, x, y)
+    residual_x = dx - predicted_x
+    residual_y = dy - predicted_y
+    residual = np.hypot(residual_x, residual_y)
+    inlier = residual < TUKEY_C * scale[group]
+
+    # Too few vectors for a model: leave those frames uncompensated
+    fitted = counts >= MIN_MODEL_VECTORS
+    params[~fitted] = np.nan
+    unfitted_rows = ~fitted[group]
+    residual_x[unfitted_rows] = dx[unfitted_rows]
+    residual_y[unfitted_rows] = dy[unfitted_rows]
+
+    inliers = np.bincount(group[inlier], minlength=frames)
+    inlier_energy = np.bincount(
+        group[inlier], weights=residual[inlier] ** 2, minlength=frames
+    )
+
+    if model == "affine":
+        a, b, tx, c, d, ty = params.T
+    else:
+        s, r, tx, ty = params.T
+        a, b, c, d = s, -r, r, s
+    # Linear terms back to pixel units (per pixel of distance from the center)
+    a, b, c, d = a / norm, b / norm, c / norm, d / norm
+
+    result = pd.DataFrame(
+        {
+            "frame": frame[starts] if frames else np.zeros(0, dtype=np.int64),
+            "vectors": counts,
+            "inliers": inliers,
+            "pan_x": tx,
+            "pan_y": ty,
+            "zoom": 1 + (a + d) / 2,
+            "rotation_deg": np.degrees(np.arctan2(c - b, 2 + a + d)),
+            "a": a,
+            "b": b,
+            "c": c,
+            "d": d,
+            "residual_rms": np.sqrt(inlier_energy / np.maximum(inliers, 1)),
+        }
+    )
+    result.attrs["center"] = (center_x, center_y)
+
+    if order is not None:
+        unsorted_x = np.empty_like(residual_x)
+        unsorted_y = np.empty_like(residual_y)
+        unsorted_x[order] = residual_x
+        unsorted_y[order] = residual_y
+        residual_x, residual_y = unsorted_x, unsorted_y
+
+    return result, residual_x, residual_y
+
+
+def compensate_camera_motion(
+    df: pd.DataFrame, residual_x: np.ndarray, residual_y: np.ndarray
+) -> pd.DataFrame:
+    """Replace the motion of `df` by the residual left after camera motion.
+
+    `motion_x`/`motion_y` (in `motion_scale` units) and `src_x`/`src_y` are
+    rewritten so the result can go straight to `reduce_motion_vectors` and
+    `draw_motion_vectors`; `residual_x`/`residual_y` hold the pixels.
+    """
+    compensated = df.copy()
+    scale = (
+        compensated["motion_scale"].to_numpy(np.float64).clip(min=1)
+        if "motion_scale" in compensated.columns
+        else 1.0
+    )
+    compensated["residual_x"] = residual_x
+    compensated["residual_y"] = residual_y
+    compensated["motion_x"] = residual_x * scale
+    compensated["motion_y"] = residual_y * scale
+    if "src_x" in compensated.columns:
+        compensated["src_x"] = compensated["dst_x"] + residual_x
+        compensated["src_y"] = compensated["dst_y"] + residual_y
+    return compensated
+
+
+def estimate_camera_motion(
+    csv_file: str, output_path: Optional[str] = None, model: str = "similarity"
+) -> pd.DataFrame:
+    df = mv.load_motion_vector_columns(csv_file, CAMERA_COLUMNS)
+
+    start = time.perf_counter()
+    result, _, _ = fit_camera_motion(df, model)
+    seconds = time.perf_counter() - start
+
+    if output_path is None:
+        output_path = os.path.splitext(csv_file)[0] + "_camera_motion.csv"
+    result.to_csv(output_path, index=False, float_format="%.6f")
+
+    print(
+        f"Fitted {model} camera motion to {len(result)} frames "
+        f"({len(df):,} vectors) in {seconds:.2f} s: "
+        f"{len(result) / max(seconds, 1e-9):,.0f} frames/s"
+    )
+    print(f"Camera motion saved to: {output_path}")
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m video_generation.camera_motion "
+            "<motion_vectors_csv> [output_csv] [similarity|affine]"
+        )
+        sys.exit(1)
+
+    csv_file = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+    model = sys.argv[3] if len(sys.argv) > 3 else "similarity"
+
+    if model not in CAMERA_MODELS:
+        print(f"Error: unknown model '{model}', use one of {list(CAMERA_MODELS)}")
+        sys.exit(1)
+
+    estimate_camera_motion(csv_file, output_path, model)
@@ -1,10 +1,56 @@
 import cv2
+import hashlib
+import math
 import numpy as np
+import os
 import sys
 from tqdm import tqdm
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import video_generation.motion_vector as mv
+from video_generation.motion_segments import load_segments, select_frames
+from utils.tracing import span, write_trace
+
+# Skipping fewer frames than this decodes through them, farther ones seek
+SEEK_MIN_FRAMES = 16
+# Widest output: tiles are shrunk so that a row of them fits
+GRID_MAX_WIDTH = 3840
+GRID_LINE_COLOR = (128, 128, 128)
+# Columns the tiles' hash covers: everything draw_motion_vectors reads
+TILE_HASH_COLUMNS = ["src_x", "src_y", "dst_x", "dst_y", "motion_x", "motion_y"]
+
+
+def grid_shape(tiles: int, columns: Optional[int] = None) -> Tuple[int, int]:
+    """(rows, columns) of a grid of `tiles`; up to 3 tiles stay in one row."""
+    if columns is None:
+        columns = tiles if tiles <= 3 else math.ceil(math.sqrt(tiles))
+    columns = max(1, min(columns, tiles))
+    return math.ceil(tiles / columns), columns
+
+
+def draw_label(img: np.ndarray, text: str, x: int, y: int, tile_height: int):
+    font_scale = max(0.4, 0.8 * tile_height / 720)
+    thickness = max(1, round(2 * font_scale))
+    (width, height), baseline = cv2.getTextSize(
+        text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness
+    )
+    margin = max(2, height // 3)
+    cv2.rectangle(
+        img,
+        (x, y),
+        (x + width + 2 * margin, y + height + baseline + 2 * margin),
+        (0, 0, 0),
+        -1,
+    )
+    cv2.putText(
+        img,
+        text,
+        (x + margin, y + margin + height),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        font_scale,
+        (255, 255, 255),
+        thickness,
+    )
 
 
 def create_combined_video(
@@ -13,26 +59,67 @@ def create_combined_video(
     output_path: str,
     video_segment_index: Optional[int] = None,
     max_frames: int = 660,
+    frame_ranges: Optional[List[Tuple[int, int]]] = None,
+    scale: float = 1.0,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    step: int = 1,
+    labels: Optional[List[str]] = None,
+    columns: Optional[int] = None,
+    max_width: Optional[int] = GRID_MAX_WIDTH,
+    overlay: bool = False,
 ):
+    """Render the motion vectors of each dataframe and the input video as a grid.
+
+    The tiles are laid out in `columns` columns (by default one row for up
+    to 3 tiles, a square-ish grid for more), each with its entry of `labels`
+    in the corner. The video tile goes at `video_segment_index`, by default
+    after the motion tiles; with `overlay` there is none and the vectors are
+    drawn over the dimmed video in every tile instead. Tiles are shrunk so
+    the grid is at most `max_width` pixels wide.
+
+    The video is decoded once per frame for all tiles, and sources with
+    identical vectors in a frame (e.g. patched and unpatched decoder) share
+    one drawn tile. Frames `start`..`end` (every `step`-th, at most
+    `max_frames` of them) are rendered; the capture seeks to the window
+    instead of decoding from the first frame.
+    """
     video_capture = cv2.VideoCapture(input_video_filename)
     if not video_capture.isOpened():
         raise IOError(f"Cannot open video file {input_video_filename}")
 
     try:
-        frame_width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-        frame_height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        source_width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        source_height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
         fps = int(video_capture.get(cv2.CAP_PROP_FPS))
 
-        # Calculate number of segments: one per motion dataframe + one for original video
-        if len(motion_dataframes) > 0:
-            num_segments = len(motion_dataframes) + 1
-        else:
-            num_segments = 1
-        combined_width = frame_width * num_segments
+        # One tile per motion dataframe, plus one for the video
+        num_tiles = len(motion_dataframes) + (0 if overlay else 1)
+        num_tiles = max(num_tiles, 1)
+        grid_rows, grid_columns = grid_shape(num_tiles, columns)
+
+        # Tile size from the video metadata, shrunk for proxies and wide grids
+        tile_scale = scale
+        if max_width:
+            tile_scale = min(tile_scale, max_width / (grid_columns * source_width))
+        frame_width, frame_height = mv.scaled_size(
+            source_width, source_height, tile_scale
+        )
+        draw_scale = frame_width / source_width
+        budget = mv.proxy_budget(15000, tile_scale)
 
-        # Default video segment index: append the video after the motion segments
-        if video_segment_index is None:
-            video_segment_index = len(motion_dataframes)
+        labels = list(labels or [])[: len(motion_dataframes)]
+        for i in range(len(labels), len(motion_dataframes)):
+            labels.append(f"Source {i + 1}")
+        labels.append("Video")
+
+        # Tile position -> motion dataframe index, None for the video
+        sources: List[Optional[int]] = list(range(len(motion_dataframes)))
+        if not overlay:
+            if video_segment_index is None:
+                video_segment_index = len(motion_dataframes)
+            video_segment_index = max(0, min(video_segment_index, len(sources)))
+            sources.insert(video_segment_index, None)
 
         # Determine maximum frames across all data sources
         max_csv_frames = (
@@ -46,88 +133,129 @@ def create_combined_video(
         total_video_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
         num_frames = max(max_csv_frames, total_video_frames)
 
+        with span("render.magnitude_order", sources=len(motion_dataframes)):
+            magnitude_orders = [mv.MagnitudeOrder(df) for df in motion_dataframes]
+            # Drawn columns in one contiguous array per source, for hashing
+            hash_columns = [
+                np.ascontiguousarray(df[TILE_HASH_COLUMNS].to_numpy(np.int32))
+                for df in motion_dataframes
+            ]
+
         # Initialize video writer for output
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        combined_width = frame_width * grid_columns
+        combined_height = frame_height * grid_rows
         video_writer = cv2.VideoWriter(
-            output_path, fourcc, fps, (combined_width, frame_height)
+            output_path, fourcc, fps, (combined_width, combined_height)
         )
 
         # Reset to first frame
         video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        next_video_frame = 1
 
-        for frame_number in tqdm(
-            range(1, num_frames + 1), desc="Rendering video frames"
-        ):
-            if frame_number > max_frames:
-                break
+        # Frame window, then only frames inside frame_ranges (e.g. active
+        # motion segments)
+        first_frame = 1 if start is None else start
+        last_frame = num_frames if end is None else end
+        frame_numbers = np.arange(first_frame, last_frame + 1, step)[:max_frames]
+        frame_numbers = select_frames(frame_numbers, frame_ranges)
 
-            # Initialize combined frame canvas
-            combined_frame = np.zeros((frame_height, combined_width, 3), dtype=np.uint8)
+        drawn_tiles = reused_tiles = 0
+        with span(
+            "render.grid_frames",
+            frames=len(frame_numbers),
+            sources=len(motion_dataframes),
+            grid=f"{grid_rows}x{grid_columns}",
+            tile=f"{frame_width}x{frame_height}",
+        ) as frames_span:
+            for frame_number in tqdm(frame_numbers, desc="Rendering video frames"):
+                skip = frame_number - next_video_frame
+                if 0 < skip < SEEK_MIN_FRAMES:
+                    for _ in range(skip):
+                        video_capture.grab()
+                elif skip != 0 and frame_number <= total_video_frames:
+                    video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number - 1)
+                next_video_frame = frame_number + 1
 
-            # Read current video frame
-            if frame_number <= total_video_frames:
-                frame_read_success, video_frame = video_capture.read()
-                if not frame_read_success:
+                # Decode and resize the video frame once for all tiles
+                video_frame = None
+                if frame_number <= total_video_frames:
+                    frame_read_success, decoded = video_capture.read()
+                    if frame_read_success:
+                        video_frame = cv2.resize(
+                            decoded,
+                            (frame_width, frame_height),
+                            interpolation=cv2.INTER_AREA,
+                        )
+                if video_frame is None:
                     video_frame = np.zeros(
                         (frame_height, frame_width, 3), dtype=np.uint8
                     )
+                if overlay:
+                    background = cv2.convertScaleAbs(video_frame, alpha=0.5)
                 else:
-                    video_frame = cv2.resize(video_frame, (frame_width, frame_height))
-            else:
-                video_frame = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
-
-            for segment_index in range(num_segments):
-                segment_x_offset = segment_index * frame_width
-
-                if segment_index == video_segment_index:
-                    # Place original video frame
-                    combined_frame[
-                        :, segment_x_offset : segment_x_offset + frame_width
-                    ] = video_frame
-                else:
-                    # Draw motion vectors for corresponding method
-                    motion_df_index = (
-                        segment_index
-                        if segment_index < video_segment_index
-                        else segment_index - 1
-                    )
+                    background = np.zeros_like(video_frame)
 
-                    # Handle out-of-range indices gracefully
-                    if motion_df_index < 0 or motion_df_index >= len(motion_dataframes):
-                        segment_image = np.zeros(
-                            (frame_height, frame_width, 3), dtype=np.uint8
-                        )
+                combined_frame = np.zeros(
+                    (combined_height, combined_width, 3), dtype=np.uint8
+                )
+                # Tiles drawn in this frame by the hash of their vectors
+                tiles = {}
+                for position, source in enumerate(sources):
+                    if source is None:
+                        tile = video_frame
                     else:
-                        current_dataframe = motion_dataframes[motion_df_index]
-                        segment_image = np.zeros(
-                            (frame_height, frame_width, 3), dtype=np.uint8
+                        # Same vectors as reduce_motion_vectors(max_vectors=15000)
+                        # at full scale, fewer and spread out on smaller tiles
+                        rows = magnitude_orders[source].frame_rows(
+                            frame_number,
+                            max_vectors=budget,
+                            min_magnitude=2,
+                            uniform=tile_scale < 1,
                         )
-                        frame_motion_data = current_dataframe[
-                            current_dataframe["frame"] == frame_number
-                        ]
+                        key = hashlib.blake2b(
+                            hash_columns[source][rows].tobytes(), digest_size=16
+                        ).digest()
+                        tile = tiles.get(key)
+                        if tile is None:
+                            tile = background.copy()
+                            mv.draw_motion_vectors(
+                                tile, motion_dataframes[source].iloc[rows], draw_scale
+                            )
+                            tiles[key] = tile
+                            drawn_tiles += 1
+                        else:
+                            reused_tiles += 1
 
-                        frame_motion_data = mv.reduce_motion_vectors(
-                            frame_motion_data, max_vectors=15000
-                        )
-                        mv.draw_motion_vectors(segment_image, frame_motion_data)
+                    y = (position // grid_columns) * frame_height
+                    x = (position % grid_columns) * frame_width
+                    combined_frame[y : y + frame_height, x : x + frame_width] = tile
+                    label = labels[len(labels) - 1 if source is None else source]
+                    draw_label(combined_frame, label, x, y, frame_height)
 
-                    combined_frame[
-                        :, segment_x_offset : segment_x_offset + frame_width
-                    ] = segment_image
-
-                # Draw vertical dividing line between segments
-                if segment_index > 0:
+                # Dividing lines between the tiles
+                for column in range(1, grid_columns):
+                    x = column * frame_width
                     cv2.line(
-                        combined_frame,
-                        (segment_x_offset, 0),
-                        (segment_x_offset, frame_height),
-                        (128, 128, 128),
-                        1,
+                        combined_frame, (x, 0), (x, combined_height), GRID_LINE_COLOR, 1
                     )
+                for row in range(1, grid_rows):
+                    y = row * frame_height
+                    cv2.line(
+                        combined_frame, (0, y), (combined_width, y), GRID_LINE_COLOR, 1
+                    )
+
+                video_writer.write(combined_frame)
 
-            video_writer.write(combined_frame)
+            video_writer.release()
+            frames_span.set(drawn_tiles=drawn_tiles, reused_tiles=reused_tiles)
 
-        video_writer.release()
+        if drawn_tiles + reused_tiles:
+            print(
+                f"[INFO] {combined_width}x{combined_height} grid of {num_tiles} tiles: "
+                f"drew {drawn_tiles} motion vector tiles, reused {reused_tiles} "
+                "identical ones"
+            )
         return output_path
 
     finally:
@@ -135,37 +263,101 @@ def create_combined_video(
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 4:
+    args = sys.argv[1:]
+    positional = []
+    csv_files = []
+    labels = []
+    scale = 1.0
+    columns = None
+    max_width = GRID_MAX_WIDTH
+    overlay = False
+    window = {"--start": None, "--end": None, "--step": 1}
+    while args:
+        arg = args.pop(0)
+        if arg == "--scale" and args:
+            scale = mv.parse_scale(args.pop(0))
+        elif arg == "--csv":
+            while args and not args[0].startswith("--"):
+                csv_files.append(args.pop(0))
+        elif arg == "--label" and args:
+            labels.append(args.pop(0))
+        elif arg == "--columns" and args:
+            columns = int(args.pop(0))
+        elif arg == "--max-width" and args:
+            max_width = int(args.pop(0)) or None
+        elif arg == "--overlay":
+            overlay = True
+        elif arg in window and args:
+            window[arg] = int(args.pop(0))
+        else:
+            positional.append(arg)
+    start, end, step = window["--start"], window["--end"], window["--step"]
+
+    # Without --csv the two CSVs follow the video file
+    if not csv_files and len(positional) >= 4:
+        csv_files = positional[1:3]
+        positional = positional[:1] + positional[3:]
+
+    if len(positional) < 2 or not csv_files:
         print(
             "Usage: python combine_motion_vectors_with_video.py "
-            "[video_file] [csv_file] [results_path] [video_segment_index] [max_frames]"
+            "[video_file] [csv_file_orig] [csv_file_cust] [results_path] "
+            "[video_segment_index] [max_frames] [segments_csv] [--scale 1/2] "
+            "[--start N] [--end N] [--step N]"
+        )
+        print(
+            "       python combine_motion_vectors_with_video.py "
+            "[video_file] [results_path] [video_segment_index] [max_frames] "
+            "[segments_csv] --csv a.csv b.csv ... [--label A --label B ...] "
+            "[--columns N] [--max-width 3840] [--overlay]"
         )
         sys.exit(1)
 
-    input_video_filename = sys.argv[1]
-    csv_file_path_orig = sys.argv[2]
-    csv_file_path_cust = sys.argv[3]
-    results_directory = sys.argv[4]
+    input_video_filename = positional[0]
+    results_directory = positional[1]
 
-    original_motion_vectors = mv.load_motion_vectors(csv_file_path_orig)
-    custom_motion_vectors = mv.load_motion_vectors(csv_file_path_cust)
-
-    if len(sys.argv) > 5:
-        video_position = int(sys.argv[5])
+    if len(positional) > 2:
+        video_position = int(positional[2])
     else:
         video_position = None
 
-    if len(sys.argv) > 6:
-        max_frames_to_process = int(sys.argv[6])
+    if len(positional) > 3:
+        max_frames_to_process = int(positional[3])
     else:
         max_frames_to_process = 660
 
+    # Only the MV frames of the rendered window are read
+    first_frame = 1 if start is None else start
+    last_frame = first_frame + (max_frames_to_process - 1) * step
+    if end is not None:
+        last_frame = min(end, last_frame)
+    motion_dataframes = []
+    for csv_file in csv_files:
+        with span("render.load", file=os.path.basename(csv_file)):
+            motion_dataframes.append(
+                mv.load_motion_vector_range(csv_file, first_frame, last_frame)
+            )
+    for csv_file in csv_files[len(labels) :]:
+        labels.append(os.path.splitext(os.path.basename(csv_file))[0])
+
+    frame_ranges = load_segments(positional[4]) if len(positional) > 4 else None
+
     output_path = f"{results_directory}/combined_motion_vectors_with_video.mp4"
     output_file_path = create_combined_video(
         input_video_filename,
-        [original_motion_vectors, custom_motion_vectors],
+        motion_dataframes,
         output_path,
         video_position,
         max_frames_to_process,
+        frame_ranges,
+        scale,
+        start,
+        end,
+        step,
+        labels,
+        columns,
+        max_width,
+        overlay,
     )
     print(f"Combined video saved as {output_file_path}")
+    write_trace(results_directory)
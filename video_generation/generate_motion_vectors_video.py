@@ -1,78 +1,285 @@
 import sys
+import time
 import numpy as np
 import cv2
 import pandas as pd
 import os
 from tqdm import tqdm
+from typing import List, Optional, Tuple
 
 import video_generation.motion_vector as mv
+from video_generation.motion_segments import load_segments, select_frames
+from video_generation.mv_stream import follow_csv_frames
+from utils.tracing import span, write_trace
+
+
+def draw_frame(
+    frame_num: int,
+    frame_data: pd.DataFrame,
+    canvas_width: int,
+    canvas_height: int,
+    scale: float = 1.0,
+) -> np.ndarray:
+    img = np.zeros((canvas_height, canvas_width, 3), dtype=np.uint8)
+    mv.draw_motion_vectors(img, frame_data, scale)
+
+    cv2.putText(
+        img,
+        f"Frame: {frame_num}",
+        (int(50 * scale), int(50 * scale)),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        1.5 * scale,
+        (255, 255, 255),
+        max(1, round(3 * scale)),
+    )
+    cv2.putText(
+        img,
+        f"Vectors: {len(frame_data)}",
+        (int(50 * scale), int(100 * scale)),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        1.0 * scale,
+        (255, 255, 255),
+        max(1, round(2 * scale)),
+    )
+    return img
 
 
 def create_motion_vector_video(
     df: pd.DataFrame,
     output_path: str,
-    width: int = 1920,
-    height: int = 1080,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
     fps: int = 24,
     max_vectors: int = 15000,
+    frame_ranges: Optional[List[Tuple[int, int]]] = None,
+    scale: float = 1.0,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    step: int = 1,
 ):
-    """Create motion vector visualization video."""
+    """Create motion vector visualization video.
+
+    The canvas is `width` x `height`, by default the picture size covered by
+    the vectors. `scale` (e.g. 1/2, 1/4) renders a smaller proxy video with
+    a proportionally smaller, spatially uniform vector budget.
+    `frame_ranges` limits rendering to those inclusive (start, end) frame
+    ranges, e.g. the active segments from `motion_segments`, and
+    `start`/`end`/`step` to a window of every `step`-th frame.
+    """
 
-    frames = sorted(df["frame"].unique())
-    print(f"Creating video with {len(frames)} frames...")
+    if width is None or height is None:
+        width, height = mv.frame_size_from_vectors(df)
+    canvas_width, canvas_height = mv.scaled_size(width, height, scale)
+
+    # Strongest-first order of every frame, computed once for all frames
+    with span("render.magnitude_order", vectors=len(df)):
+        magnitude_order = mv.MagnitudeOrder(df)
+    frames = select_frames(magnitude_order.frames, frame_ranges)
+    frames = mv.window_frames(frames, start, end, step)
+    print(
+        f"Creating {canvas_width}x{canvas_height} video with {len(frames)} frames..."
+    )
 
     writer = cv2.VideoWriter(
-        output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+        output_path,
+        cv2.VideoWriter_fourcc(*"mp4v"),
+        fps,
+        (canvas_width, canvas_height),
     )
 
-    for frame_num in tqdm(frames, desc="Rendering"):
-        frame_data = df[df["frame"] == frame_num]
+    with span(
+        "render.frames",
+        frames=len(frames),
+        size=f"{canvas_width}x{canvas_height}",
+        file=os.path.basename(output_path),
+    ):
+        budget = mv.proxy_budget(max_vectors, scale)
+        for frame_num in tqdm(frames, desc="Rendering"):
+            # Like reduce_motion_vectors, over-budget frames drop weak vectors
+            over_budget = len(magnitude_order.frame_rows(frame_num)) > budget
+            frame_data = magnitude_order.reduce(
+                frame_num,
+                budget,
+                min_magnitude=2 if over_budget else None,
+                uniform=scale < 1,
+            )
 
-        if len(frame_data) > max_vectors:
-            frame_data = mv.reduce_motion_vectors(frame_data, max_vectors)
+            img = draw_frame(frame_num, frame_data, canvas_width, canvas_height, scale)
+            writer.write(img)
 
-        img = np.zeros((height, width, 3), dtype=np.uint8)
-        mv.draw_motion_vectors(img, frame_data)
+        writer.release()
+    print(f"Saved optimized motion vector video: {output_path}")
 
-        cv2.putText(
-            img,
-            f"Frame: {frame_num}",
-            (50, 50),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1.5,
-            (255, 255, 255),
-            3,
-        )
-        cv2.putText(
-            img,
-            f"Vectors: {len(frame_data)}",
-            (50, 100),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1.0,
-            (255, 255, 255),
-            2,
-        )
 
+def follow_motion_vector_video(
+    csv_file: str,
+    output_dir: str,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fps: int = 24,
+    max_vectors: int = 15000,
+    scale: float = 1.0,
+    segment_frames: int = 240,
+    preview: bool = False,
+    idle_timeout: float = 5.0,
+):
+    """Render a motion vector CSV while it is still being written.
+
+    Frames are drawn as soon as `follow_csv_frames` completes them and go to
+    rolling segments of `segment_frames` frames
+    (`motion_vectors_live_0000.mp4`, ...); a segment is playable once it is
+    closed. `preview` also shows every frame in a window. The lag from a
+    frame's rows being written to the frame being rendered is reported.
+
+    Without `width`/`height` (the `--video` size) the canvas is at least
+    `MV_DEFAULT_FRAME_SIZE` and each new segment grows to the largest
+    picture the vectors have covered so far.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    budget = mv.proxy_budget(max_vectors, scale)
+    exact_size = width is not None and height is not None
+    if not exact_size:
+        width, height = mv.MV_DEFAULT_FRAME_SIZE
+    writer = None
+    segment = segment_count = 0
+    lags = []
+
+    print(f"Following {csv_file} (stops after {idle_timeout:g} s without rows)...")
+    frames = follow_csv_frames(csv_file, idle_timeout=idle_timeout)
+    for frame_num, records, arrival in frames:
+        frame_data = pd.DataFrame(records)
+        if not exact_size and not frame_data.empty:
+            vectors_width, vectors_height = mv.frame_size_from_vectors(frame_data)
+            width, height = max(width, vectors_width), max(height, vectors_height)
+        if writer is None:
+            # A segment's size is fixed once its writer is open
+            canvas_width, canvas_height = mv.scaled_size(width, height, scale)
+            segment_path = os.path.join(
+                output_dir, f"motion_vectors_live_{segment:04d}.mp4"
+            )
+            writer = cv2.VideoWriter(
+                segment_path,
+                cv2.VideoWriter_fourcc(*"mp4v"),
+                fps,
+                (canvas_width, canvas_height),
+            )
+
+        if len(frame_data) > budget:
+            frame_data = mv.MagnitudeOrder(frame_data).reduce(
+                frame_num, budget, min_magnitude=2, uniform=scale < 1
+            )
+        img = draw_frame(frame_num, frame_data, canvas_width, canvas_height, scale)
         writer.write(img)
+        if preview:
+            cv2.imshow("Motion vectors", img)
+            cv2.waitKey(1)
+        lags.append(time.time() - arrival)
 
-    writer.release()
-    print(f"Saved optimized motion vector video: {output_path}")
+        segment_count += 1
+        if segment_count == segment_frames:
+            writer.release()
+            writer = None
+            recent = 1000 * np.mean(lags[-segment_frames:])
+            print(f"[INFO] Closed {segment_path} (mean lag {recent:.0f} ms)")
+            segment += 1
+            segment_count = 0
+
+    if writer is not None:
+        writer.release()
+        print(f"[INFO] Closed {segment_path}")
+    if preview:
+        cv2.destroyAllWindows()
+
+    if not lags:
+        print("[WARNING] No complete frames were read")
+        return None
+
+    lag_ms = 1000 * np.array(lags)
+    summary = {
+        "frames": len(lags),
+        "mean_lag_ms": float(lag_ms.mean()),
+        "p95_lag_ms": float(np.percentile(lag_ms, 95)),
+        "max_lag_ms": float(lag_ms.max()),
+    }
+    print(
+        f"Rendered {summary['frames']} frames, lag from rows written to frame "
+        f"rendered: mean {summary['mean_lag_ms']:.0f} ms, "
+        f"p95 {summary['p95_lag_ms']:.0f} ms, max {summary['max_lag_ms']:.0f} ms"
+    )
+    return summary
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python generate_motion_vectors_video.py [csv_file] [output_dir]")
+    args = sys.argv[1:]
+    positional = []
+    scale = 1.0
+    video_file = None
+    window = {"--start": None, "--end": None, "--step": 1}
+    follow = preview = False
+    segment_frames = 240
+    idle_timeout = 5.0
+    while args:
+        arg = args.pop(0)
+        if arg == "--scale" and args:
+            scale = mv.parse_scale(args.pop(0))
+        elif arg == "--video" and args:
+            video_file = args.pop(0)
+        elif arg == "--follow":
+            follow = True
+        elif arg == "--preview":
+            preview = True
+        elif arg == "--segment-frames" and args:
+            segment_frames = int(args.pop(0))
+        elif arg == "--idle-timeout" and args:
+            idle_timeout = float(args.pop(0))
+        elif arg in window and args:
+            window[arg] = int(args.pop(0))
+        else:
+            positional.append(arg)
+    start, end, step = window["--start"], window["--end"], window["--step"]
+
+    if len(positional) < 2:
+        print(
+            "Usage: python generate_motion_vectors_video.py "
+            "[csv_file] [output_dir] [segments_csv] [--scale 1/2] "
+            "[--video video_file] [--start N] [--end N] [--step N]"
+        )
+        print(
+            "       python generate_motion_vectors_video.py [csv_file] [output_dir] "
+            "--follow [--video video_file] [--segment-frames N] [--preview] "
+            "[--idle-timeout S]"
+        )
         sys.exit(1)
 
-    csv_file = sys.argv[1]
-    output_dir = sys.argv[2]
+    csv_file = positional[0]
+    output_dir = positional[1]
+    frame_ranges = load_segments(positional[2]) if len(positional) > 2 else None
+
+    # Video metadata gives the display size, the vectors only the coded size
+    width = height = None
+    if video_file:
+        width, height = mv.video_frame_size(video_file) or (None, None)
+
+    if follow:
+        follow_motion_vector_video(
+            csv_file,
+            output_dir,
+            width,
+            height,
+            scale=scale,
+            segment_frames=segment_frames,
+            preview=preview,
+            idle_timeout=idle_timeout,
+        )
+        sys.exit(0)
 
     if not os.path.isfile(csv_file):
         print(f"Error: File '{csv_file}' not found.")
         sys.exit(1)
 
     print("Loading motion vector data...")
-    df = mv.load_motion_vectors(csv_file)
+    with span("render.load", file=os.path.basename(csv_file)):
+        df = mv.load_motion_vector_range(csv_file, start, end)
 
     output_path = os.path.join(output_dir, "motion_vectors_video.mp4")
 
@@ -82,5 +289,16 @@ if __name__ == "__main__":
     )
 
     print("Creating motion vector video...")
-    create_motion_vector_video(df, output_path)
+    create_motion_vector_video(
+        df,
+        output_path,
+        width,
+        height,
+        frame_ranges=frame_ranges,
+        scale=scale,
+        start=start,
+        end=end,
+        step=step,
+    )
     print("Visualization complete!")
+    write_trace(output_dir)
@@ -0,0 +1,301 @@
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import video_generation.motion_vector as mv
+
+BLOB_COLUMNS = [
+    "frame",
+    "w",
+    "h",
+    "dst_x",
+    "dst_y",
+    "motion_x",
+    "motion_y",
+    "motion_scale",
+]
+BLOB_COLUMNS_OUT = [
+    "frame",
+    "track",
+    "x",
+    "y",
+    "width",
+    "height",
+    "cells",
+    "mean_dx",
+    "mean_dy",
+    "mean_magnitude",
+]
+# Macroblock resolution
+BLOB_CELL_SIZE = 16
+# Cells moving less than this (pixels) are background
+BLOB_THRESHOLD = 1.0
+BLOB_MIN_CELLS = 2
+# Frames scattered into grids at once
+BLOB_BATCH_FRAMES = 64
+
+# A box continues a track when it overlaps the track's last box this much
+TRACK_MIN_IOU = 0.2
+# Frames a track survives without a match (intra frames have no vectors)
+TRACK_MAX_GAP = 2
+
+
+def iter_motion_grids(
+    df: pd.DataFrame,
+    cell_size: int = BLOB_CELL_SIZE,
+    dx: Optional[np.ndarray] = None,
+    dy: Optional[np.ndarray] = None,
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """Yield (frame, dx grid, dy grid) with the mean motion of every cell.
+
+    Vectors land in the cell of their block center and are weighted by block
+    area. `BLOB_BATCH_FRAMES` frames are scattered with one `np.bincount`.
+    `dx`/`dy` override the motion of `df` (e.g. camera-compensated residuals).
+    """
+    if dx is None or dy is None:
+        dx, dy = mv.motion_displacement(df)
+    frame = df["frame"].to_numpy()
+    order, starts, counts, group = mv.group_frames(frame)
+    if not len(starts):
+        return
+
+    position_x = df["dst_x"].to_numpy(np.int64)
+    position_y = df["dst_y"].to_numpy(np.int64)
+    area = (df["w"].to_numpy(np.int64) * df["h"].to_numpy(np.int64)).astype(
+        np.float64
+    )
+    if order is not None:
+        frame, dx, dy = frame[order], dx[order], dy[order]
+        position_x, position_y, area = position_x[order], position_y[order], area[order]
+
+    cols = int(position_x.max()) // cell_size + 1
+    rows = int(position_y.max()) // cell_size + 1
+    cells = rows * cols
+    cell = np.clip(position_y // cell_size, 0, None) * cols + np.clip(
+        position_x // cell_size, 0, None
+    )
+
+    for first in range(0, len(starts), BLOB_BATCH_FRAMES):
+        last = min(first + BLOB_BATCH_FRAMES, len(starts))
+        begin = starts[first]
+        end = starts[last] if last < len(starts) else len(frame)
+        rows_slice = slice(begin, end)
+
+        index = (group[rows_slice] - first) * cells + cell[rows_slice]
+        size = (last - first) * cells
+        weight = np.bincount(index, area[rows_slice], size)
+        sum_x = np.bincount(index, area[rows_slice] * dx[rows_slice], size)
+        sum_y = np.bincount(index, area[rows_slice] * dy[rows_slice], size)
+
+        weight[weight == 0] = 1
+        grid_x = (sum_x / weight).astype(np.float32).reshape(-1, rows, cols)
+        grid_y = (sum_y / weight).astype(np.float32).reshape(-1, rows, cols)
+        for k in range(last - first):
+            yield int(frame[starts[first + k]]), grid_x[k], grid_y[k]
+
+
+def extract_blobs(
+    grid_x: np.ndarray,
+    grid_y: np.ndarray,
+    threshold: float = BLOB_THRESHOLD,
+    min_cells: int = BLOB_MIN_CELLS,
+) -> np.ndarray:
+    """Connected moving regions of one frame's motion grid.
+
+    Returns one row per blob: x0, y0, x1, y1 (cells, exclusive end), cells,
+    mean_dx, mean_dy, mean_magnitude.
+    """
+    magnitude = np.hypot(grid_x, grid_y)
+    mask = (magnitude >= threshold).astype(np.uint8)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(
+        mask, connectivity=8, ltype=cv2.CV_32S
+    )
+    if count <= 1:
+        return np.zeros((0, 8), dtype=np.float32)
+
+    flat = labels.ravel()
+    sum_x = np.bincount(flat, grid_x.ravel(), count)
+    sum_y = np.bincount(flat, grid_y.ravel(), count)
+    sum_magnitude = np.bincount(flat, magnitude.ravel(), count)
+
+    # Label 0 is the background
+    area = stats[1:, cv2.CC_STAT_AREA]
+    keep = area >= min_cells
+    left = stats[1:, cv2.CC_STAT_LEFT]
+    top = stats[1:, cv2.CC_STAT_TOP]
+    blobs = np.stack(
+        [
+            left,
+            top,
+            left + stats[1:, cv2.CC_STAT_WIDTH],
+            top + stats[1:, cv2.CC_STAT_HEIGHT],
+            area,
+            sum_x[1:] / area,
+            sum_y[1:] / area,
+            sum_magnitude[1:] / area,
+        ],
+        axis=1,
+    )
+    return blobs[keep].astype(np.float32)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (x0, y0, x1, y1) boxes, shape (len(a), len(b))."""
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class BlobTracker:
+    """Links blobs across frames by greedy box overlap.
+
+    Each box continues the live track it overlaps most (at least
+    `min_iou`), best pairs first; unmatched boxes start new tracks and
+    tracks unmatched for more than `max_gap` frames end.
+    """
+
+    def __init__(
+        self, min_iou: float = TRACK_MIN_IOU, max_gap: int = TRACK_MAX_GAP
+    ) -> None:
+        self.min_iou = min_iou
+        self.max_gap = max_gap
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.last_seen = np.zeros(0, dtype=np.int64)
+        self.next_id = 0
+
+    def update(self, frame: int, boxes: np.ndarray) -> np.ndarray:
+        """Track ids of `boxes` (x0, y0, x1, y1) seen in `frame`."""
+        alive = frame - self.last_seen <= self.max_gap + 1
+        self.boxes = self.boxes[alive]
+        self.ids = self.ids[alive]
+        self.last_seen = self.last_seen[alive]
+
+        track_ids = np.full(len(boxes), -1, dtype=np.int64)
+        if len(boxes) and len(self.boxes):
+            iou = box_iou(boxes, self.boxes)
+            pairs = np.argwhere(iou >= self.min_iou)
+            order = np.argsort(-iou[pairs[:, 0], pairs[:, 1]], kind="stable")
+            used = np.zeros(len(self.boxes), dtype=bool)
+            for box, track in pairs[order]:
+                if track_ids[box] < 0 and not used[track]:
+                    track_ids[box] = self.ids[track]
+                    used[track] = True
+                    self.boxes[track] = boxes[box]
+                    self.last_seen[track] = frame
+
+        new = track_ids < 0
+        if new.any():
+            created = np.arange(self.next_id, self.next_id + new.sum())
+            self.next_id += len(created)
+            track_ids[new] = created
+            self.boxes = np.concatenate([self.boxes, boxes[new]])
+            self.ids = np.concatenate([self.ids, created])
+            self.last_seen = np.concatenate(
+                [self.last_seen, np.full(len(created), frame, dtype=np.int64)]
+            )
+        return track_ids
+
+
+def detect_motion_blobs(
+    df: pd.DataFrame,
+    cell_size: int = BLOB_CELL_SIZE,
+    threshold: float = BLOB_THRESHOLD,
+    min_cells: int = BLOB_MIN_CELLS,
+    compensate: bool = False,
+) -> pd.DataFrame:
+    """Per-frame moving-region boxes (pixels) with mean motion and track ids.
+
+    With `compensate`, the global camera motion is removed first (see
+    `camera_motion`), so a panning background is not one big blob.
+    """
+    dx = dy = None
+    if compensate and len(df):
+        from video_generation.camera_motion import fit_camera_motion
+
+        _, dx, dy = fit_camera_motion(df)
+        dx, dy = dx.astype(np.float32), dy.astype(np.float32)
+
+    tracker = BlobTracker()
+    results: List[np.ndarray] = []
+    for frame, grid_x, grid_y in iter_motion_grids(df, cell_size, dx, dy):
+        blobs = extract_blobs(grid_x, grid_y, threshold, min_cells)
+        tracks = tracker.update(frame, blobs[:, :4])
+        if len(blobs):
+            boxes = blobs[:, :4] * cell_size
+            results.append(
+                np.column_stack(
+                    [
+                        np.full(len(blobs), frame),
+                        tracks,
+                        boxes[:, 0],
+                        boxes[:, 1],
+                        boxes[:, 2] - boxes[:, 0],
+                        boxes[:, 3] - boxes[:, 1],
+                        blobs[:, 4:],
+                    ]
+                )
+            )
+
+    table = np.concatenate(results) if results else np.zeros((0, 10))
+    result = pd.DataFrame(table, columns=BLOB_COLUMNS_OUT)
+    integer_columns = BLOB_COLUMNS_OUT[:7]
+    result[integer_columns] = result[integer_columns].astype(np.int64)
+    return result
+
+
+def extract_motion_blobs(
+    csv_file: str,
+    output_path: Optional[str] = None,
+    threshold: float = BLOB_THRESHOLD,
+    compensate: bool = False,
+) -> pd.DataFrame:
+    df = mv.load_motion_vector_columns(csv_file, BLOB_COLUMNS)
+    frames = df["frame"].nunique()
+
+    start = time.perf_counter()
+    blobs = detect_motion_blobs(df, threshold=threshold, compensate=compensate)
+    seconds = time.perf_counter() - start
+
+    if output_path is None:
+        output_path = os.path.splitext(csv_file)[0] + "_blobs.csv"
+    blobs.to_csv(output_path, index=False, float_format="%.3f")
+
+    print(
+        f"Found {len(blobs)} blobs in {blobs['track'].nunique()} tracks over "
+        f"{frames} frames in {seconds:.2f} s: "
+        f"{1000 * seconds / max(frames, 1):.2f} ms/frame"
+    )
+    print(f"Blobs saved to: {output_path}")
+    return blobs
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m video_generation.motion_blobs "
+            "<motion_vectors_csv> [output_csv] [threshold_px] [--compensate]"
+        )
+        sys.exit(1)
+
+    args = [arg for arg in sys.argv[1:] if arg != "--compensate"]
+    compensate = "--compensate" in sys.argv
+    csv_file = args[0]
+    output_path = args[1] if len(args) > 1 else None
+    threshold = float(args[2]) if len(args) > 2 else BLOB_THRESHOLD
+
+    if not os.path.isfile(csv_file):
+        print(f"Error: File '{csv_file}' not found.")
+        sys.exit(1)
+
+    extract_motion_blobs(csv_file, output_path, threshold, compensate)
@@ -0,0 +1,200 @@
+import os
+import sys
+from typing import Optional
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import video_generation.motion_vector as mv
+
+HEATMAP_CHUNK_ROWS = 1_000_000
+HEATMAP_COLUMNS = [
+    "frame",
+    "w",
+    "h",
+    "dst_x",
+    "dst_y",
+    "motion_x",
+    "motion_y",
+    "motion_scale",
+]
+# Colors span these percentiles of the cells with motion, so a few hot or
+# barely moving blocks don't wash out the map
+HEATMAP_CLIP_PERCENTILES = (1, 99.5)
+
+
+class MotionHeatmap:
+    """Accumulates motion magnitude over every block a vector covers.
+
+    Each vector adds its magnitude to the rectangle of its block (`dst_x`,
+    `dst_y` is the block center). Rectangles are written as four corner
+    entries of a 2D difference array with `np.bincount`, so the cost per
+    vector does not depend on the block size, and the grid is recovered with
+    two cumulative sums. The grid grows when vectors fall outside it.
+    """
+
+    def __init__(self, width: int = 0, height: int = 0, cell_size: int = 1) -> None:
+        self.cell_size = cell_size
+        cols = -(-width // cell_size)
+        rows = -(-height // cell_size)
+        # float64 so the cumulative sums don't lose small contributions
+        self.diff = np.zeros((rows + 1, cols + 1), dtype=np.float64)
+        self.vectors = 0
+        self.frames = set()
+
+    @property
+    def shape(self):
+        return self.diff.shape[0] - 1, self.diff.shape[1] - 1
+
+    def __grow__(self, rows: int, cols: int) -> None:
+        current_rows, current_cols = self.shape
+        if rows > current_rows or cols > current_cols:
+            # Entries in the old sentinel row/column still close their rectangles
+            self.diff = np.pad(
+                self.diff,
+                ((0, max(rows - current_rows, 0)), (0, max(cols - current_cols, 0))),
+            )
+
+    def add(self, df: pd.DataFrame) -> None:
+        dx, dy = mv.motion_displacement(df)
+        weight = np.hypot(dx, dy).astype(np.float64)
+        self.frames.update(np.unique(df["frame"].to_numpy()).tolist())
+        self.vectors += len(df)
+
+        w = df["w"].to_numpy(np.int64)
+        h = df["h"].to_numpy(np.int64)
+        left = df["dst_x"].to_numpy(np.int64) - w // 2
+        top = df["dst_y"].to_numpy(np.int64) - h // 2
+
+        cell = self.cell_size
+        x0 = np.maximum(left // cell, 0)
+        y0 = np.maximum(top // cell, 0)
+        x1 = -(-(left + w) // cell)
+        y1 = -(-(top + h) // cell)
+
+        keep = (weight > 0) & (x1 > x0) & (y1 > y0)
+        if not keep.any():
+            return
+        x0, y0, x1, y1, weight = x0[keep], y0[keep], x1[keep], y1[keep], weight[keep]
+
+        self.__grow__(int(y1.max()), int(x1.max()))
+        stride = self.diff.shape[1]
+        index = np.concatenate(
+            [y0 * stride + x0, y0 * stride + x1, y1 * stride + x0, y1 * stride + x1]
+        )
+        weights = np.concatenate([weight, -weight, -weight, weight])
+        self.diff += np.bincount(index, weights, minlength=self.diff.size).reshape(
+            self.diff.shape
+        )
+
+    def grid(self) -> np.ndarray:
+        """Summed magnitude per cell as float32."""
+        total = self.diff.cumsum(axis=0).cumsum(axis=1)[:-1, :-1]
+        return total.astype(np.float32)
+
+
+def accumulate_motion_heatmap(
+    csv_file: str,
+    width: int = 0,
+    height: int = 0,
+    cell_size: int = 1,
+    chunk_rows: int = HEATMAP_CHUNK_ROWS,
+) -> MotionHeatmap:
+    """Stream a motion vector CSV into a heatmap, `chunk_rows` rows at a time."""
+    heatmap = MotionHeatmap(width, height, cell_size)
+    reader = pd.read_csv(
+        csv_file,
+        usecols=HEATMAP_COLUMNS,
+        dtype={c: np.int32 for c in HEATMAP_COLUMNS},
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        heatmap.add(chunk)
+    return heatmap
+
+
+def read_video_frame(video_file: str, frame_index: int = 0) -> Optional[np.ndarray]:
+    capture = cv2.VideoCapture(video_file)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    ok, frame = capture.read()
+    capture.release()
+    return frame if ok else None
+
+
+def render_heatmap(
+    grid: np.ndarray,
+    output_file: str,
+    cell_size: int = 1,
+    background: Optional[np.ndarray] = None,
+) -> str:
+    """Write a log-scaled, colorized heatmap PNG, optionally over a video frame."""
+    scaled = np.log1p(grid)
+    moving = scaled[scaled > 0]
+    low, high = (0, 1)
+    if moving.size:
+        low, high = np.percentile(moving, HEATMAP_CLIP_PERCENTILES)
+    span = max(high - low, 1e-6)
+    levels = (np.clip((scaled - low) / span, 0, 1) * 255).astype(np.uint8)
+    levels[grid <= 0] = 0
+    image = cv2.applyColorMap(levels, cv2.COLORMAP_INFERNO)
+
+    if cell_size > 1:
+        rows, cols = grid.shape
+        image = cv2.resize(
+            image, (cols * cell_size, rows * cell_size), interpolation=cv2.INTER_NEAREST
+        )
+
+    if background is not None:
+        height, width = background.shape[:2]
+        image = cv2.resize(image[:height, :width], (width, height))
+        image = cv2.addWeighted(background, 0.4, image, 0.6, 0)
+
+    cv2.imwrite(output_file, image)
+    return output_file
+
+
+def generate_motion_heatmap(
+    csv_file: str,
+    output_dir: str,
+    cell_size: int = 1,
+    video_file: Optional[str] = None,
+):
+    background = read_video_frame(video_file) if video_file else None
+    height, width = background.shape[:2] if background is not None else (0, 0)
+
+    heatmap = accumulate_motion_heatmap(csv_file, width, height, cell_size)
+    grid = heatmap.grid()
+
+    os.makedirs(output_dir, exist_ok=True)
+    array_file = os.path.join(output_dir, "motion_heatmap.npy")
+    image_file = os.path.join(output_dir, "motion_heatmap.png")
+    np.save(array_file, grid)
+    render_heatmap(grid, image_file, cell_size, background)
+
+    print(
+        f"Accumulated {heatmap.vectors:,} vectors over {len(heatmap.frames)} frames "
+        f"into a {grid.shape[1]}x{grid.shape[0]} grid (cell {cell_size}px)"
+    )
+    print(f"Heatmap saved to: {image_file} (raw array: {array_file})")
+    return image_file, array_file
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(
+            "Usage: python -m video_generation.motion_heatmap "
+            "[csv_file] [output_dir] [cell_size] [video_file]"
+        )
+        sys.exit(1)
+
+    csv_file = sys.argv[1]
+    output_dir = sys.argv[2]
+    cell_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    video_file = sys.argv[4] if len(sys.argv) > 4 else None
+
+    if not os.path.isfile(csv_file):
+        print(f"Error: File '{csv_file}' not found.")
+        sys.exit(1)
+
+    generate_motion_heatmap(csv_file, output_dir, cell_size, video_file)
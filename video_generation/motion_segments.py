@@ -0,0 +1,357 @@
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import video_generation.motion_vector as mv
+
+SEGMENT_CHUNK_ROWS = 1_000_000
+SEGMENT_COLUMNS = ["frame", "motion_x", "motion_y", "motion_scale"]
+
+# Idle hysteresis on the mean vector magnitude (pixels): a stretch becomes
+# idle below IDLE_ENTER_ACTIVITY and active again above IDLE_EXIT_ACTIVITY,
+# and a state change needs that many consecutive frames to stick
+IDLE_ENTER_ACTIVITY = 0.25
+IDLE_EXIT_ACTIVITY = 0.5
+MIN_IDLE_FRAMES = 24
+MIN_ACTIVE_FRAMES = 3
+
+# A frame is a scene cut when its vector count or mean squared magnitude
+# jumps this many times above or below the running average
+CUT_COUNT_RATIO = 3.0
+CUT_ENERGY_RATIO = 8.0
+# Energies below this (px^2) count as this, so noise on static shots
+# doesn't look like a cut
+CUT_MIN_ENERGY = 1.0
+# Frames after a cut before the next one can be flagged
+MIN_CUT_SPACING = 6
+# Weight of the current frame in the running averages
+REFERENCE_ALPHA = 0.1
+
+
+@dataclass
+class Segment:
+    start: int
+    end: int
+    label: str
+    cut: bool
+    activity: float
+
+    @property
+    def frames(self) -> int:
+        return self.end - self.start + 1
+
+
+def iter_frame_activity(
+    csv_file: str, chunk_rows: int = SEGMENT_CHUNK_ROWS
+) -> Iterator[Tuple[int, int, float, float]]:
+    """Yield (frame, vectors, mean magnitude, mean squared magnitude) per frame.
+
+    The CSV is read `chunk_rows` rows at a time and reduced per run of equal
+    frame numbers with `np.add.reduceat`; the last run of a chunk is carried
+    into the next one, so a frame split across chunks is yielded once.
+    Frames without vectors don't appear in the CSV and are not yielded.
+    """
+    reader = pd.read_csv(
+        csv_file,
+        usecols=SEGMENT_COLUMNS,
+        dtype={c: np.int32 for c in SEGMENT_COLUMNS},
+        chunksize=chunk_rows,
+    )
+    carry = None
+    for chunk in reader:
+        if chunk.empty:
+            continue
+        dx, dy = mv.motion_displacement(chunk)
+        energy = dx.astype(np.float64) ** 2 + dy.astype(np.float64) ** 2
+        magnitude = np.sqrt(energy)
+
+        frame = chunk["frame"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, frame[1:] != frame[:-1]])
+        counts = np.diff(np.r_[starts, len(frame)])
+        magnitude_sums = np.add.reduceat(magnitude, starts)
+        energy_sums = np.add.reduceat(energy, starts)
+        frames = frame[starts]
+
+        runs = zip(
+            frames.tolist(),
+            counts.tolist(),
+            magnitude_sums.tolist(),
+            energy_sums.tolist(),
+        )
+        for run in runs:
+            if carry is not None and carry[0] == run[0]:
+                carry = (
+                    run[0],
+                    carry[1] + run[1],
+                    carry[2] + run[2],
+                    carry[3] + run[3],
+                )
+                continue
+            if carry is not None:
+                yield carry[0], carry[1], carry[2] / carry[1], carry[3] / carry[1]
+            carry = run
+
+    if carry is not None:
+        yield carry[0], carry[1], carry[2] / carry[1], carry[3] / carry[1]
+
+
+class MotionSegmenter:
+    """Streaming activity segmentation and scene cut detection.
+
+    Frames are fed one at a time with `update` and only a fixed amount of
+    state is kept (running averages and the open segment), so memory does
+    not depend on the clip length. Closed segments are appended to
+    `segments`; `finish` closes the last one.
+
+    Missing frame numbers are intra-only frames, which export no vectors;
+    with `intra_cuts` the first of them starts a new segment.
+    """
+
+    def __init__(
+        self,
+        idle_enter: float = IDLE_ENTER_ACTIVITY,
+        idle_exit: float = IDLE_EXIT_ACTIVITY,
+        min_idle_frames: int = MIN_IDLE_FRAMES,
+        min_active_frames: int = MIN_ACTIVE_FRAMES,
+        intra_cuts: bool = True,
+    ) -> None:
+        self.idle_enter = idle_enter
+        self.idle_exit = idle_exit
+        self.min_idle_frames = min_idle_frames
+        self.min_active_frames = min_active_frames
+        self.intra_cuts = intra_cuts
+
+        self.segments: List[Segment] = []
+        self.frames = 0
+        self.cuts = 0
+        self.skipped = 0
+        self.last_frame = None
+
+        # Open segment; label None until its first frame with vectors
+        self.start = None
+        self.label = None
+        self.cut = False
+        self.activity_sum = 0.0
+        self.activity_frames = 0
+
+        # Run of frames that disagree with the open segment's label
+        self.pending_start = None
+        self.pending_frames = 0
+        self.pending_sum = 0.0
+
+        self.reference_count = None
+        self.reference_energy = None
+        self.since_cut = 0
+
+    def __close__(self, end: int) -> None:
+        if self.start is None or end < self.start:
+            return
+        # A pending run too short to switch stays in the segment
+        total = self.activity_sum + self.pending_sum
+        activity = total / max(self.activity_frames + self.pending_frames, 1)
+        self.segments.append(
+            Segment(self.start, end, self.label or "active", self.cut, activity)
+        )
+
+    def __open__(self, start: int, label: Optional[str], cut: bool) -> None:
+        self.start = start
+        self.label = label
+        self.cut = cut
+        self.activity_sum = 0.0
+        self.activity_frames = 0
+        self.pending_start = None
+        self.pending_frames = 0
+        self.pending_sum = 0.0
+
+    def __scene_cut__(self, frame: int) -> None:
+        self.__close__(frame - 1)
+        self.__open__(frame, None, True)
+        self.reference_count = None
+        self.reference_energy = None
+        self.since_cut = 0
+        self.cuts += 1
+
+    def __is_discontinuity__(self, count: int, energy: float) -> bool:
+        if self.reference_count is None or self.since_cut < MIN_CUT_SPACING:
+            return False
+        count_ratio = count / max(self.reference_count, 1.0)
+        energy_ratio = max(energy, CUT_MIN_ENERGY) / max(
+            self.reference_energy, CUT_MIN_ENERGY
+        )
+        return (
+            abs(math.log(count_ratio)) > math.log(CUT_COUNT_RATIO)
+            or abs(math.log(energy_ratio)) > math.log(CUT_ENERGY_RATIO)
+        )
+
+    def __track_label__(self, frame: int, activity: float) -> None:
+        if self.label is None:
+            self.label = "idle" if activity < self.idle_enter else "active"
+
+        if self.label == "active":
+            disagrees = activity < self.idle_enter
+            needed = self.min_idle_frames
+        else:
+            disagrees = activity > self.idle_exit
+            needed = self.min_active_frames
+
+        if not disagrees:
+            # Frames between the thresholds keep the current label
+            if self.pending_frames:
+                self.activity_sum += self.pending_sum
+                self.activity_frames += self.pending_frames
+                self.pending_start = None
+                self.pending_frames = 0
+                self.pending_sum = 0.0
+            self.activity_sum += activity
+            self.activity_frames += 1
+            return
+
+        if self.pending_start is None:
+            self.pending_start = frame
+        self.pending_frames += 1
+        self.pending_sum += activity
+
+        if self.pending_frames >= needed:
+            # The change started at the first disagreeing frame
+            start, frames, total = (
+                self.pending_start,
+                self.pending_frames,
+                self.pending_sum,
+            )
+            label = "idle" if self.label == "active" else "active"
+            self.pending_frames = 0
+            self.pending_sum = 0.0
+            self.__close__(start - 1)
+            self.__open__(start, label, False)
+            self.activity_sum = total
+            self.activity_frames = frames
+
+    def update(self, frame: int, count: int, activity: float, energy: float) -> None:
+        """Feed one frame: vector count, mean magnitude and mean squared magnitude."""
+        if self.last_frame is not None and frame <= self.last_frame:
+            self.skipped += 1
+            return
+
+        if self.start is None:
+            self.__open__(frame, None, False)
+        elif frame > self.last_frame + 1:
+            self.frames += frame - self.last_frame - 1
+            if self.intra_cuts:
+                self.__scene_cut__(self.last_frame + 1)
+        self.last_frame = frame
+        self.frames += 1
+
+        if self.__is_discontinuity__(count, energy):
+            self.__scene_cut__(frame)
+
+        if self.reference_count is None:
+            self.reference_count = float(count)
+            self.reference_energy = energy
+        else:
+            self.reference_count += REFERENCE_ALPHA * (count - self.reference_count)
+            self.reference_energy += REFERENCE_ALPHA * (energy - self.reference_energy)
+        self.since_cut += 1
+
+        self.__track_label__(frame, activity)
+
+    def finish(self) -> List[Segment]:
+        if self.last_frame is not None:
+            self.__close__(self.last_frame)
+            self.start = None
+        return self.segments
+
+
+def segment_motion(
+    csv_file: str, chunk_rows: int = SEGMENT_CHUNK_ROWS, **options
+) -> MotionSegmenter:
+    segmenter = MotionSegmenter(**options)
+    for frame, count, activity, energy in iter_frame_activity(csv_file, chunk_rows):
+        segmenter.update(frame, count, activity, energy)
+    segmenter.finish()
+    return segmenter
+
+
+def write_segments(segments: Sequence[Segment], output_path: str) -> str:
+    pd.DataFrame(
+        {
+            "start": [s.start for s in segments],
+            "end": [s.end for s in segments],
+            "frames": [s.frames for s in segments],
+            "label": [s.label for s in segments],
+            "cut": [int(s.cut) for s in segments],
+            "activity": [round(s.activity, 4) for s in segments],
+        }
+    ).to_csv(output_path, index=False)
+    return output_path
+
+
+def load_segments(
+    segments_file: str, labels: Sequence[str] = ("active",)
+) -> List[Tuple[int, int]]:
+    """Inclusive (start, end) frame ranges of the segments with one of `labels`."""
+    df = pd.read_csv(segments_file)
+    df = df[df["label"].isin(labels)]
+    return list(zip(df["start"].astype(int), df["end"].astype(int)))
+
+
+def select_frames(frames, ranges: Optional[Sequence[Tuple[int, int]]]) -> np.ndarray:
+    """The frame numbers of `frames` inside any of the inclusive `ranges`."""
+    frames = np.asarray(frames)
+    if ranges is None:
+        return frames
+    if not len(ranges):
+        return frames[:0]
+    bounds = np.array(sorted(ranges), dtype=np.int64)
+    index = np.searchsorted(bounds[:, 0], frames, side="right") - 1
+    inside = (index >= 0) & (frames <= bounds[np.maximum(index, 0), 1])
+    return frames[inside]
+
+
+def detect_motion_segments(
+    csv_file: str, output_path: Optional[str] = None, fps: float = 24.0
+) -> List[Segment]:
+    start = time.perf_counter()
+    segmenter = segment_motion(csv_file)
+    seconds = time.perf_counter() - start
+
+    if output_path is None:
+        output_path = os.path.splitext(csv_file)[0] + "_segments.csv"
+    write_segments(segmenter.segments, output_path)
+
+    idle = sum(s.frames for s in segmenter.segments if s.label == "idle")
+    speed = segmenter.frames / max(seconds, 1e-9)
+    print(
+        f"Segmented {segmenter.frames} frames into {len(segmenter.segments)} "
+        f"segments ({segmenter.cuts} scene cuts, {idle} idle frames) in "
+        f"{seconds:.2f} s: {speed:,.0f} frames/s, {speed / fps:,.0f}x real time "
+        f"at {fps:g} fps"
+    )
+    if segmenter.skipped:
+        print(f"[WARNING] Ignored {segmenter.skipped} out-of-order frame run(s)")
+    print(f"Segments saved to: {output_path}")
+    return segmenter.segments
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m video_generation.motion_segments "
+            "<motion_vectors_csv> [output_csv] [fps]"
+        )
+        sys.exit(1)
+
+    csv_file = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+    fps = float(sys.argv[3]) if len(sys.argv) > 3 else 24.0
+
+    if not os.path.isfile(csv_file):
+        print(f"Error: File '{csv_file}' not found.")
+        sys.exit(1)
+
+    detect_motion_segments(csv_file, output_path, fps)
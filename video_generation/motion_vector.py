@@ -1,11 +1,35 @@
+import io
+import os
+import sys
+from fractions import Fraction
+from typing import Optional, Sequence, Tuple
+
 import numpy as np
 import pandas as pd
 import cv2
 
+from utils.atomic_write import replace_on_write
+
+MV_DIRECTION_BINS = 8
+MV_STATS_PERCENTILES = (50, 90, 99)
+# H.264 partition sizes, anything else is counted as "other"
+MV_BLOCK_SIZES = [(16, 16), (16, 8), (8, 16), (8, 8), (8, 4), (4, 8), (4, 4)]
+MV_STATS_COLUMNS = ["frame", "source", "w", "h", "motion_x", "motion_y", "motion_scale"]
+# Grid cell (pixels) of the spatially uniform level of detail
+MV_UNIFORM_CELL_SIZE = 32
+MV_MACROBLOCK_SIZE = 16
+# Canvas when neither the vectors nor a video give a size
+MV_DEFAULT_FRAME_SIZE = (1920, 1080)
+# Sidecar file with the byte offset of every frame of a motion vector CSV
+MV_FRAME_INDEX_SUFFIX = ".frames.npz"
+MV_FRAME_INDEX_BLOCK_BYTES = 64 << 20
+
 
 def load_motion_vectors(csv_file: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_file)
+    return clean_motion_vectors(pd.read_csv(csv_file))
 
+
+def clean_motion_vectors(df: pd.DataFrame) -> pd.DataFrame:
     # Verify and convert columns to numeric types
     expected_cols = [
         "frame",
@@ -39,6 +63,134 @@ def load_motion_vectors(csv_file: str) -> pd.DataFrame:
     return df.reset_index(drop=True)
 
 
+def build_frame_index(csv_file: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Frame numbers and byte offsets where each run of equal frames starts.
+
+    The file is memory-mapped and scanned in blocks with numpy: line starts
+    come from the newline positions and the leading `frame` field is parsed
+    digit by digit for all lines at once.
+    """
+    data = np.memmap(csv_file, dtype=np.uint8, mode="r")
+    size = len(data)
+    header_end = np.flatnonzero(np.asarray(data[: min(size, 1 << 16)]) == 10)
+    begin = int(header_end[0]) + 1 if len(header_end) else size
+
+    frames, offsets = [], []
+    last = None
+    while begin < size:
+        end = min(begin + MV_FRAME_INDEX_BLOCK_BYTES, size)
+        window = np.asarray(data[begin:end])
+        newlines = np.flatnonzero(window == 10)
+        # Stop at the last complete line, the rest goes to the next block
+        stop = int(newlines[-1]) + 1 if end < size and len(newlines) else len(window)
+        window = window[:stop]
+
+        starts = np.r_[0, newlines[newlines < stop - 1] + 1]
+        commas = np.flatnonzero(window == ord(","))
+        position = np.searchsorted(commas, starts)
+        valid = position < len(commas)
+        starts = starts[valid]
+        length = commas[position[valid]] - starts
+
+        value = np.zeros(len(starts), dtype=np.int64)
+        for k in range(int(length.max()) if len(length) else 0):
+            digit = length > k
+            value[digit] = value[digit] * 10 + window[starts[digit] + k] - ord("0")
+
+        if len(value):
+            change = np.r_[value[0] != last, value[1:] != value[:-1]]
+            frames.append(value[change])
+            offsets.append(starts[change] + begin)
+            last = value[-1]
+        begin += stop
+
+    if not frames:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(frames), np.concatenate(offsets).astype(np.int64)
+
+
+def load_frame_index(csv_file: str) -> Tuple[np.ndarray, np.ndarray]:
+    """The frame index of `csv_file`, cached next to it until the CSV changes."""
+    index_file = csv_file + MV_FRAME_INDEX_SUFFIX
+    stat = os.stat(csv_file)
+    if os.path.isfile(index_file):
+        cached = np.load(index_file)
+        if cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime:
+            return cached["frames"], cached["offsets"]
+
+    frames, offsets = build_frame_index(csv_file)
+    try:
+        # Renamed into place, concurrent readers never see a partial cache
+        with replace_on_write(index_file) as tmp_path, open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                frames=frames,
+                offsets=offsets,
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+            )
+    except OSError:
+        # Read-only results directory, index is rebuilt next time
+        pass
+    return frames, offsets
+
+
+def load_motion_vector_range(
+    csv_file: str, start: Optional[int] = None, end: Optional[int] = None
+) -> pd.DataFrame:
+    """`load_motion_vectors` for frames in [start, end] only.
+
+    With frames in file order (extractor output) only the bytes of the
+    window are read, located with the frame index; otherwise the CSV is
+    read in chunks and filtered.
+    """
+    if start is None and end is None:
+        return load_motion_vectors(csv_file)
+
+    frames, offsets = load_frame_index(csv_file)
+    low = -np.inf if start is None else start
+    high = np.inf if end is None else end
+    with open(csv_file, "rb") as f:
+        header = f.readline()
+        columns = header.decode().strip().split(",")
+
+        if np.all(frames[1:] > frames[:-1]):
+            first = np.searchsorted(frames, low, "left")
+            last = np.searchsorted(frames, high, "right")
+            if first == last:
+                return clean_motion_vectors(pd.DataFrame(columns=columns))
+            f.seek(offsets[first])
+            size = offsets[last] - offsets[first] if last < len(frames) else -1
+            df = pd.read_csv(io.BytesIO(f.read(size)), names=columns, header=None)
+            return clean_motion_vectors(df)
+
+    chunks = [
+        chunk[(chunk["frame"] >= low) & (chunk["frame"] <= high)]
+        for chunk in pd.read_csv(csv_file, chunksize=1_000_000)
+    ]
+    return clean_motion_vectors(pd.concat(chunks, ignore_index=True))
+
+
+def window_frames(
+    frames,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    step: int = 1,
+) -> np.ndarray:
+    """The frame numbers of `frames` in [start, end], every `step`-th from start."""
+    frames = np.asarray(frames)
+    keep = np.ones(len(frames), dtype=bool)
+    if start is not None:
+        keep &= frames >= start
+    if end is not None:
+        keep &= frames <= end
+    frames = frames[keep]
+    if step > 1 and len(frames):
+        origin = frames[0] if start is None else start
+        frames = frames[(frames - origin) % step == 0]
+    return frames
+
+
 def reduce_motion_vectors(frame_data: pd.DataFrame, max_vectors: int = 10000):
     # Calculate motion magnitude
     mag = np.hypot(frame_data["motion_x"], frame_data["motion_y"])
@@ -56,11 +208,113 @@ def reduce_motion_vectors(frame_data: pd.DataFrame, max_vectors: int = 10000):
     return significant
 
 
-def draw_motion_vectors(img: np.ndarray, frame_data: pd.DataFrame):
-    src_x = frame_data["src_x"].values.astype(int)
-    src_y = frame_data["src_y"].values.astype(int)
-    dst_x = frame_data["dst_x"].values.astype(int)
-    dst_y = frame_data["dst_y"].values.astype(int)
+class MagnitudeOrder:
+    """Per-frame vector order by descending magnitude, computed once.
+
+    `order` holds the row positions of `df` grouped by frame, strongest
+    first, and `magnitude` the matching magnitudes (raw motion units, like
+    `reduce_motion_vectors`). Any `max_vectors`/threshold reduction of a
+    frame is then a prefix slice of `order`, without copying or sorting.
+
+    The uniform variant keeps only the strongest vector of every
+    `cell_size` grid cell, so dense frames stay readable at low budgets.
+    """
+
+    def __init__(self, df: pd.DataFrame, cell_size: int = MV_UNIFORM_CELL_SIZE):
+        self.df = df
+        self.cell_size = cell_size
+
+        frame = df["frame"].to_numpy()
+        magnitude = np.hypot(
+            df["motion_x"].to_numpy(np.float32), df["motion_y"].to_numpy(np.float32)
+        )
+        order, starts, counts, group = group_frames(frame)
+        rows = np.arange(len(frame)) if order is None else order
+
+        # Descending magnitude inside each frame with one stable integer sort
+        key = group.astype(np.uint64) << np.uint64(32)
+        key |= ~magnitude[rows].view(np.uint32)
+        rank = np.argsort(key, kind="stable")
+
+        self.order = rows[rank]
+        self.magnitude = magnitude[self.order]
+        self.group = group
+        self.frames = frame[rows[starts]] if len(frame) else frame[:0]
+        self.offsets = np.r_[starts, len(frame)].astype(np.int64)
+        self.uniform = None
+
+    def __uniform__(self):
+        if self.uniform is None:
+            cell = self.cell_size
+            x = self.df["dst_x"].to_numpy(np.int64)[self.order] // cell
+            y = self.df["dst_y"].to_numpy(np.int64)[self.order] // cell
+            x = np.clip(x, 0, None)
+            y = np.clip(y, 0, None)
+            cols = int(x.max()) + 1 if len(x) else 1
+            cells = (int(y.max()) + 1 if len(y) else 1) * cols
+
+            # Rows are strongest first, so a cell's first row is its strongest
+            _, first = np.unique(self.group * cells + y * cols + x, return_index=True)
+            keep = np.zeros(len(self.order), dtype=bool)
+            keep[first] = True
+            counts = np.bincount(self.group[keep], minlength=len(self.frames))
+            self.uniform = (
+                self.order[keep],
+                self.magnitude[keep],
+                np.r_[0, np.cumsum(counts)].astype(np.int64),
+            )
+        return self.uniform
+
+    def frame_rows(
+        self,
+        frame: int,
+        max_vectors: Optional[int] = None,
+        min_magnitude: Optional[float] = None,
+        uniform: bool = False,
+    ) -> np.ndarray:
+        """Row positions of the strongest vectors of `frame`, as a view.
+
+        Keeps at most `max_vectors` rows with magnitude above `min_magnitude`.
+        """
+        if uniform:
+            order, magnitude, offsets = self.__uniform__()
+        else:
+            order, magnitude, offsets = self.order, self.magnitude, self.offsets
+        index = np.searchsorted(self.frames, frame)
+        if index >= len(self.frames) or self.frames[index] != frame:
+            return order[:0]
+
+        begin, end = offsets[index], offsets[index + 1]
+        if min_magnitude is not None:
+            # Count of magnitudes above the threshold in the descending run
+            end = begin + np.searchsorted(-magnitude[begin:end], -min_magnitude)
+        if max_vectors is not None:
+            end = min(end, begin + max_vectors)
+        return order[begin:end]
+
+    def reduce(
+        self,
+        frame: int,
+        max_vectors: Optional[int] = None,
+        min_magnitude: Optional[float] = None,
+        uniform: bool = False,
+    ) -> pd.DataFrame:
+        """Rows of `frame` as `reduce_motion_vectors` would keep them."""
+        rows = self.frame_rows(frame, max_vectors, min_magnitude, uniform)
+        return self.df.iloc[rows]
+
+
+def draw_motion_vectors(img: np.ndarray, frame_data: pd.DataFrame, scale: float = 1.0):
+    # Coordinates are scaled for proxy canvases, the color classes are not
+    src_x = frame_data["src_x"].values
+    src_y = frame_data["src_y"].values
+    dst_x = frame_data["dst_x"].values
+    dst_y = frame_data["dst_y"].values
+    if scale != 1.0:
+        src_x, src_y = np.rint(src_x * scale), np.rint(src_y * scale)
+        dst_x, dst_y = np.rint(dst_x * scale), np.rint(dst_y * scale)
+    src_x, src_y = src_x.astype(int), src_y.astype(int)
+    dst_x, dst_y = dst_x.astype(int), dst_y.astype(int)
     motion_x = frame_data["motion_x"].values
     motion_y = frame_data["motion_y"].values
 
@@ -86,3 +340,258 @@ def draw_motion_vectors(img: np.ndarray, frame_data: pd.DataFrame):
         cv2.circle(img, (src_x[idx], src_y[idx]), 1, (255, 255, 255), -1)
 
     return img
+
+
+def frame_size_from_vectors(df: pd.DataFrame) -> Tuple[int, int]:
+    """Coded picture size covered by the vectors' blocks (whole macroblocks)."""
+    if df.empty:
+        return MV_DEFAULT_FRAME_SIZE
+    half_w = df["w"] // 2 if "w" in df.columns else MV_MACROBLOCK_SIZE // 2
+    half_h = df["h"] // 2 if "h" in df.columns else MV_MACROBLOCK_SIZE // 2
+    right = int((df["dst_x"] + half_w).max())
+    bottom = int((df["dst_y"] + half_h).max())
+    block = MV_MACROBLOCK_SIZE
+    return -(-right // block) * block, -(-bottom // block) * block
+
+
+def video_frame_size(video_file: str) -> Optional[Tuple[int, int]]:
+    capture = cv2.VideoCapture(video_file)
+    try:
+        if not capture.isOpened():
+            return None
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        return (width, height) if width and height else None
+    finally:
+        capture.release()
+
+
+def parse_scale(text: str) -> float:
+    """Render scale from "1", "1/2", "0.25", ...; must be in (0, 1]."""
+    scale = float(Fraction(text))
+    if not 0 < scale <= 1:
+        raise ValueError(f"scale must be in (0, 1], got {text}")
+    return scale
+
+
+def proxy_budget(max_vectors: int, scale: float) -> int:
+    # Arrows per pixel stay the same on a proxy canvas
+    return max(1, int(max_vectors * scale * scale))
+
+
+def scaled_size(width: int, height: int, scale: float) -> Tuple[int, int]:
+    # Encoders want even dimensions
+    return (
+        max(2, int(round(width * scale / 2)) * 2),
+        max(2, int(round(height * scale / 2)) * 2),
+    )
+
+
+def load_motion_vector_columns(
+    csv_file: str, columns: Sequence[str] = MV_STATS_COLUMNS
+) -> pd.DataFrame:
+    """Read only `columns` as int32, much faster than `load_motion_vectors`.
+
+    Falls back to `load_motion_vectors` for CSVs without those columns.
+    """
+    try:
+        return pd.read_csv(
+            csv_file, usecols=list(columns), dtype={c: np.int32 for c in columns}
+        )
+    except ValueError:
+        return load_motion_vectors(csv_file)
+
+
+def motion_displacement(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-vector motion in pixels (motion_x / motion_scale, else dst - src)."""
+    if "motion_x" in df.columns and "motion_scale" in df.columns:
+        scale = df["motion_scale"].to_numpy(np.float32)
+        scale[scale <= 0] = 1
+        dx = df["motion_x"].to_numpy(np.float32) / scale
+        dy = df["motion_y"].to_numpy(np.float32) / scale
+    else:
+        dx = (df["dst_x"] - df["src_x"]).to_numpy(np.float32)
+        dy = (df["dst_y"] - df["src_y"]).to_numpy(np.float32)
+    return dx, dy
+
+
+def group_frames(frame: np.ndarray):
+    """Group rows by frame number.
+
+    Returns (order, starts, counts, group): `order` sorts the rows by frame
+    (None when they already are, as extractor output is), `starts`/`counts`
+    delimit each frame's run in that order and `group` is the frame index of
+    every sorted row.
+    """
+    order = None
+    if np.any(frame[1:] < frame[:-1]):
+        order = np.argsort(frame, kind="stable")
+        frame = frame[order]
+
+    rows = len(frame)
+    starts = np.flatnonzero(np.r_[True, frame[1:] != frame[:-1]]) if rows else []
+    starts = np.asarray(starts, dtype=np.int64)
+    counts = np.diff(np.r_[starts, rows]).astype(np.int64)
+    group = np.repeat(np.arange(len(starts)), counts)
+    return order, starts, counts, group
+
+
+def sort_within_groups(group: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Sort non-negative `values` inside each run of `group`, as float64.
+
+    Non-negative floats sort like their bit patterns, so packing
+    (group, float32 bits) into one uint64 key needs a single integer sort.
+    """
+    key = group.astype(np.uint64) << np.uint64(32)
+    key |= values.astype(np.float32).view(np.uint32)
+    key.sort()
+    ranked = (key & np.uint64(0xFFFFFFFF)).astype(np.uint32).view(np.float32)
+    return ranked.astype(np.float64)
+
+
+def group_percentile(
+    ranked: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float
+) -> np.ndarray:
+    # Linear interpolation between closest ranks, same as np.percentile
+    position = (counts - 1) * (q / 100.0)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, counts - 1)
+    below = ranked[starts + low]
+    above = ranked[starts + high]
+    return below + (above - below) * (position - low)
+
+
+def frame_motion_stats(
+    df: pd.DataFrame,
+    direction_bins: int = MV_DIRECTION_BINS,
+    percentiles: Sequence[float] = MV_STATS_PERCENTILES,
+) -> pd.DataFrame:
+    """Compute a per-frame motion statistics table in one vectorized pass.
+
+    Rows are grouped by frame (extractor output already is), so every frame
+    is a contiguous run: sums come from `np.add.reduceat` and histograms are
+    `np.bincount` over `frame_index * bins + bin`. Percentiles are index
+    lookups after one `sort_within_groups` of the magnitudes.
+
+    Columns: vector count, static (zero motion) count, magnitude mean,
+    percentiles and max in pixels, motion energy (sum of squared
+    magnitudes), mean displacement, a direction histogram of moving vectors
+    (0 degrees = right, 90 = up) with the magnitude weighted dominant
+    direction, past/future reference counts (`source` < 0 / > 0) and a block
+    size histogram.
+    """
+    direction_labels = [
+        f"dir_{round(i * 360 / direction_bins)}" for i in range(direction_bins)
+    ]
+    block_labels = [f"block_{w}x{h}" for w, h in MV_BLOCK_SIZES] + ["block_other"]
+
+    dx, dy = motion_displacement(df)
+    frame = df["frame"].to_numpy()
+
+    order, starts, counts, group = group_frames(frame)
+    if order is not None:
+        frame = frame[order]
+        dx = dx[order]
+        dy = dy[order]
+    magnitude = np.hypot(dx, dy)
+
+    rows = len(frame)
+    if rows == 0:
+        columns = ["frame", "count", "static_count", "mean_magnitude"]
+        columns += [f"p{q:g}_magnitude" for q in percentiles]
+        columns += ["max_magnitude", "energy", "mean_dx", "mean_dy"]
+        columns += ["dominant_direction"] + direction_labels
+        columns += ["past_refs", "future_refs"] + block_labels
+        return pd.DataFrame(columns=columns)
+
+    frames = len(starts)
+    ranked = sort_within_groups(group, magnitude)
+
+    magnitude64 = magnitude.astype(np.float64)
+    stats = {
+        "frame": frame[starts],
+        "count": counts,
+        "static_count": np.bincount(group[magnitude == 0], minlength=frames),
+        "mean_magnitude": np.add.reduceat(magnitude64, starts) / counts,
+    }
+
+    for q in percentiles:
+        stats[f"p{q:g}_magnitude"] = group_percentile(ranked, starts, counts, q)
+
+    stats["max_magnitude"] = ranked[starts + counts - 1]
+    stats["energy"] = np.add.reduceat(magnitude64 * magnitude64, starts)
+    stats["mean_dx"] = np.add.reduceat(dx.astype(np.float64), starts) / counts
+    stats["mean_dy"] = np.add.reduceat(dy.astype(np.float64), starts) / counts
+
+    # Bins are centered on their angle; image y grows downwards
+    moving = magnitude > 0
+    angle = np.arctan2(-dy[moving], dx[moving])
+    direction = np.floor(angle * (direction_bins / (2 * np.pi)) + 0.5).astype(np.int64)
+    direction %= direction_bins
+    slots = group[moving] * direction_bins + direction
+    size = frames * direction_bins
+    histogram = np.bincount(slots, minlength=size).reshape(frames, direction_bins)
+    weighted = np.bincount(slots, weights=magnitude64[moving], minlength=size)
+    weighted = weighted.reshape(frames, direction_bins)
+
+    dominant = np.argmax(weighted, axis=1) * (360.0 / direction_bins)
+    stats["dominant_direction"] = np.where(weighted.max(axis=1) > 0, dominant, np.nan)
+    for i, label in enumerate(direction_labels):
+        stats[label] = histogram[:, i]
+
+    if "source" in df.columns:
+        source = df["source"].to_numpy()
+        source = source if order is None else source[order]
+        stats["past_refs"] = np.bincount(group[source < 0], minlength=frames)
+        stats["future_refs"] = np.bincount(group[source > 0], minlength=frames)
+
+    if "w" in df.columns and "h" in df.columns:
+        w = df["w"].to_numpy()
+        h = df["h"].to_numpy()
+        if order is not None:
+            w = w[order]
+            h = h[order]
+        block = np.full(rows, len(MV_BLOCK_SIZES), dtype=np.int64)
+        for i, (block_w, block_h) in enumerate(MV_BLOCK_SIZES):
+            block[(w == block_w) & (h == block_h)] = i
+        bins = len(block_labels)
+        blocks = np.bincount(group * bins + block, minlength=frames * bins)
+        blocks = blocks.reshape(frames, bins)
+        for i, label in enumerate(block_labels):
+            stats[label] = blocks[:, i]
+
+    return pd.DataFrame(stats)
+
+
+def write_frame_stats(stats: pd.DataFrame, output_path: str) -> str:
+    """Write the stats table as Parquet (.parquet) or CSV; returns the path."""
+    if output_path.endswith(".parquet"):
+        try:
+            stats.to_parquet(output_path, index=False)
+        except ImportError:
+            print("[ERROR] Parquet output needs pyarrow, use a .csv output instead.")
+            raise
+        return output_path
+
+    stats.to_csv(output_path, index=False, float_format="%.4f")
+    return output_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m video_generation.motion_vector "
+            "<motion_vectors_csv> [output.csv|output.parquet]"
+        )
+        sys.exit(1)
+
+    csv_file = sys.argv[1]
+    output_path = (
+        sys.argv[2]
+        if len(sys.argv) > 2
+        else os.path.splitext(csv_file)[0] + "_frame_stats.csv"
+    )
+
+    stats = frame_motion_stats(load_motion_vector_columns(csv_file))
+    output_path = write_frame_stats(stats, output_path)
+    print(f"Motion statistics for {len(stats)} frames saved to: {output_path}")
@@ -0,0 +1,229 @@
+import os
+import sys
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import video_generation.motion_vector as mv
+
+STORE_COLUMNS = [
+    "frame",
+    "source",
+    "w",
+    "h",
+    "src_x",
+    "src_y",
+    "dst_x",
+    "dst_y",
+    "motion_x",
+    "motion_y",
+    "motion_scale",
+]
+# Per-frame summaries: block extent of all vectors and the largest magnitude
+SUMMARY_COLUMNS = ["x0", "y0", "x1", "y1", "max_magnitude"]
+
+
+class MotionVectorStore:
+    """Frame-sorted columnar motion vectors with per-frame summaries.
+
+    Every column is one numpy array sorted by frame. `frames[k]` occupies
+    rows `offsets[k]:offsets[k + 1]`, so a frame range is a single slice.
+    For each frame the store keeps the bounding box of its blocks and its
+    largest magnitude (pixels), which lets ROI and magnitude queries skip
+    whole frames without reading their rows.
+
+    `save` writes one `.npy` per array; `open` memory-maps them, so reopening
+    a store costs nothing until rows are read.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        frames: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None,
+        summary: Optional[Dict[str, np.ndarray]] = None,
+    ) -> None:
+        self.columns = columns
+        if offsets is not None:
+            self.frames, self.offsets, self.summary = frames, offsets, summary
+            return
+
+        frame = columns["frame"]
+        starts = np.flatnonzero(np.r_[True, frame[1:] != frame[:-1]])
+        starts = starts if len(frame) else np.zeros(0, dtype=np.int64)
+        self.frames = frame[starts]
+        self.offsets = np.r_[starts, len(frame)].astype(np.int64)
+
+        def extent(values, reduce):
+            if not len(starts):
+                return values[:0]
+            return reduce.reduceat(values, starts)
+
+        left = columns["dst_x"] - columns["w"] // 2
+        top = columns["dst_y"] - columns["h"] // 2
+        self.summary = {
+            "x0": extent(left, np.minimum),
+            "y0": extent(top, np.minimum),
+            "x1": extent(left + columns["w"], np.maximum),
+            "y1": extent(top + columns["h"], np.maximum),
+            "max_magnitude": extent(columns["magnitude"], np.maximum),
+        }
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "MotionVectorStore":
+        frame = df["frame"].to_numpy()
+        order = None
+        if np.any(frame[1:] < frame[:-1]):
+            order = np.argsort(frame, kind="stable")
+
+        columns = {}
+        for name in STORE_COLUMNS:
+            if name in df.columns:
+                values = df[name].to_numpy(np.int32)
+                columns[name] = values if order is None else values[order]
+
+        dx, dy = mv.motion_displacement(df)
+        magnitude = np.hypot(dx, dy)
+        columns["magnitude"] = magnitude if order is None else magnitude[order]
+        return cls(columns)
+
+    @classmethod
+    def from_csv(cls, csv_file: str) -> "MotionVectorStore":
+        return cls.from_dataframe(
+            mv.load_motion_vector_columns(csv_file, STORE_COLUMNS)
+        )
+
+    def save(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        arrays = dict(self.columns, frames=self.frames, offsets=self.offsets)
+        arrays.update(self.summary)
+        for name, values in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), values)
+        return directory
+
+    @classmethod
+    def open(cls, directory: str) -> "MotionVectorStore":
+        arrays = {}
+        for filename in os.listdir(directory):
+            if filename.endswith(".npy"):
+                path = os.path.join(directory, filename)
+                arrays[filename[:-4]] = np.load(path, mmap_mode="r")
+        frames = arrays.pop("frames")
+        offsets = arrays.pop("offsets")
+        summary = {name: arrays.pop(name) for name in SUMMARY_COLUMNS}
+        return cls(arrays, frames, offsets, summary)
+
+    def __len__(self) -> int:
+        return len(self.columns["frame"])
+
+    def frame_range(
+        self, start: Optional[int] = None, end: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """Indices [first, last) into `frames` of the frames in [start, end]."""
+        first = 0 if start is None else np.searchsorted(self.frames, start, "left")
+        last = (
+            len(self.frames)
+            if end is None
+            else np.searchsorted(self.frames, end, "right")
+        )
+        return int(first), int(max(first, last))
+
+    def frame(self, frame: int) -> Dict[str, np.ndarray]:
+        """Views of the rows of one frame."""
+        first, last = self.frame_range(frame, frame)
+        return self.__views__(self.offsets[first], self.offsets[last])
+
+    def __views__(self, begin: int, end: int) -> Dict[str, np.ndarray]:
+        return {name: values[begin:end] for name, values in self.columns.items()}
+
+    def select(
+        self,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        min_magnitude: Optional[float] = None,
+    ) -> np.ndarray:
+        """Row indices matching all filters, in frame order.
+
+        `roi` is (x0, y0, x1, y1) in pixels, exclusive end; a vector matches
+        when its block intersects it. `min_magnitude` keeps magnitudes
+        strictly above it. Frames whose summary rules them out are skipped.
+        """
+        first, last = self.frame_range(start, end)
+        candidate = np.ones(last - first, dtype=bool)
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            candidate &= self.summary["x0"][first:last] < x1
+            candidate &= self.summary["x1"][first:last] > x0
+            candidate &= self.summary["y0"][first:last] < y1
+            candidate &= self.summary["y1"][first:last] > y0
+        if min_magnitude is not None:
+            candidate &= self.summary["max_magnitude"][first:last] > min_magnitude
+
+        # Contiguous runs of candidate frames are filtered as one slice
+        edges = np.flatnonzero(np.diff(np.r_[0, candidate.view(np.int8), 0]))
+        selected = []
+        for run_start, run_end in zip(edges[0::2], edges[1::2]):
+            begin = self.offsets[first + run_start]
+            end_row = self.offsets[first + run_end]
+            mask = None
+            if roi is not None:
+                columns = self.__views__(begin, end_row)
+                left = columns["dst_x"] - columns["w"] // 2
+                top = columns["dst_y"] - columns["h"] // 2
+                mask = (left < x1) & (left + columns["w"] > x0)
+                mask &= (top < y1) & (top + columns["h"] > y0)
+            if min_magnitude is not None:
+                above = self.columns["magnitude"][begin:end_row] > min_magnitude
+                mask = above if mask is None else mask & above
+            if mask is None:
+                selected.append(np.arange(begin, end_row))
+            else:
+                selected.append(np.flatnonzero(mask) + begin)
+
+        if not selected:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(selected)
+
+    def query(
+        self,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        min_magnitude: Optional[float] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Columns of the matching rows.
+
+        A pure frame range returns zero-copy views of the store; with `roi`
+        or `min_magnitude` only the requested `columns` are gathered.
+        """
+        names = list(columns) if columns is not None else list(self.columns)
+        if roi is None and min_magnitude is None:
+            first, last = self.frame_range(start, end)
+            views = self.__views__(self.offsets[first], self.offsets[last])
+            return {name: views[name] for name in names}
+
+        rows = self.select(start, end, roi, min_magnitude)
+        return {name: self.columns[name][rows] for name in names}
+
+    def to_dataframe(self, result: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """A query result as a DataFrame for `reduce_motion_vectors` and friends."""
+        return pd.DataFrame(result, copy=False)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(
+            "Usage: python -m video_generation.motion_vector_store "
+            "<motion_vectors_csv> <store_dir>"
+        )
+        sys.exit(1)
+
+    store = MotionVectorStore.from_csv(sys.argv[1])
+    store.save(sys.argv[2])
+    print(
+        f"Stored {len(store):,} vectors of {len(store.frames)} frames "
+        f"in {sys.argv[2]}"
+    )
@@ -0,0 +1,320 @@
+"""Single-producer shared-memory ring buffer of motion vectors.
+
+The extractor hands over the `AVMotionVector` side data as raw bytes
+instead of formatting CSV, and Python maps the records in place.
+
+Layout of the shared memory block (little endian, all offsets in bytes):
+
+    0    control block, RING_CONTROL_BYTES (192)
+           0  magic u32 "MVRB"     4  version u32
+           8  capacity u64        16  record_bytes u32   20  frame_header_bytes u32
+          64  write_pos u64       72  frames_written u64 (producer owned)
+          80  stalls u64          88  stall_ns u64       96  dropped u64
+         104  closed u32
+         128  read_pos u64       136  frames_read u64    (consumer owned)
+    192  data area, `capacity` bytes (a multiple of RING_ALIGN)
+
+`write_pos` and `read_pos` count bytes since the start and never wrap; a
+message starts at data offset `pos % capacity`. Each message is one frame:
+
+    0   frame i32    4  method_id i32    8  count u32    12  size u32
+    16  written_ns u64 (CLOCK_REALTIME)  24  reserved u64
+    32  count * AVMotionVector (40 bytes each, FFmpeg's struct layout)
+
+`size` covers header, records and padding up to a multiple of RING_ALIGN
+(64), so a message never straddles the end of the data area: when it does
+not fit, the producer first writes and publishes a message with `count`
+RING_WRAP that fills the rest of the area, then continues at offset 0.
+
+The producer writes a message, then stores `write_pos` (a release store in
+C++, e.g. `std::atomic_ref<uint64_t>`); the consumer loads `write_pos`,
+reads the message and then stores `read_pos`. The producer waits (or drops
+the frame) while `write_pos + size - read_pos > capacity`, and sets
+`closed` after the last frame.
+"""
+
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from video_generation.mv_stream import MV_RECORD_DTYPE
+
+RING_MAGIC = 0x4252564D  # "MVRB"
+RING_VERSION = 1
+RING_ALIGN = 64
+RING_WRAP = 0xFFFFFFFF
+RING_CAPACITY = 32 << 20
+RING_POLL_INTERVAL = 0.0005
+
+# FFmpeg's AVMotionVector (libavutil/motion_vector.h), 40 bytes
+AV_MOTION_VECTOR_DTYPE = np.dtype(
+    {
+        "names": [
+            "source",
+            "w",
+            "h",
+            "src_x",
+            "src_y",
+            "dst_x",
+            "dst_y",
+            "flags",
+            "motion_x",
+            "motion_y",
+            "motion_scale",
+        ],
+        "formats": ["<i4", "u1", "u1", "<i2", "<i2", "<i2", "<i2", "<u8"]
+        + ["<i4", "<i4", "<u2"],
+    },
+    align=True,
+)
+
+RING_FRAME_HEADER_DTYPE = np.dtype(
+    {
+        "names": ["frame", "method_id", "count", "size", "written_ns"],
+        "formats": ["<i4", "<i4", "<u4", "<u4", "<u8"],
+        "offsets": [0, 4, 8, 12, 16],
+        "itemsize": 32,
+    }
+)
+
+RING_CONTROL_DTYPE = np.dtype(
+    {
+        "names": [
+            "magic",
+            "version",
+            "capacity",
+            "record_bytes",
+            "frame_header_bytes",
+            "write_pos",
+            "frames_written",
+            "stalls",
+            "stall_ns",
+            "dropped",
+            "closed",
+            "read_pos",
+            "frames_read",
+        ],
+        "formats": ["<u4", "<u4", "<u8", "<u4", "<u4"]
+        + ["<u8", "<u8", "<u8", "<u8", "<u8", "<u4"]
+        + ["<u8", "<u8"],
+        "offsets": [0, 4, 8, 16, 20, 64, 72, 80, 88, 96, 104, 128, 136],
+        "itemsize": 192,
+    }
+)
+RING_CONTROL_BYTES = RING_CONTROL_DTYPE.itemsize
+
+
+def message_size(count: int) -> int:
+    """Bytes taken by a frame of `count` records, padded to RING_ALIGN."""
+    size = RING_FRAME_HEADER_DTYPE.itemsize + count * AV_MOTION_VECTOR_DTYPE.itemsize
+    return -(-size // RING_ALIGN) * RING_ALIGN
+
+
+def to_av_records(records: np.ndarray) -> np.ndarray:
+    """`MV_RECORD_DTYPE` records (from the CSV) as `AVMotionVector` records."""
+    av = np.zeros(len(records), dtype=AV_MOTION_VECTOR_DTYPE)
+    for name in AV_MOTION_VECTOR_DTYPE.names:
+        av[name] = records[name]
+    return av
+
+
+def to_mv_records(frame: int, method_id: int, av: np.ndarray) -> np.ndarray:
+    """`AVMotionVector` records as `MV_RECORD_DTYPE`, the CSV columns."""
+    records = np.zeros(len(av), dtype=MV_RECORD_DTYPE)
+    records["frame"] = frame
+    records["method_id"] = method_id
+    for name in AV_MOTION_VECTOR_DTYPE.names:
+        records[name] = av[name]
+    return records
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach without registering with the resource tracker.
+
+    The tracker unlinks registered blocks when the process exits, which is
+    the producer's job; Python >= 3.13 has `track=False` for this.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class MotionVectorRingProducer:
+    """Reference producer; the C++ writer targets the same layout.
+
+    With `block` a full ring makes `write` wait for the consumer (counted
+    in `stalls`/`stall_ns`), otherwise the frame is dropped.
+    """
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        capacity: int = RING_CAPACITY,
+        block: bool = True,
+    ) -> None:
+        capacity = -(-capacity // RING_ALIGN) * RING_ALIGN
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=True, size=RING_CONTROL_BYTES + capacity
+        )
+        self.name = self.shm.name
+        self.capacity = capacity
+        self.block = block
+        self.control = np.ndarray((), RING_CONTROL_DTYPE, self.shm.buf)
+        self.control[()] = 0
+        self.control["capacity"] = capacity
+        self.control["record_bytes"] = AV_MOTION_VECTOR_DTYPE.itemsize
+        self.control["frame_header_bytes"] = RING_FRAME_HEADER_DTYPE.itemsize
+        self.control["version"] = RING_VERSION
+        self.control["magic"] = RING_MAGIC
+        self.write_pos = 0
+
+    def write(self, frame: int, records: np.ndarray, method_id: int = 0) -> bool:
+        """Append one frame of `AVMotionVector` records; False if dropped."""
+        size = message_size(len(records))
+        if size > self.capacity:
+            raise ValueError(f"Frame of {size} bytes exceeds ring of {self.capacity}")
+
+        offset = self.write_pos % self.capacity
+        if offset + size > self.capacity:
+            # The wrap marker is published on its own: waiting for the marker
+            # and the frame together could need more than `capacity` bytes
+            wrap = self.capacity - offset
+            if not self.__wait__(wrap):
+                self.control["dropped"] += 1
+                return False
+            self.__header__(offset)[()] = (-1, method_id, RING_WRAP, wrap, 0)
+            self.write_pos += wrap
+            self.control["write_pos"] = self.write_pos
+            offset = 0
+
+        if not self.__wait__(size):
+            self.control["dropped"] += 1
+            return False
+        start = RING_CONTROL_BYTES + offset
+        self.__header__(offset)[()] = (
+            frame,
+            method_id,
+            len(records),
+            size,
+            time.time_ns(),
+        )
+        data = np.ndarray(
+            len(records),
+            AV_MOTION_VECTOR_DTYPE,
+            self.shm.buf,
+            start + RING_FRAME_HEADER_DTYPE.itemsize,
+        )
+        data[:] = records
+
+        # Publish only after the message is complete
+        self.write_pos += size
+        self.control["write_pos"] = self.write_pos
+        self.control["frames_written"] += 1
+        return True
+
+    def close(self) -> None:
+        """Mark the stream finished; the consumer drains what is left."""
+        self.control["closed"] = 1
+
+    def release(self) -> None:
+        del self.control
+        self.shm.close()
+        self.shm.unlink()
+
+    def __header__(self, offset: int) -> np.ndarray:
+        return np.ndarray(
+            (), RING_FRAME_HEADER_DTYPE, self.shm.buf, RING_CONTROL_BYTES + offset
+        )
+
+    def __wait__(self, size: int) -> bool:
+        if self.write_pos + size - int(self.control["read_pos"]) <= self.capacity:
+            return True
+        if not self.block:
+            return False
+        start = time.perf_counter_ns()
+        while self.write_pos + size - int(self.control["read_pos"]) > self.capacity:
+            time.sleep(RING_POLL_INTERVAL)
+        self.control["stalls"] += 1
+        self.control["stall_ns"] += time.perf_counter_ns() - start
+        return True
+
+
+class MotionVectorRingConsumer:
+    """Attaches to a ring by name and reads its frames in order."""
+
+    def __init__(self, name: str) -> None:
+        self.shm = attach_shared_memory(name)
+        self.control = np.ndarray((), RING_CONTROL_DTYPE, self.shm.buf)
+        if int(self.control["magic"]) != RING_MAGIC:
+            raise ValueError(f"{name} is not a motion vector ring")
+        if int(self.control["version"]) != RING_VERSION:
+            raise ValueError(f"Unsupported ring version {int(self.control['version'])}")
+        self.capacity = int(self.control["capacity"])
+
+    def frames(
+        self, poll_interval: float = RING_POLL_INTERVAL, timeout: float = 10.0
+    ) -> Iterator[Tuple[int, int, np.ndarray, int]]:
+        """Yield (frame, method_id, records, written_ns) until the producer closes.
+
+        `records` is an `AV_MOTION_VECTOR_DTYPE` view into the ring, valid
+        until the next frame is requested; its space is handed back to the
+        producer then, so copy what has to be kept. Stops after `timeout`
+        seconds without data from a producer that never closed.
+        """
+        read_pos = int(self.control["read_pos"])
+        last_data = time.time()
+        while True:
+            if read_pos == int(self.control["write_pos"]):
+                if self.control["closed"]:
+                    # Frames may have been published just before closing
+                    if read_pos == int(self.control["write_pos"]):
+                        return
+                    continue
+                if time.time() - last_data > timeout:
+                    print(f"[WARNING] No frames for {timeout:g} s, giving up")
+                    return
+                time.sleep(poll_interval)
+                continue
+            last_data = time.time()
+
+            offset = read_pos % self.capacity
+            header = np.ndarray(
+                (), RING_FRAME_HEADER_DTYPE, self.shm.buf, RING_CONTROL_BYTES + offset
+            ).copy()
+            if int(header["count"]) != RING_WRAP:
+                records = np.ndarray(
+                    int(header["count"]),
+                    AV_MOTION_VECTOR_DTYPE,
+                    self.shm.buf,
+                    RING_CONTROL_BYTES + offset + RING_FRAME_HEADER_DTYPE.itemsize,
+                )
+                yield (
+                    int(header["frame"]),
+                    int(header["method_id"]),
+                    records,
+                    int(header["written_ns"]),
+                )
+                del records
+                self.control["frames_read"] += 1
+
+            read_pos += int(header["size"])
+            self.control["read_pos"] = read_pos
+
+    def stats(self) -> dict:
+        return {
+            name: int(self.control[name])
+            for name in ["frames_written", "frames_read", "stalls", "stall_ns"]
+            + ["dropped"]
+        }
+
+    def close(self) -> None:
+        del self.control
+        self.shm.close()
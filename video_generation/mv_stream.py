@@ -0,0 +1,360 @@
+import asyncio
+import io
+import os
+import select
+import subprocess
+import sys
+import time
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columns written by MotionVectorWriter (extractors/writer.cpp)
+MV_CSV_COLUMNS = [
+    "frame",
+    "method_id",
+    "source",
+    "w",
+    "h",
+    "src_x",
+    "src_y",
+    "dst_x",
+    "dst_y",
+    "flags",
+    "motion_x",
+    "motion_y",
+    "motion_scale",
+]
+MV_RECORD_DTYPE = np.dtype(
+    [(name, np.uint64 if name == "flags" else np.int32) for name in MV_CSV_COLUMNS]
+)
+MV_STREAM_CHUNK_BYTES = 4 << 20
+# Extractors take `<input> [do_print] [file_name]`
+MV_EXTRACTOR = "extractors/executables/extractor4"
+MV_PIPE_OUTPUT = "/dev/stdout"
+
+
+def parse_csv_rows(data: bytes, columns: List[str] = MV_CSV_COLUMNS) -> np.ndarray:
+    """Parse complete CSV lines (no header) into `MV_RECORD_DTYPE` records.
+
+    `flags` is written as hex ("0x1"); only its distinct values are
+    converted in Python.
+    """
+    if not data:
+        return np.zeros(0, dtype=MV_RECORD_DTYPE)
+    df = pd.read_csv(
+        io.BytesIO(data),
+        names=columns,
+        header=None,
+        dtype={c: (str if c == "flags" else np.int32) for c in columns},
+    )
+    records = np.zeros(len(df), dtype=MV_RECORD_DTYPE)
+    for name in columns:
+        if name == "flags":
+            codes, values = pd.factorize(df[name])
+            lookup = np.array([int(v, 16) for v in values], dtype=np.uint64)
+            records[name] = lookup[codes] if len(values) else 0
+        elif name in MV_RECORD_DTYPE.names:
+            records[name] = df[name].to_numpy()
+    return records
+
+
+def format_csv_rows(records: np.ndarray) -> bytes:
+    """Format records exactly like MotionVectorWriter::Write (hex flags)."""
+    if not len(records):
+        return b""
+    fields = [
+        [f"0x{flags:x}" for flags in records[name].tolist()]
+        if name == "flags"
+        else records[name].tolist()
+        for name in MV_CSV_COLUMNS
+    ]
+    lines = ["%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s" % row for row in zip(*fields)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class CsvChunkParser:
+    """Parses MotionVectorWriter output fed in arbitrary byte chunks.
+
+    The header is taken from the first line and a partial last line is
+    kept until the chunk that completes it.
+    """
+
+    def __init__(self) -> None:
+        self.columns: Optional[List[str]] = None
+        self.tail = b""
+
+    def feed(self, data: bytes) -> np.ndarray:
+        lines, self.tail = split_lines(self.tail + data)
+        if self.columns is None:
+            if not lines:
+                return parse_csv_rows(b"")
+            header, lines = lines.split(b"\n", 1)
+            self.columns = header.decode().strip().split(",")
+        return parse_csv_rows(lines, self.columns)
+
+    def finish(self) -> np.ndarray:
+        """Rows of a last line written without a newline."""
+        tail, self.tail = self.tail, b""
+        if not tail.strip() or self.columns is None:
+            return parse_csv_rows(b"")
+        return parse_csv_rows(tail + b"\n", self.columns)
+
+
+class FrameBatcher:
+    """Cuts a stream of parsed rows into one record array per frame.
+
+    Rows of the last frame seen are held back, since more of them can
+    follow; a frame is complete once a row of another frame arrives.
+    """
+
+    def __init__(self) -> None:
+        self.pending: List[np.ndarray] = []
+
+    def feed(self, records: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        if not len(records):
+            return []
+        frame = records["frame"]
+        starts = np.flatnonzero(np.r_[True, frame[1:] != frame[:-1]])
+        runs = np.split(records, starts[1:])
+
+        if self.pending and self.pending[0]["frame"][0] == runs[0]["frame"][0]:
+            self.pending.append(runs.pop(0))
+            if not runs:
+                return []
+
+        complete = []
+        if self.pending:
+            complete.append(self.__merge__(self.pending))
+        complete.extend(runs[:-1])
+        self.pending = [runs[-1]]
+        return [(int(run["frame"][0]), run) for run in complete]
+
+    def flush(self) -> List[Tuple[int, np.ndarray]]:
+        if not self.pending:
+            return []
+        run = self.__merge__(self.pending)
+        self.pending = []
+        return [(int(run["frame"][0]), run)]
+
+    def __merge__(self, runs: List[np.ndarray]) -> np.ndarray:
+        return runs[0] if len(runs) == 1 else np.concatenate(runs)
+
+
+def split_lines(buffer: bytes) -> Tuple[bytes, bytes]:
+    """(complete lines, trailing partial line) of `buffer`."""
+    end = buffer.rfind(b"\n") + 1
+    return buffer[:end], buffer[end:]
+
+
+def follow_csv_frames(
+    csv_file: str,
+    poll_interval: float = 0.02,
+    idle_timeout: float = 5.0,
+    chunk_bytes: int = MV_STREAM_CHUNK_BYTES,
+) -> Iterator[Tuple[int, np.ndarray, float]]:
+    """Yield (frame, records, arrival time) from a CSV that is still growing.
+
+    New bytes are polled every `poll_interval` seconds and only complete
+    lines are parsed. A frame is yielded once its successor has started;
+    the last one when the file has not grown for `idle_timeout` seconds.
+    The arrival time is the file's modification time when the frame's last
+    rows were read, i.e. when they were written.
+    """
+    deadline = time.time() + idle_timeout
+    while not os.path.exists(csv_file):
+        if time.time() > deadline:
+            return
+        time.sleep(poll_interval)
+
+    parser = CsvChunkParser()
+    batcher = FrameBatcher()
+    # Arrival time of the rows held back by the batcher
+    pending_arrival = time.time()
+    last_data = time.time()
+
+    with open(csv_file, "rb") as f:
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                if time.time() - last_data > idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+            last_data = time.time()
+            arrival = os.fstat(f.fileno()).st_mtime
+
+            records = parser.feed(data)
+            if not len(records):
+                continue
+
+            # The held back frame arrived earlier, unless this read continues it
+            held_frame = batcher.pending[0]["frame"][0] if batcher.pending else None
+            if records["frame"][0] == held_frame:
+                pending_arrival = arrival
+            for index, (frame, run) in enumerate(batcher.feed(records)):
+                held = index == 0 and held_frame is not None
+                yield frame, run, pending_arrival if held else arrival
+            pending_arrival = arrival
+
+        for frame, run in batcher.flush():
+            yield frame, run, pending_arrival
+
+
+def read_available(stream, chunk_bytes: int = MV_STREAM_CHUNK_BYTES) -> bytes:
+    """Block for the next data, then take whatever else is ready, up to
+    `chunk_bytes`.
+
+    A pipe hands over at most its buffer (64 KB) per read; parsing that
+    many small pieces costs several times a large chunk, so everything
+    already written is collected first. Streams without a file descriptor
+    are read once.
+    """
+    read = getattr(stream, "read1", stream.read)
+    data = read(chunk_bytes)
+    try:
+        fd = stream.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return data
+    parts = [data]
+    size = len(data)
+    while data and size < chunk_bytes and select.select([fd], [], [], 0)[0]:
+        data = read(chunk_bytes - size)
+        parts.append(data)
+        size += len(data)
+    return b"".join(parts)
+
+
+def read_stream_frames(
+    stream, chunk_bytes: int = MV_STREAM_CHUNK_BYTES
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (frame, records) from a binary stream of MotionVectorWriter output.
+
+    Frames come out while the producer is still writing, as soon as the
+    next frame has started, instead of after it exits.
+    """
+    parser = CsvChunkParser()
+    batcher = FrameBatcher()
+    while True:
+        data = read_available(stream, chunk_bytes)
+        if not data:
+            break
+        yield from batcher.feed(parser.feed(data))
+    yield from batcher.feed(parser.finish())
+    yield from batcher.flush()
+
+
+def extractor_command(
+    extractor: str, input_path: str, output: str = MV_PIPE_OUTPUT
+) -> List[str]:
+    """Extractor call writing its CSV to `output` (a pipe by default).
+
+    `extractor` may carry an interpreter, e.g.
+    "python -m benchmarking.mv_producer".
+    """
+    return [*extractor.split(), input_path, "1", output]
+
+
+def stream_extractor_frames(
+    input_path: str,
+    extractor: str = MV_EXTRACTOR,
+    chunk_bytes: int = MV_STREAM_CHUNK_BYTES,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Run an extractor with its CSV on a pipe and yield (frame, records).
+
+    Nothing is written to disk; the extractor's diagnostics on stderr are
+    discarded. Closing the generator early kills the extractor.
+    """
+    process = subprocess.Popen(
+        extractor_command(extractor, input_path),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        yield from read_stream_frames(process.stdout, chunk_bytes)
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+    if process.returncode:
+        print(f"[ERROR] {extractor} exited with code {process.returncode}")
+
+
+async def astream_extractor_frames(
+    input_path: str,
+    extractor: str = MV_EXTRACTOR,
+    chunk_bytes: int = MV_STREAM_CHUNK_BYTES,
+) -> AsyncIterator[Tuple[int, np.ndarray]]:
+    """Async iterator version of `stream_extractor_frames`.
+
+    Parsing runs on the event loop, so other tasks run while waiting for
+    the extractor, not while a chunk is parsed.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *extractor_command(extractor, input_path),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        # Buffer up to a whole chunk while the previous one is parsed
+        limit=chunk_bytes,
+    )
+    parser = CsvChunkParser()
+    batcher = FrameBatcher()
+    try:
+        while True:
+            data = await process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            for frame in batcher.feed(parser.feed(data)):
+                yield frame
+        for frame in batcher.feed(parser.finish()) + batcher.flush():
+            yield frame
+        await process.wait()
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    if process.returncode:
+        print(f"[ERROR] {extractor} exited with code {process.returncode}")
+
+
+def benchmark_stream(input_path: str, extractor: str = MV_EXTRACTOR) -> dict:
+    """Frames and vectors per second of `stream_extractor_frames`."""
+    frames = vectors = 0
+    first_frame_seconds = None
+    start = time.perf_counter()
+    for _, records in stream_extractor_frames(input_path, extractor):
+        if first_frame_seconds is None:
+            first_frame_seconds = time.perf_counter() - start
+        frames += 1
+        vectors += len(records)
+    seconds = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "vectors": vectors,
+        "seconds": seconds,
+        "first_frame_s": first_frame_seconds,
+        "frames_per_s": frames / seconds,
+        "vectors_per_s": vectors / seconds,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(
+            "Usage: python -m video_generation.mv_stream <input> [extractor]\n"
+            "       e.g. <input> 'python -m benchmarking.mv_producer' "
+            "with input 300@1280x720"
+        )
+        sys.exit(1)
+
+    extractor = sys.argv[2] if len(sys.argv) > 2 else MV_EXTRACTOR
+    r = benchmark_stream(sys.argv[1], extractor)
+    print(
+        f"Streamed {r['frames']} frames ({r['vectors']:,} vectors) in "
+        f"{r['seconds']:.2f} s: {r['frames_per_s']:.1f} frames/s, "
+        f"{r['vectors_per_s'] / 1e6:.2f}M vectors/s, first frame after "
+        f"{1000 * (r['first_frame_s'] or 0):.0f} ms"
+    )